@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+''' Time the evaluation of typical commands with adaptive precision, in which
+commands are worked to only as many digits as they need, against the fixed
+PREC_OFFSET guard digits, and check that both display the same results.
+
+Run from the root of the project:
+    python benchmarks/adaptive_precision.py [significant figures] [repeats]
+'''
+from __future__ import division, print_function
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Project modules
+from calculator import Calculator
+import cas.cache as cache
+
+COMMANDS = [
+    '1/3 + 2',
+    '2.5*3.7 - 1.25',
+    'sin(1) + ln(2)',
+    'arctan(0.5)*cosh(2)',
+    'e^2',
+    '2.1^0.7',
+    '(1+2i)*(3-i)/(2+i)',
+    'sin(1+i)',
+    'det([[1,2.5,3],[4,5,6],[7,8,10.1]])',
+    '[[1.1,2],[3,4.3]]*[[1.5,2],[3,4]]',
+    'roots(x^3-2x-5)',
+]
+
+def run(calc, repeats):
+    ''' Return the time taken to evaluate each command repeats times, and
+    the results displayed. '''
+    times, results = [], []
+    for command in COMMANDS:
+        start = time.time()
+        for i in range(repeats):
+            # Time the calculation rather than the display caches
+            cache.clear_all()
+            result = calc.evaluate(command)
+        times.append(time.time() - start)
+        results.append(result)
+    return times, results
+
+def main(digits=3, repeats=20):
+    calc = Calculator()
+    calc.evaluate('setprec({})'.format(digits))
+    calc.adaptive = False
+    fixed, expected = run(calc, repeats)
+    calc.adaptive = True
+    adaptive, results = run(calc, repeats)
+
+    for command, a, b, x, y in zip(COMMANDS, fixed, adaptive, expected,
+        results):
+        print('{:40} fixed {:7.2f}ms adaptive {:7.2f}ms ({:4.1f}x){}'.format(
+            command, 1000 * a / repeats, 1000 * b / repeats, a / b,
+            '' if x == y else '  DIFFERS: {} {}'.format(x, y)))
+    print('total: fixed {:.2f}s adaptive {:.2f}s ({:.1f}x faster)'.format(
+        sum(fixed), sum(adaptive), sum(fixed) / sum(adaptive)))
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+''' Time the constants and functions of rationals summed by binary splitting
+in cas.binary_splitting against the implementations they replace, and check
+that the two agree, at 100, 1000 and 10000 digits.
+
+Run from the root of the project:
+    python benchmarks/binary_splitting.py [digits ...]
+'''
+from __future__ import division, print_function
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import os
+import sys
+import time
+from decimal import Decimal, getcontext
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Project modules
+import cas.binary_splitting as bs
+
+D = Decimal
+
+def chudnovsky(prec):
+    ''' pi by the Chudnovsky brothers' formula summed term by term in
+    Decimal, as cas.constants computed it. '''
+    K, L, M, X = 6, 13591409, 1, 1
+    S = D(L)
+    for i in range(1, prec // 14 + 2):
+        M = M * (K ** 3 - 16 * K) // i ** 3
+        L += 545140134
+        X *= -262537412640768000
+        S += D(M * L) / X
+        K += 12
+    return 426880 * D(10005).sqrt() / S
+
+def series_exp(x):
+    ''' The Taylor series of exp summed term by term in Decimal. '''
+    i, lasts, s, fact, num = 0, 0, 1, 1, 1
+    while s != lasts:
+        lasts = s
+        i += 1
+        fact *= i
+        num *= x
+        s += num / fact
+    return +s
+
+def series_atan(x):
+    ''' Euler's series for atan summed term by term in Decimal, as
+    dmath.atan sums it. '''
+    x2 = x * x
+    y = x2 / (1 + x2)
+    i, lasts, s, coeff, num = D(0), 0, y / x, 1, y / x
+    while s != lasts:
+        lasts = s
+        i += 2
+        coeff *= i / (i + 1)
+        num *= y
+        s += coeff * num
+    return +s
+
+# Each entry is a name and the current and binary splitting implementations
+FUNCTIONS = [
+    ('pi', lambda prec: chudnovsky(prec), lambda prec: bs.pi()),
+    ('e', lambda prec: D(1).exp(), lambda prec: bs.e()),
+    ('ln 2', lambda prec: D(2).ln(), lambda prec: bs.ln2()),
+    ('exp(1/3)', lambda prec: series_exp(D(1) / 3),
+        lambda prec: bs.exp_rational(1, 3)),
+    ('atan(1/5)', lambda prec: series_atan(D(1) / 5),
+        lambda prec: bs.atan_rational(1, 5)),
+]
+
+def timed(f, prec):
+    ''' Return the result of f at the given precision and the time taken. '''
+    getcontext().prec = prec
+    start = time.time()
+    result = f(prec)
+    return result, time.time() - start
+
+def main(*digits):
+    for prec in digits or (100, 1000, 10000):
+        print('{} digits'.format(prec))
+        for name, current, split in FUNCTIONS:
+            x, a = timed(current, prec)
+            y, b = timed(split, prec)
+            getcontext().prec = prec
+            error = abs(x - y) / abs(y) * D(10) ** (prec - 1)
+            print('    {:10} current {:10.2f}ms binary splitting {:10.2f}ms'
+                ' ({:6.1f}x), differing by {:.2g} ulp'.format(name, 1000 * a,
+                1000 * b, a / b, float(error)))
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+''' Measure the accuracy and speed of the functions in dmath, at 10, 50, 200
+and 1000 digits and across the magnitudes of their arguments.
+
+Each result is compared with a reference computed with REFERENCE_DIGITS more
+digits, by the correctly rounded Decimal operations (exp, ln, sqrt and
+powers) or by plain series written out here, so that the reference shares no
+code with dmath. Its error is given in units in the last place (ulp) of the
+precision: a correctly rounded result is out by at most 0.5 ulp. Each
+argument is tried as a short decimal, as a user would type it, and as a
+number with as many digits as the precision, since dmath takes different
+paths for the two. Times are per call, the best of a few runs, with dmath's
+caches of constants and coefficients already filled.
+
+The results are written as JSON, so that the results from two commits may be
+compared; the comparison lists the changes in time and any results which are
+out by more than 0.5 ulp.
+
+Run from the root of the project:
+    python benchmarks/dmath_functions.py [-d DIGITS ...] [-f FUNCTION ...]
+        [-o RESULTS.json]
+    python benchmarks/dmath_functions.py --compare OLD.json NEW.json
+'''
+from __future__ import division, print_function
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from decimal import Decimal, getcontext, localcontext
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Project modules
+import dmath
+
+D = Decimal
+
+# The digits beyond the precision to which references are computed
+REFERENCE_DIGITS = 30
+# Each timing is of enough calls to take at least this many seconds
+MIN_TIME = 0.01
+# The number of timings, the best of which is taken
+RUNS = 3
+# Results out by more than this many ulp are listed by the comparison
+ULP_LIMIT = 0.5
+
+#
+# References
+#
+
+_pis = {}
+
+def ref_pi():
+    ''' pi by the series in the decimal module's documentation. '''
+    prec = getcontext().prec
+    if prec not in _pis:
+        with localcontext() as c:
+            c.prec += 2
+            three = D(3)
+            lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+            while s != lasts:
+                lasts = s
+                n, na = n + na, na + 8
+                d, da = d + da, da + 32
+                t = (t * n) / d
+                s += t
+        _pis[prec] = +s
+    return _pis[prec]
+
+def _series(x, k):
+    ''' The Taylor series of sin (k = 1) or cos (k = 0). '''
+    x2 = -x * x
+    term = s = x if k else D(1)
+    n = k
+    while True:
+        term = term * x2 / ((n + 1) * (n + 2))
+        n += 2
+        if s + term == s:
+            return s
+        s += term
+
+def _reduced(x):
+    ''' x reduced modulo 2 pi, with enough digits for those lost. '''
+    with localcontext() as c:
+        c.prec += max(0, x.adjusted()) + 5
+        pi2 = 2 * ref_pi()
+        return x - pi2 * (x / pi2).to_integral_value()
+
+def ref_sin(x):
+    return _series(_reduced(x), 1)
+
+def ref_cos(x):
+    return _series(_reduced(x), 0)
+
+def ref_tan(x):
+    r = _reduced(x)
+    return _series(r, 1) / _series(r, 0)
+
+def ref_atan(x):
+    ''' The Taylor series of atan, after halving the argument by
+    atan(x) = 2 atan(x / (1 + sqrt(1 + x^2))) until it is small. '''
+    if x < 0:
+        return -ref_atan(-x)
+    if x > 1:
+        return ref_pi() / 2 - ref_atan(1 / x)
+    k = 0
+    while x > D('0.01'):
+        x = x / (1 + (1 + x * x).sqrt())
+        k += 1
+    x2 = -x * x
+    term = s = x
+    n = 1
+    while True:
+        term *= x2
+        n += 2
+        if s + term / n == s:
+            return s * 2 ** k
+        s += term / n
+
+def ref_asin(x):
+    return ref_atan(x / ((1 - x) * (1 + x)).sqrt())
+
+def ref_acos(x):
+    return 2 * ref_atan(((1 - x) / (1 + x)).sqrt())
+
+def ref_atan2(y, x):
+    if x == 0:
+        return ref_pi() / 2 if y > 0 else -ref_pi() / 2
+    a = ref_atan(y / x)
+    if x > 0:
+        return a
+    return a + ref_pi() if y >= 0 else a - ref_pi()
+
+def _small(x):
+    ''' The digits lost to cancellation in e^x - e^-x for small x. '''
+    return max(0, -x.adjusted())
+
+def ref_sinh(x):
+    with localcontext() as c:
+        c.prec += _small(x)
+        return (x.exp() - (-x).exp()) / 2
+
+def ref_cosh(x):
+    return (x.exp() + (-x).exp()) / 2
+
+def ref_tanh(x):
+    with localcontext() as c:
+        c.prec += _small(x)
+        y = (2 * x).exp()
+        return (y - 1) / (y + 1)
+
+# Each function is a name, the dmath function, its reference and its
+# arguments. Arguments are lists with one value for each argument of the
+# function, each either an exponent n, standing for the numbers 1.5*10^n and
+# SQRT2*10^n, or a string giving a single short decimal.
+FUNCTIONS = [
+    ('pi', dmath.pi, ref_pi, [[]]),
+    ('e', dmath.e, lambda: D(1).exp(), [[]]),
+    ('exp', dmath.exp, D.exp, [[-20], [-3], [0], [1], [2], [3], ['-45.5']]),
+    ('log', dmath.log, D.ln,
+        [[-20], [-3], [0], [3], [100], ['1.000001'], ['0.99999']]),
+    ('log10', dmath.log10, D.log10, [[-20], [0], [3], [100], ['1000']]),
+    ('sin', dmath.sin, ref_sin,
+        [[-20], [-3], [0], [1], [3], [8], [20], ['3.14159']]),
+    ('cos', dmath.cos, ref_cos,
+        [[-20], [-3], [0], [1], [3], [8], [20], ['1.5708']]),
+    ('tan', dmath.tan, ref_tan,
+        [[-20], [-3], [0], [1], [3], [8], ['1.5707']]),
+    ('asin', dmath.asin, ref_asin, [[-20], [-3], [-1], ['0.9'], ['0.999999']]),
+    ('acos', dmath.acos, ref_acos, [[-20], [-3], [-1], ['0.9'], ['0.999999']]),
+    ('atan', dmath.atan, ref_atan, [[-20], [-3], [0], [1], [3], [20]]),
+    ('atan2', dmath.atan2, ref_atan2,
+        [[0, 0], [-3, 1], [1, -3], ['1', '-2.5'], ['-1', '-2.5']]),
+    ('sinh', dmath.sinh, ref_sinh, [[-20], [-3], [0], [1], [2]]),
+    ('cosh', dmath.cosh, ref_cosh, [[-20], [-3], [0], [1], [2]]),
+    ('tanh', dmath.tanh, ref_tanh, [[-20], [-3], [0], [1]]),
+    ('pow', dmath.pow, lambda x, y: x ** y,
+        [[0, 0], [0, 1], [-3, 1], [3, 2], [1, -3], ['2', '0.5']]),
+    ('hypot', dmath.hypot, lambda x, y: (x * x + y * y).sqrt(),
+        [[0, 0], [-3, 1], [20, 20]]),
+]
+
+# A number with many digits, which arguments with as many digits as the
+# precision are rounded from
+with localcontext() as c:
+    c.prec = 2000
+    SQRT2 = D(2).sqrt()
+
+def arguments(spec, prec):
+    ''' Return each of the kinds of argument given by spec at the given
+    precision, as (kind, arguments). '''
+    if all(isinstance(a, str) for a in spec):
+        return [('short', [D(a) for a in spec])]
+    short = [D(a) if isinstance(a, str) else D('1.5').scaleb(a) for a in spec]
+    with localcontext() as c:
+        c.prec = prec
+        full = [D(a) if isinstance(a, str) else +SQRT2.scaleb(a)
+            for a in spec]
+    return [('short', short), ('full', full)]
+
+def timed(f, args):
+    ''' Return the time taken by a call of f(*args), in seconds. '''
+    n = 1
+    while True:
+        start = default_timer()
+        for i in range(n):
+            f(*args)
+        elapsed = default_timer() - start
+        if elapsed >= MIN_TIME:
+            break
+        n *= 2
+    best = elapsed
+    for run in range(RUNS - 1):
+        start = default_timer()
+        for i in range(n):
+            f(*args)
+        best = min(best, default_timer() - start)
+    return best / n
+
+def ulps(y, reference, prec):
+    ''' The error in y, in units in the last place of reference at the given
+    precision. '''
+    if not reference:
+        return 0.0 if not y else float('inf')
+    with localcontext() as c:
+        c.prec = 50
+        return float(abs(y - reference)
+            / D(1).scaleb(reference.adjusted() + 1 - prec))
+
+def measure(name, f, reference, spec, prec):
+    ''' Yield the results for each kind of the arguments given by spec. '''
+    for kind, args in arguments(spec, prec):
+        getcontext().prec = prec
+        y = f(*args)
+        seconds = timed(f, args)
+        getcontext().prec = prec + REFERENCE_DIGITS
+        r = reference(*args)
+        yield {
+            'function': name,
+            'prec': prec,
+            'kind': kind,
+            'arguments': [str(a) for a in args],
+            'ulp': ulps(y, r, prec),
+            'seconds': seconds,
+        }
+
+def revision():
+    ''' The commit checked out, if this is a git repository. '''
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=open(os.devnull, 'w')).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(digits, names):
+    ''' Return the results for the functions named, at each precision. '''
+    results = []
+    for prec in digits:
+        for name, f, reference, specs in FUNCTIONS:
+            if names and name not in names:
+                continue
+            for spec in specs:
+                for result in measure(name, f, reference, spec, prec):
+                    results.append(result)
+                    print('{:6} {:5} digits {:5} {:30} {:8.3g}us {:8.3g} ulp'
+                        .format(name, prec, result['kind'],
+                        ', '.join(a[:28] for a in result['arguments']),
+                        1e6 * result['seconds'], result['ulp']),
+                        file=sys.stderr)
+    return {
+        'revision': revision(),
+        'python': platform.python_version(),
+        'reference_digits': REFERENCE_DIGITS,
+        'results': results,
+    }
+
+def key(result):
+    return (result['function'], result['prec'], result['kind'],
+        tuple(result['arguments']))
+
+def compare(old, new):
+    ''' Print the ratio of the times taken by the results in common to two
+    runs, by function and precision, and any new results which are out by
+    more than ULP_LIMIT. Return whether there are any. '''
+    before = dict((key(r), r) for r in old['results'])
+    ratios = {}
+    for r in new['results']:
+        o = before.get(key(r))
+        if o is not None and r['seconds']:
+            ratios.setdefault((r['function'], r['prec']), []).append(
+                o['seconds'] / r['seconds'])
+    print('Speed up from {} to {}'.format(old.get('revision'),
+        new.get('revision')))
+    for (name, prec), rs in sorted(ratios.items()):
+        # The geometric mean of the ratios
+        product = 1.0
+        for ratio in rs:
+            product *= ratio
+        print('    {:6} {:5} digits {:8.2f}x'.format(name, prec,
+            product ** (1 / len(rs))))
+    inaccurate = [r for r in new['results'] if r['ulp'] > ULP_LIMIT]
+    for r in inaccurate:
+        o = before.get(key(r))
+        print('{} at {} digits ({}): {:.3g} ulp (was {})'.format(
+            r['function'], r['prec'], ', '.join(r['arguments']), r['ulp'],
+            '{:.3g}'.format(o['ulp']) if o else 'not run'))
+    return bool(inaccurate)
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the accuracy and'
+        ' speed of the functions in dmath.')
+    parser.add_argument('-d', '--digits', type=int, nargs='+',
+        default=[10, 50, 200, 1000])
+    parser.add_argument('-f', '--functions', nargs='+', default=[],
+        choices=[f[0] for f in FUNCTIONS], metavar='FUNCTION')
+    parser.add_argument('-o', '--output', default='-',
+        help='the file to write the results to, - for standard output')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+        help='compare the results of two runs')
+    options = parser.parse_args()
+    if options.compare:
+        old, new = [json.load(open(f)) for f in options.compare]
+        sys.exit(1 if compare(old, new) else 0)
+    results = run(options.digits, options.functions)
+    out = sys.stdout if options.output == '-' else open(options.output, 'w')
+    json.dump(results, out, indent=1, sort_keys=True,
+        separators=(',', ': '))
+    out.write('\n')
+
+if __name__ == '__main__':
+    main()
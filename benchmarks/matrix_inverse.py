@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+''' Time the inversion of a 50x50 matrix of Reals, with the display strings
+of Reals formatted lazily (as now) and eagerly on construction (as before).
+
+Run from the root of the project:
+    python benchmarks/matrix_inverse.py [size] [--lazy-only]
+
+Formatting eagerly is slow enough that the eager run takes around half an
+hour for a 50x50 matrix (against 2 minutes at 20x20); pass --lazy-only to skip
+it.
+'''
+from __future__ import division, print_function
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Project modules
+from cas.numeric import Real
+from cas.matrices import Matrix
+
+def random_matrix(n, seed=0):
+    ''' Return an n*n matrix of Reals with 4 decimal places. '''
+    r = random.Random(seed)
+    return Matrix([[Real('{:.4f}'.format(r.uniform(-10, 10)))
+        for j in range(n)] for i in range(n)])
+
+def timed(f):
+    ''' Return the time taken to call f in seconds along with its result. '''
+    start = time.time()
+    result = f()
+    return time.time() - start, result
+
+def main(n=50, eager=True):
+    a = random_matrix(n)
+    lazy, inverse = timed(a.inverse)
+    print('{0}x{0} inverse: lazy {1:.2f}s'.format(n, lazy))
+
+    if eager:
+        # Format every Real as it is made, as Real.__init__ used to
+        def __init__(self, *args, **kwargs):
+            self._display()
+        Real.__init__ = __init__
+        try:
+            eager, _ = timed(random_matrix(n).inverse)
+        finally:
+            del Real.__init__
+        print('{0}x{0} inverse: eager {1:.2f}s ({2:.1f}x slower)'.format(n,
+            eager, eager / lazy))
+
+    # Check the result is an inverse
+    product = a * inverse
+    error = max(abs(product[i][j] - (1 if i == j else 0))
+        for i in range(n) for j in range(n))
+    print('largest error in A.inv(A) - I: {}'.format(repr(error)))
+
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if a != '--lazy-only']
+    main(*map(int, args), eager='--lazy-only' not in sys.argv)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+''' Time the overhead of the numeric tower on single operations: converting
+python numbers with handle_type, and mixed arithmetic between Integers,
+Rationals, Reals and Complexs, each of which converts its other operand.
+
+Run from the root of the project:
+    python benchmarks/numeric_coercion.py [repeats]
+'''
+from __future__ import division, print_function
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+SETUP = '''
+from decimal import getcontext
+from cas.core import handle_type, Symbol
+from cas.numeric import Integer, Rational, Real, Complex
+getcontext().prec = 53
+i, j = Integer(7), Integer(12)
+q = Rational(2, 3)
+r, s = Real('1.25'), Real('3.5')
+z = Complex(Real(1), Real(2))
+x = Symbol('x')
+'''
+
+OPERATIONS = [
+    'handle_type(7)',
+    'handle_type(2.5)',
+    'handle_type("42")',
+    'handle_type("4.25")',
+    'handle_type(r)',
+    'handle_type(x)',
+    'i + j',
+    'i * 3',
+    'q + i',
+    'r + s',
+    'r * i',
+    'r + 2.5',
+    'i - r',
+    'z * r',
+    'z + i',
+    'z * z',
+]
+
+def main(repeats=20000):
+    total = 0
+    for operation in OPERATIONS:
+        t = min(timeit.repeat(operation, SETUP, repeat=3, number=repeats))
+        total += t
+        print('{:24} {:8.2f}us'.format(operation, 1e6 * t / repeats))
+    print('total {:.2f}us'.format(1e6 * total / repeats))
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
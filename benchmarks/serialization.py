@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+''' Compare the size and speed of cas.serialization with pickle.
+
+Run from the root of the project:
+    python benchmarks/serialization.py
+'''
+from __future__ import division, print_function
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import os
+import sys
+import timeit
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Project modules
+from cas.core import Symbol
+from cas.numeric import Integer, Rational, Real
+from cas.matrices import Matrix
+from cas.vectors import Vector
+import cas.serialization as serialization
+
+x = Symbol('x')
+cases = [
+    ('Real', Real('3.14159265358979')),
+    ('Rational', Rational(355, 113)),
+    ('Vector', Vector([Real(i) / Integer(7) for i in range(20)])),
+    ('Matrix 10x10', Matrix([[Integer(i * j - 3) for j in range(10)]
+        for i in range(10)])),
+    ('Polynomial', (x + Integer(1))**Integer(3) * x + Integer(2) * x**Integer(5)
+        - Integer(7)),
+]
+
+def measure(name, dumps, loads, value, number=2000):
+    ''' Return the size of the encoding of value along with the time taken
+    in microseconds to encode and decode it. '''
+    try:
+        data = dumps(value)
+        loads(data)
+    except Exception:
+        return None
+    t_dumps = timeit.timeit(lambda: dumps(value), number=number)
+    t_loads = timeit.timeit(lambda: loads(data), number=number)
+    return len(data), 1e6 * t_dumps / number, 1e6 * t_loads / number
+
+def main():
+    formats = [
+        ('serialization', serialization.dumps, serialization.loads),
+        ('pickle', lambda a: pickle.dumps(a, 2), pickle.loads),
+    ]
+    print('{:<14}{:<15}{:>8}{:>12}{:>12}'.format('case', 'format', 'bytes',
+        'dumps/us', 'loads/us'))
+    for case, value in cases:
+        for name, dumps, loads in formats:
+            r = measure(name, dumps, loads, value)
+            if r is None:
+                print('{:<14}{:<15}{:>8}'.format(case, name, 'failed'))
+            else:
+                print('{:<14}{:<15}{:>8}{:>12.1f}{:>12.1f}'.format(case, name,
+                    *r))
+
+if __name__ == '__main__':
+    main()
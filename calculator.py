@@ -19,10 +19,13 @@ __author__ = 'Tom Wright <tom.tdw@gmail.com>'
 # C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
 
 # Standard modules
-from decimal import Decimal, getcontext
+from decimal import Decimal, getcontext, localcontext
 from functools import reduce, partial
 from sys import exit
+import cmath
+import math
 import random
+import re
 
 # Third party modules
 import dmath
@@ -30,14 +33,24 @@ from pyparsing import *
 
 # Project modules
 from cas.core import StrWithHtml, List, handle_type, Symbol,\
-    partial_differential, partial_integral, expand, Ln, Sin, Cos, Tan,\
-    Algebra
-from cas.numeric import Integer, Complex, Real
+    partial_differential, partial_integral, definite_integral, expand, Ln,\
+    Sin, Cos, Tan, Algebra, size, depth
+from cas.numeric import Integer, Complex, Real, factors, isprime,\
+    nextprime, prevprime, primepi, primes, totient, divisors, modinv, powmod,\
+    estimate_accuracy, ignore_accuracy
+from cas.functions import gcd, lcm
 from cas.matrices import Matrix, identity_matrix, diagonal_matrix
 from cas.vectors import Vector
 from cas.statistics import nCr, nPr, binomialpdf, binomialcdf,\
     poissonpdf, poissoncdf, normalcdf, factorial
+import cas.core as core
 import cas.numerical_methods as nm
+import cas.serialization as serialization
+import cas.constants as constants
+import cas.cache as cache
+import cas.special as special
+from cas.summation import summation, product, decimal_batch
+from cas.polynomials import variables
 from gnuplot import Gnuplot
 import help
 
@@ -45,31 +58,58 @@ import help
 # to ensure that results are justified
 PREC_OFFSET = 50
 getcontext().prec = 3 + PREC_OFFSET
+# In adaptive mode commands are first evaluated with this many guard digits,
+# and again with more, up to MAX_GUARD, if fewer than ADAPTIVE_MARGIN of them
+# are thought to be correct (see Calculator.evaluate_adaptive)
+ADAPTIVE_GUARD = 8
+ADAPTIVE_MARGIN = 4
+MAX_GUARD = 4 * PREC_OFFSET
+# The elementary functions from dmath, which answer for their own accuracy
+# whatever digits they cancel along the way
+ELEMENTARY = frozenset(['ln', 'log', 'sin', 'cos', 'tan', 'arcsin', 'arccos',
+    'arctan', 'sinh', 'cosh', 'tanh'])
+# The names in a command, which are checked for functions with side effects
+NAME = re.compile('[a-zA-Z]+')
 
 
 def evalute_between(f, a, b, samples=1000, variable=None):
     ''' Evaluate the function f at samples evenly spaced points for
     variable between a and b '''
-    # Convert a and b to Decimals for speed and samples to an int
-    a = Decimal(a)
-    b = Decimal(b)
+    # Convert a and b to Decimals (or floats in float mode) for speed and
+    # samples to an int
+    number = float if core.machine_floats() else Decimal
+    a = number(a)
+    b = number(b)
     samples = int(samples)
 
     # Calculate the step width
     step = (b - a) / samples
     # Create a matrix m to contain the values
     m = Matrix(samples, 2)
+    xs = [i*step + a for i in range(samples)]
+    # Expressions in one variable are evaluated at all of the points at once
+    # in Decimal mode, and otherwise, or if that fails at any of them, one
+    # point at a time
+    ys = None
+    names = variables(f) if isinstance(f, Algebra) else None
+    if number is Decimal and names is not None\
+            and (variable is not None or len(names) == 1):
+        name = str(variable) if variable is not None else names.pop()
+        try:
+            ys = decimal_batch(f, Symbol(name))(xs)
+        except Exception:
+            ys = None
     # For each value x seperated by step between a and b, add each
     # value x and f(x) to the matrix of results
-    i = 0
-    while i < samples:
-        x = i*step + a
+    for i, x in enumerate(xs):
         m[i][0] = x
+        if ys is not None:
+            m[i][1] = ys[i]
+            continue
         try:
             m[i][1] = f(x)
         except:
             m[i][1] = None
-        i += 1
 
     # Return the matrix of results
     return m
@@ -89,7 +129,7 @@ def gnuplot(f, *between):
 
 
 # Miscellaneous small functions to be used within the calculator
-pi = lambda: Real(nm.pi())
+pi = lambda: Real(constants.pi())
 pi.__doc__ = ''' An anonymous function to calculate the value of pi
 accurate to the current precision '''
 radians = lambda x: x*pi()/handle_type(180)
@@ -99,10 +139,11 @@ degrees = lambda x: x*handle_type(180)/pi()
 degrees.__doc__ = ''' An anonymous function to convert radians to
 degrees '''
 wrapped_f = lambda f, g, x: f(x) if isinstance(x, Algebra)\
+    else getattr(x, g.__name__)() if isinstance(x, Complex)\
     else handle_type(g(x))
 wrapped_f.__doc__ = ''' An anonymous function to evaluate an instance of
-algebra or convert the output of a standard function to the appropriate
-type '''
+algebra, a complex number (by its method of the same name) or convert the
+output of a standard function to the appropriate type '''
 ln = partial(wrapped_f, Ln, dmath.log)
 ln.__doc__ = ''' A wrapped version of dmath.log '''
 sin = partial(wrapped_f, Sin, dmath.sin)
@@ -113,6 +154,39 @@ tan = partial(wrapped_f, Tan, dmath.tan)
 tan.__doc__ = ''' A wrapped version of dmath.tan '''
 
 
+def machine_function(real, complex_, algebraic=None):
+    ''' Return a function for float mode, evaluating machine numbers with real
+    (from math) or, for complex numbers and real numbers outside the domain
+    of real, complex_ (from cmath), and instances of algebra with algebraic.
+    '''
+    def f(x):
+        if isinstance(x, Algebra) and algebraic is not None:
+            return algebraic(x)
+        elif isinstance(x, (complex, Complex)):
+            return complex_(complex(x))
+        try:
+            return real(x)
+        except ValueError:
+            return complex_(x)
+    return f
+
+
+def float_str(x, digits):
+    ''' Return a machine float or complex number as a string to a number of
+    significant figures (up to the 15 which floats hold), leaving out any
+    part of a complex number which is zero or only rounding error beside the
+    other part. '''
+    g = lambda y: '{:.{}g}'.format(y, max(1, min(digits, 15)))
+    if not isinstance(x, complex):
+        return g(x)
+    elif abs(x.imag) <= 1e-15 * abs(x.real):
+        return g(x.real)
+    i = (g(abs(x.imag)) if abs(x.imag) != 1 else '') + 'i'
+    if abs(x.real) <= 1e-15 * abs(x.imag):
+        return ('-' if x.imag < 0 else '') + i
+    return g(x.real) + ('-' if x.imag < 0 else '+') + i
+
+
 class Calculator(object):
     ''' An object providing an interactive, text driven, calculator. '''
 
@@ -153,17 +227,30 @@ class Calculator(object):
             'variance': lambda a: a.variance(),
             'stdev': lambda a: a.stdev(),
             'sxx': lambda a: a.Sxx(),
+        # Special Functions
+            'gamma': lambda x: handle_type(special.gamma(x)),
+            'lgamma': lambda x: handle_type(special.lgamma(x)),
+            'beta': lambda a, b: handle_type(special.beta(a, b)),
+            'erf': lambda x: handle_type(special.erf(x)),
+            'erfc': lambda x: handle_type(special.erfc(x)),
+            'zeta': lambda s: handle_type(special.zeta(s)),
+            'gammainc': lambda a, x: handle_type(special.gammainc(a, x)),
+            'gammaincc': lambda a, x: handle_type(special.gammaincc(a, x)),
+            'betainc': lambda a, b, x: handle_type(special.betainc(a, b, x)),
         # Manipulation of functions
             'expand': expand,
             'differentiate': lambda a, b=Symbol('x'):\
                 partial_differential(a, b),
             'integrate': lambda y, a=None, b=None, x=Symbol('x'):\
                 partial_integral(y, x) if a == None or b == None \
-                else partial_integral(y, x).limit(a, b, variable=x),
+                else definite_integral(y, x, a, b),
             'romberg': lambda f, a, b, *n: f.romberg_integral(a, b, *n),
+            'quad': lambda f, a, b, *n: f.quad_integral(a, b, *n),
             'trapeziumrule': lambda f, a, b, *n:\
                 f.trapezoidal_integral(a, b, *n),
             'simpsonrule': lambda f, a, b, *n: f.simpson_integral(a, b, *n),
+            'sum': summation,
+            'product': product,
             'simpsonthreeeightrule': lambda f, a, b, *n: f.simpson38_integral(a, b, *n),
             'roots': lambda a, n=1000: List(*list(a.roots(n))),
             'maxima': lambda a, n=100: List(*a.maxima(n)),
@@ -204,7 +291,18 @@ class Calculator(object):
                 '''<canvas id="testcanvas" width="600" height="600"></canvas>'''),
             'evalbetween': evalute_between,
             'factorial': factorial,
-            'factors': lambda a: a.factors(),
+            'factors': factors,
+            'isprime': isprime,
+            'nextprime': nextprime,
+            'prevprime': prevprime,
+            'primepi': primepi,
+            'primes': primes,
+            'totient': totient,
+            'divisors': divisors,
+            'modinv': modinv,
+            'powmod': powmod,
+            'gcd': gcd,
+            'lcm': lcm,
             'decimal': lambda a: Decimal(a) if not isinstance(a, List)\
                else List(*list(map(Decimal, a))),
             'complex': lambda a: complex(a) if not isinstance(a, List)\
@@ -213,11 +311,14 @@ class Calculator(object):
             'list': lambda a: str(list(a)),
             'gnuplot': gnuplot,
             'type': lambda a: str(type(a)),
+            'size': lambda a: Integer(size(a)),
+            'depth': lambda a: Integer(depth(a)),
             'typelist': lambda b: ', '.join(map(lambda a: str(type(a)), b)),
             'typematrix': lambda c: '; '.join(map(lambda b:
                 ', '.join(map(lambda a: str(type(a)), b)), c)),
             'setprec': self.set_precision,
             'setexact': self.set_exact,
+            'setadaptive': self.set_adaptive,
             'about': lambda:\
                 StrWithHtml('Copyright Tom Wright <tom.tdw@gmail.com>',
                 '''<img src="./images/about.png" />
@@ -235,28 +336,152 @@ class Calculator(object):
 
         # An array of standard constants
         self.consts = {
-            'pi': pi(),
+            'pi': pi,
             'g': Real('9.81'),
             'h': Real('6.62606896e-34'),
+            'inf': Real('Infinity'),
         }
 
+        # Versions of the functions and constants for machine floats, which
+        # replace those above in float mode
+        self.float_functions = {
+            'ln': machine_function(math.log, cmath.log, Ln),
+            'log': lambda a, b=10: machine_function(lambda x: math.log(x, b),
+                lambda x: cmath.log(x, b))(a),
+            'sin': machine_function(math.sin, cmath.sin, Sin),
+            'cos': machine_function(math.cos, cmath.cos, Cos),
+            'tan': machine_function(math.tan, cmath.tan, Tan),
+            'arcsin': machine_function(math.asin, cmath.asin),
+            'arccos': machine_function(math.acos, cmath.acos),
+            'arctan': machine_function(math.atan, cmath.atan),
+            'sinh': machine_function(math.sinh, cmath.sinh),
+            'cosh': machine_function(math.cosh, cmath.cosh),
+            'tanh': machine_function(math.tanh, cmath.tanh),
+            'arcsinh': machine_function(math.asinh, cmath.asinh),
+            'arccosh': machine_function(math.acosh, cmath.acosh),
+            'arctanh': machine_function(math.atanh, cmath.atanh),
+            'degrees': math.degrees,
+            'arg': lambda a: cmath.phase(complex(a)),
+            'gamma': math.gamma,
+            'lgamma': math.lgamma,
+            'erf': math.erf,
+            'erfc': math.erfc,
+        }
+        self.float_post_functions = {
+            'degs': math.radians,
+        }
+        self.float_consts = {
+            'pi': math.pi,
+            'g': 9.81,
+            'h': 6.62606896e-34,
+            'inf': float('inf'),
+        }
+
+        # Functions which change the state of the calculator or have other
+        # side effects, so that commands using them must be evaluated once
+        self.side_effects = {'setprec', 'setexact', 'setadaptive',
+            'setmode', 'plot', 'polarplot', 'gnuplot', 'quit'}
+
         # An array of miscellaneous internal variables such as ans
         # which stores the previous result
         self.objects = {'ans': Integer(0)}
+        # The command which calculated ans and the value of ans beforehand,
+        # so that ans can be calculated again when the precision changes
+        self.ans_source = None
+
+        # Evaluate commands at no greater precision than they need
+        self.adaptive = True
+
+        # Work in exact and decimal numbers ('decimal') or machine floating
+        # point numbers ('float')
+        self.mode = 'decimal'
+
+        # The parser, which refers to the calculator's functions and
+        # objects as they are when a command is evaluated
+        self.parser = self.grammar()
+
+    def __getstate__(self):
+        ''' Return the state of the calculator (its variables and display
+        settings) in a compact form for storing in sessions. The functions
+        and constants are rebuilt on restoring so are not stored. '''
+        objects = {}
+        for name, value in self.objects.items():
+            try:
+                objects[name] = serialization.dumps(value)
+            except serialization.SerializationError:
+                pass
+        return {'objects': objects, 'prec': getcontext().prec,
+            'exact_form': Real.exact_form, 'adaptive': self.adaptive,
+            'mode': self.mode}
+
+    def __setstate__(self, state):
+        ''' Restore a calculator from the state returned by __getstate__. '''
+        self.__init__()
+        for name, value in state['objects'].items():
+            self.objects[name] = serialization.loads(value)
+        getcontext().prec = state['prec']
+        Real.exact_form = state['exact_form']
+        self.adaptive = state.get('adaptive', True)
+        self.mode = state.get('mode', 'decimal')
+
+    def const(self, name):
+        ''' Return the value of a constant; those which depend upon the
+        precision are stored as functions so as to follow its changes. '''
+        if self.mode == 'float':
+            return self.float_consts[name]
+        value = self.consts[name]
+        return value() if callable(value) else value
+
+    def function(self, name, functions, float_functions):
+        ''' Return the function of a name from functions, or from
+        float_functions if it is there in float mode. '''
+        if self.mode == 'float' and name in float_functions:
+            return float_functions[name]
+        return functions[name]
 
     def set_exact(self):
         ''' Tell the calculator to toggle the use of exact answers and
         return the previous answer in the new form. '''
         Real.exact_form = not Real.exact_form
+        cache.invalidate('exact_form')
         return self.objects['ans']
 
+    def set_mode(self, mode):
+        ''' Switch between working in exact and decimal numbers ('decimal')
+        and in machine floating point numbers ('float'), which is much faster
+        but holds only around 15 significant figures. '''
+        assert mode in ('decimal', 'float')
+        self.mode = mode
+        message = 'Working in {} numbers'.format(mode)
+        return StrWithHtml(message, message)
+
+    def set_adaptive(self):
+        ''' Tell the calculator to toggle adaptive evaluation, in which only
+        as many digits are worked to as are needed for the result. '''
+        self.adaptive = not self.adaptive
+        message = 'Adaptive precision ' + ('on' if self.adaptive else 'off')
+        return StrWithHtml(message, message)
+
     def set_precision(self, a):
         ''' Set the number of significant figures to display, adjust the
-        internal precision and return the previous answer in the new form. '''
+        internal precision and return the previous answer in the new form.
+
+        The previous answer was only calculated to the precision of its own
+        command, so that command is evaluated again where it is known. '''
         assert isinstance(a, int)
         assert a >= 0
         getcontext().prec = int(a) + PREC_OFFSET
-        return self.objects['ans']
+        cache.invalidate('precision')
+        if self.ans_source is None:
+            return self.objects['ans']
+        command, previous = self.ans_source
+        ans, self.objects['ans'] = self.objects['ans'], previous
+        try:
+            a = self.parser.parseString(command)
+        finally:
+            self.objects['ans'] = ans
+        self.ans_source = (command, previous)
+        return a[0]
 
     def grammar(self):
         ''' A top-down recursive parser for handling algebraic expressions. '''
@@ -292,7 +517,7 @@ class Calculator(object):
         func << Word(srange('[a-zA-Z]')) + (atom | Suppress('(')\
             + Optional(delimitedList(expr)) + Suppress(')'))
         post_func = atom + (Literal('degs') | '!')
-        const << (Literal('pi'))
+        const << (Literal('pi') | Literal('inf'))
         aabs = Suppress('|') + expr + Suppress('|')
         norm = Suppress('||') + expr + Suppress('||')
         atom << (Suppress('(') + expr + Suppress(')') | Suppress('$') + expr
@@ -307,8 +532,12 @@ class Calculator(object):
         # Rules for variable assignments
         assign = Word(srange('[A-Z]')) + Suppress(':=') + expr
 
+        # Rules for changing the type of numbers worked in
+        mode = Suppress('setmode') + Optional(Suppress('('))\
+            + (Literal('float') | Literal('decimal')) + Optional(Suppress(')'))
+
         command = Forward()
-        command << (assign | expr) # + StringEnd()
+        command << (mode | assign | expr) # + StringEnd()
         # End of BFN
         
         # Start of parser actions
@@ -342,30 +571,47 @@ class Calculator(object):
         def _factor_action(a):
             if len(a) == 1:
                 return a[0]
+            elif isinstance(a[0], (int, long, float)) and a[0] < 0\
+                and isinstance(a[1], float) and a[1] != int(a[1]):
+                # Fractional powers of negative floats are complex
+                return cmath.exp(a[1] * cmath.log(a[0]))
             else:
                 return a[0] ** a[1]
 
+        def _func_action(a):
+            f = self.function(a[0], self.functions, self.float_functions)
+            if a[0] in ELEMENTARY:
+                return ignore_accuracy(f, *a[1:])
+            return f(*a[1:])
+
         def _assign_action(vars, a):
             vars[a[0]] = a[1]
             return a[1]
 
-        uint.setParseAction(lambda a: Integer(a[0]))
-        ufloat.setParseAction(lambda a: Real(''.join(a)))
-        ucomplex.setParseAction(lambda a: Complex(1j))
+        # In float mode whole numbers are python ints, which are converted
+        # to floats when divided or combined with a float
+        uint.setParseAction(lambda a: int(a[0]) if self.mode == 'float'
+            else Integer(a[0]))
+        ufloat.setParseAction(lambda a: float(''.join(a))
+            if self.mode == 'float' else Real(''.join(a)))
+        ucomplex.setParseAction(lambda a: 1j if self.mode == 'float'
+            else Complex(0, 1))
         num.setParseAction(_sign_action)
         variable.setParseAction(lambda a: Symbol(a[0]))
         obj.setParseAction(lambda a: self.objects[a[0]])
         matrix.setParseAction(lambda a: Matrix(list(map(list, a))))
         vector.setParseAction(lambda a: Vector(a))
-        func.setParseAction(lambda a: self.functions[a[0]] (*a[1:]))
-        post_func.setParseAction(lambda a: self.post_functions[a[1]] (a[0]))
-        const.setParseAction(lambda a: self.consts[''.join(a)])
+        func.setParseAction(_func_action)
+        post_func.setParseAction(lambda a: self.function(a[1],
+            self.post_functions, self.float_post_functions) (a[0]))
+        const.setParseAction(lambda a: self.const(''.join(a)))
         aabs.setParseAction(lambda a: abs(a[0]))
         norm.setParseAction(lambda a: a[0].norm())
         factor.setParseAction(_factor_action)
         aterm.setParseAction(_aterm_action)
         expr.setParseAction(_expr_action)    
         assign.setParseAction(lambda a: _assign_action(self.objects, a))
+        mode.setParseAction(lambda a: self.set_mode(a[0]))
     
         # End of parser actions
         
@@ -375,19 +621,101 @@ class Calculator(object):
 
     def evaluate(self, command):
         ''' Return the result of an algebraic expression '''
-        # Parse and evaluate command
-        a = self.grammar().parseString(command)
-
-        # Assign answer variable to expression
+        try:
+            return core.with_machine_floats(self.mode == 'float',
+                self.evaluate_mode, command)
+        except OverflowError:
+            if self.mode != 'float':
+                raise
+            # Machine floats only reach around 1.8e308
+            raise ValueError('The result is too large for float mode')
+
+    def evaluate_mode(self, command):
+        ''' Return the result of an algebraic expression, in the number mode
+        already chosen for the calculator. '''
+        previous, source = self.objects['ans'], self.ans_source
+        if self.adaptive and self.mode == 'decimal'\
+            and not self.changes_state(command):
+            result = self.evaluate_adaptive(command)
+        else:
+            # Parse and evaluate command
+            a = self.parser.parseString(command)
+
+            # Assign answer variable to expression
+            self.objects['ans'] = a[0]
+
+            # Set resolution for display and print results
+            result = self.format(a, PREC_OFFSET)
+
+        if not self.changes_state(command):
+            self.ans_source = (command, previous)
+        elif self.ans_source is source:
+            # Unless the command calculated ans again itself (as setprec
+            # does), there is no command to calculate the new ans again
+            self.ans_source = None
+        return result
+
+    def changes_state(self, command):
+        ''' Return whether a command assigns a variable or calls a function
+        with side effects. '''
+        return ':=' in command or not self.side_effects.isdisjoint(
+            NAME.findall(command))
+
+    def evaluate_adaptive(self, command):
+        ''' Return the result of an algebraic expression, working to only as
+        many digits as are needed to display it correctly.
+
+        The command is evaluated with ADAPTIVE_GUARD digits beyond those
+        displayed, estimating the digits its arithmetic loses to cancellation
+        as it goes (see cas.numeric.estimate_accuracy). If fewer than
+        ADAPTIVE_MARGIN guard digits are left the command is evaluated again
+        with enough more guard digits to make up the loss, and at least twice
+        as many, until the result is accurate or MAX_GUARD guard digits are
+        used. Commands which fail are evaluated once more at the fixed
+        precision, so that any error is reported as before. '''
+        digits = getcontext().prec - PREC_OFFSET
+        guard = ADAPTIVE_GUARD
+        while True:
+            with localcontext() as context:
+                context.prec = digits + guard
+                context.clear_flags()
+                try:
+                    a, accuracy = estimate_accuracy(self.parser.parseString,
+                        command)
+                except Exception:
+                    break
+                shortfall = 0 if accuracy is None\
+                    else digits + ADAPTIVE_MARGIN - accuracy
+                if shortfall <= 0 or guard >= MAX_GUARD:
+                    self.objects['ans'] = a[0]
+                    try:
+                        return self.format(a, guard)
+                    finally:
+                        Real.prec_offset = PREC_OFFSET
+            guard = min(max(2 * guard, guard + shortfall + ADAPTIVE_MARGIN),
+                MAX_GUARD)
+
+        a = self.parser.parseString(command)
         self.objects['ans'] = a[0]
+        return self.format(a, PREC_OFFSET)
 
-        # Set resolution for display and print results
-        Real.prec_offset = PREC_OFFSET
-        if isinstance(a[0], Decimal):
+    def format(self, a, guard):
+        ''' Return the result of a command formatted for display, hiding the
+        guard digits beyond the number to be displayed. '''
+        Real.prec_offset = guard
+        if isinstance(a[0], Real):
             return '= ' + str(+a[0])
+        elif isinstance(a[0], Decimal):
+            # Plain Decimals are rounded to the digits displayed, as they do
+            # not hide the guard digits themselves
+            with localcontext() as context:
+                context.prec -= guard
+                return '= ' + str(+a[0])
         elif isinstance(a[0], str):
             return '= ' + a[0]
         elif isinstance(a[0], StrWithHtml):
             return a[0]
+        elif isinstance(a[0], (float, complex)):
+            return '= ' + float_str(a[0], getcontext().prec - guard)
         elif (len(a) == 1) or isinstance(a[0], (int, float)):
             return '= ' + str(a[0])
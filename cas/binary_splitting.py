@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+''' Summation of hypergeometric-type series by binary splitting, and the
+constants and functions of rationals computed with it.
+
+A series of n terms
+
+    S = sum(a(k)/b(k) * p(0)...p(k) / (q(0)...q(k)) for k in range(n))
+
+with integer a, b, p and q is summed exactly as a single fraction by splitting
+the range of terms in two, summing each half recursively and combining the
+halves with a few integer multiplications. The numbers multiplied are of
+similar sizes at each level, so the cost grows little faster than that of
+multiplying two numbers of the final size, rather than with the square of the
+number of terms as when the terms are added one at a time. Only the final
+division is carried out in decimal, at the current precision. See:
+    - B. Haible and T. Papanikolaou, Fast multiprecision evaluation of series
+      of rational numbers, ANTS-III (1998), LNCS 1423, 338-350 '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import functools
+import math
+from decimal import Decimal, getcontext, localcontext
+
+# The number of digits computed beyond the working precision
+GUARD_DIGITS = 5
+
+_one = lambda k: 1
+
+def _split(n1, n2, p, q, a, b):
+    ''' Return the integers P, Q, B and T for the terms from n1 to n2 - 1,
+    where P, Q and B are the products of p, q and b over them and T/(B*Q) is
+    their sum divided by p(0)...p(n1 - 1) / (q(0)...q(n1 - 1)). '''
+    if n2 - n1 == 1:
+        P, Q, B = p(n1), q(n1), b(n1)
+        return P, Q, B, a(n1) * P
+    m = (n1 + n2) // 2
+    Pl, Ql, Bl, Tl = _split(n1, m, p, q, a, b)
+    Pr, Qr, Br, Tr = _split(m, n2, p, q, a, b)
+    return Pl * Pr, Ql * Qr, Bl * Br, Br * Qr * Tl + Bl * Pl * Tr
+
+def hypergeometric(n, p, q, a=_one, b=_one):
+    ''' Return the numerator and denominator of the sum of the first n terms
+    of the series with terms a(k)/b(k) * p(0)...p(k) / (q(0)...q(k)) for
+    functions a, b, p and q of k returning integers. '''
+    P, Q, B, T = _split(0, n, p, q, a, b)
+    return T, B * Q
+
+def _rounded(f):
+    ''' Evaluate f with GUARD_DIGITS more digits than the working precision
+    and round its result to it. '''
+    @functools.wraps(f)
+    def wrapper(*args):
+        with localcontext() as c:
+            c.prec += GUARD_DIGITS
+            result = f(*args)
+        return +result
+    return wrapper
+
+def _divide(numerator, denominator):
+    ''' Return the quotient of two integers at the current precision. '''
+    return Decimal(numerator) / Decimal(denominator)
+
+def _terms(ratio, digits):
+    ''' Return the number of terms of a series, the terms of which fall by a
+    factor of at least ratio each, to sum to the given number of digits. '''
+    return int(digits * math.log(10) / math.log(ratio)) + 2
+
+def _factorial_terms(digits, x=1):
+    ''' Return the number of terms of the series for exp(x), for positive
+    x, to sum to the given number of digits. '''
+    # The smallest n for which x**n / n! < 10**-digits, with x**n / n! found
+    # by Stirling's formula through lgamma
+    digits = (digits + 2) * math.log(10)
+    n = max(2, int(2 * math.e * x))
+    while math.lgamma(n + 1) - n * math.log(x) < digits:
+        n *= 2
+    lo, hi = n // 2, n
+    while hi - lo > 1:
+        m = (lo + hi) // 2
+        if math.lgamma(m + 1) - m * math.log(x) < digits: lo = m
+        else: hi = m
+    return hi + 1
+
+@_rounded
+def pi(terms=None):
+    ''' Return pi by the given number of terms of the Chudnovsky brothers'
+    formula, each of which adds just over 14 digits, or by enough of them for
+    the working precision. '''
+    T, Q = hypergeometric(terms or getcontext().prec // 14 + 2,
+        lambda k: -(6 * k - 5) * (2 * k - 1) * (6 * k - 1) if k else 1,
+        # 640320**3 / 24
+        lambda k: k * k * k * 10939058860032000 if k else 1,
+        lambda k: 13591409 + 545140134 * k)
+    return 426880 * Decimal(10005).sqrt() * _divide(Q, T)
+
+@_rounded
+def exp_rational(u, v=1):
+    ''' Return e raised to the power of the rational u/v, by its Taylor
+    series. '''
+    prec = getcontext().prec
+    if u < 0:
+        return 1 / exp_rational(-u, v)
+    elif u == 0:
+        return Decimal(1)
+    # The terms rise until k exceeds u/v, so many more digits are summed
+    # than are wanted when u/v is large
+    x = u / v
+    T, Q = hypergeometric(_factorial_terms(prec + x / math.log(10), x),
+        lambda k: u if k else 1, lambda k: k * v if k else 1)
+    return _divide(T, Q)
+
+def e():
+    ''' Return the base of the natural logarithm, by the series of
+    reciprocal factorials. '''
+    return exp_rational(1, 1)
+
+@_rounded
+def atan_rational(u, v):
+    ''' Return the arctangent of the rational u/v, which should be no more
+    than 1 in magnitude, by Euler's series
+        atan(x) = x/(1 + x^2) * sum(2^(2k) k!^2 / (2k + 1)! * y^k)
+    where y = x^2/(1 + x^2) is no more than 1/2. '''
+    prec = getcontext().prec
+    if u == 0:
+        return Decimal(0)
+    u2, w = u * u, u * u + v * v
+    T, Q = hypergeometric(_terms(w / u2, prec),
+        lambda k: 2 * k * u2 if k else 1, lambda k: (2 * k + 1) * w if k else 1)
+    return _divide(T * u * v, Q * w)
+
+@_rounded
+def atanh_rational(u, v):
+    ''' Return the inverse hyperbolic tangent of the rational u/v, which
+    should be small, by the series of odd powers divided by their
+    exponents. '''
+    prec = getcontext().prec
+    if u == 0:
+        return Decimal(0)
+    u2, v2 = u * u, v * v
+    T, Q = hypergeometric(_terms(v2 / u2, prec),
+        lambda k: u2 if k else 1, lambda k: v2 if k else 1,
+        b=lambda k: 2 * k + 1)
+    return _divide(T * u, Q * v)
+
+@_rounded
+def ln2():
+    ''' Return the natural logarithm of 2, as
+        18 atanh(1/26) - 2 atanh(1/4801) + 8 atanh(1/8749) '''
+    return 18 * atanh_rational(1, 26)\
+        - 2 * atanh_rational(1, 4801) + 8 * atanh_rational(1, 8749)
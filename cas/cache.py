@@ -1,30 +1,200 @@
+#!/usr/bin/env python
+''' Memoisation for the computer algebra system.
+
+All of the project's caches are instances of Cache, which is a thread safe
+least recently used cache bounded by the number of entries and, optionally,
+by an estimate of the memory used and by the age of its entries. Every cache
+is entered in a registry under its name so that they may be inspected with
+cache_info and cleared together with clear_all; a cache which depends upon a
+display or numeric setting lists it in depends_on and is cleared when
+invalidate is called for that setting. See:
+    - http://en.wikipedia.org/wiki/Cache_algorithms#Least_Recently_Used
+'''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
 import collections
 import functools
+import sys
+import time
+import weakref
+from decimal import getcontext
+from threading import RLock
+
+# The statistics reported by Cache.info
+CacheInfo = collections.namedtuple('CacheInfo', ['name', 'hits', 'misses',
+    'evictions', 'expirations', 'size', 'bytes', 'maxsize', 'maxbytes'])
+
+# All of the live caches, by name
+_registry = weakref.WeakValueDictionary()
+_registry_lock = RLock()
+
+def context_key():
+    ''' The fields of the current decimal context which can change the result
+    of a numeric calculation. '''
+    context = getcontext()
+    return (context.prec, context.rounding)
+
+def getsize(key, value):
+    ''' Estimate the memory used by a cache entry (not counting the memory
+    of the objects they refer to). '''
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+class Cache(object):
+    ''' A thread safe least recently used cache. Entries are evicted once
+    there are more than maxsize of them, once their estimated sizes total
+    more than maxbytes or once they are more than ttl seconds old; any of
+    these may be None for no limit. '''
+    def __init__(self, name, maxsize=100, maxbytes=None, ttl=None,
+        depends_on=(), sizeof=getsize, clock=time.time):
+        self.name = name
+        self.maxsize, self.maxbytes, self.ttl = maxsize, maxbytes, ttl
+        self.depends_on = frozenset(depends_on)
+        self.sizeof, self.clock = sizeof, clock
+        # Entries are (value, size, expiry time), least recent first
+        self._entries = collections.OrderedDict()
+        self._lock = RLock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self.bytes = 0
+        register(self)
+
+    def get(self, key, default=None):
+        ''' Return the value stored under key, or default if there is none
+        (counting a hit or miss). '''
+        with self._lock:
+            try:
+                value, size, expires = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= self.clock():
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+            # Reinsert the entry to mark it as the most recently used
+            self._entries[key] = value, size, expires
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        ''' Store value under key, evicting old entries as necessary. '''
+        size = self.sizeof(key, value) if self.maxbytes is not None else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = value, size, expires
+            self.bytes += size
+            while (self.maxsize is not None
+                and len(self._entries) > self.maxsize)\
+                or (self.maxbytes is not None and self.bytes > self.maxbytes):
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    __setitem__ = set
 
-def lru_cache(maxsize=100):
-    '''Least-recently-used cache decorator.
+    def __getitem__(self, key):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
 
-    Arguments to the cached function must be hashable.
-    Cache performance statistics stored in f.hits and f.misses.
-    http://en.wikipedia.org/wiki/Cache_algorithms#Least_Recently_Used '''
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries and (self._entries[key][2] is None
+                or self._entries[key][2] > self.clock())
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        ''' Remove all of the entries (keeping the statistics). '''
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def info(self):
+        ''' Return the statistics of the cache. '''
+        with self._lock:
+            return CacheInfo(self.name, self.hits, self.misses, self.evictions,
+                self.expirations, len(self._entries), self.bytes, self.maxsize,
+                self.maxbytes)
+
+    def __repr__(self):
+        return '<Cache {}: {} entries>'.format(self.name, len(self))
+
+def register(cache):
+    ''' Enter a cache in the registry, replacing any of the same name. '''
+    with _registry_lock:
+        _registry[cache.name] = cache
+
+def caches():
+    ''' Return a list of the registered caches. '''
+    with _registry_lock:
+        return list(_registry.values())
+
+def cache_info():
+    ''' Return the statistics of every registered cache, by name. '''
+    return dict((c.name, c.info()) for c in caches())
+
+def clear_all():
+    ''' Clear every registered cache. '''
+    for c in caches():
+        c.clear()
+
+def invalidate(setting):
+    ''' Clear the caches which depend upon a setting, such as 'precision' or
+    'exact_form', after it has been changed. '''
+    for c in caches():
+        if setting in c.depends_on:
+            c.clear()
+
+def lru_cache(maxsize=100, maxbytes=None, ttl=None, context=False,
+    depends_on=(), name=None):
+    ''' A decorator memoising a function in a Cache, which is available as
+    its cache attribute. The arguments to the function must be hashable.
+    If context is set, the fields of the decimal context which affect numeric
+    results form part of the key, so values computed at one precision are
+    never returned at another. '''
     def decorating_function(user_function):
-        cache = collections.OrderedDict()    # order: least recent to most recent
+        cache = Cache(name or '{}.{}'.format(user_function.__module__,
+            user_function.__name__), maxsize, maxbytes, ttl, depends_on)
+        missing = object()
 
         @functools.wraps(user_function)
         def wrapper(*args, **kwds):
             key = args
             if kwds:
-                key += tuple(sorted(kwds.items()))
-            try:
-                result = cache.pop(key)
-                wrapper.hits += 1
-            except KeyError:
+                key += (missing,) + tuple(sorted(kwds.items()))
+            if context:
+                key += context_key()
+            result = cache.get(key, missing)
+            if result is missing:
                 result = user_function(*args, **kwds)
-                wrapper.misses += 1
-                if len(cache) >= maxsize:
-                    cache.popitem(0)    # purge least recently used cache entry
-            cache[key] = result         # record recent use of this key
+                cache.set(key, result)
             return result
-        wrapper.hits = wrapper.misses = 0
+        wrapper.cache = cache
+        wrapper.cache_info = cache.info
+        wrapper.cache_clear = cache.clear
         return wrapper
     return decorating_function
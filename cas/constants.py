@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+''' Mathematical constants to the current decimal precision.
+
+Each constant is computed once, to a few more digits than were asked for, and
+then rounded to whatever precision it is requested at; the rounded values are
+remembered per precision. When a higher precision is needed than has been
+computed the constant is recomputed, growing the stored precision by at least
+half again each time so that a gradual increase in precision does not cause a
+recomputation at every step. All of the project's modules should take their
+constants from here rather than computing their own. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import math
+from decimal import Decimal, Inexact, getcontext, localcontext
+from threading import Lock
+
+# Project modules
+from cas.cache import Cache, context_key
+import cas.binary_splitting as binary_splitting
+
+# The number of digits computed beyond those requested
+GUARD_DIGITS = 10
+
+class Constant(object):
+    ''' A mathematical constant, computed on demand by the function compute
+    which takes the number of significant figures required. '''
+    def __init__(self, name, compute):
+        self.name = name
+        self.compute = compute
+        self.prec = 0
+        self.value = None
+        self.values = Cache('cas.constants.' + name, maxsize=20)
+        self.lock = Lock()
+
+    def __call__(self):
+        ''' Return the constant rounded to the current precision. '''
+        key = context_key()
+        value = self.values.get(key)
+        if value is None:
+            with self.lock:
+                if key[0] + GUARD_DIGITS > self.prec:
+                    prec = max(key[0] + GUARD_DIGITS, self.prec * 3 // 2)
+                    with localcontext() as c:
+                        c.prec = prec
+                        self.value = self.compute(prec)
+                    self.prec = prec
+                value = +self.value
+            self.values[key] = value
+        # The value has been rounded, even if it was not rounded by this call,
+        # which is signalled so that callers may know the result is inexact
+        getcontext().flags[Inexact] = True
+        return value
+
+    def clear(self):
+        ''' Forget all of the computed values. '''
+        with self.lock:
+            self.prec, self.value = 0, None
+        self.values.clear()
+
+    def __repr__(self):
+        return '<Constant {} ({} digits)>'.format(self.name, self.prec)
+
+def _euler_gamma(prec):
+    ''' Compute the Euler-Mascheroni constant by the Brent-McMillan algorithm
+    (B1), the error of which falls as exp(-4n). See:
+        - R. P. Brent and E. M. McMillan, Some new algorithms for
+          high-precision computation of Euler's constant, Math. Comp. 34
+          (1980), 305-312 '''
+    n = int(prec * math.log(10) / 4) + 1
+    # The sums grow to around exp(2n) before the terms become small
+    getcontext().prec += len(str(n))
+    n2 = n * n
+    A = U = -Decimal(n).ln()
+    B = V = Decimal(1)
+    k = 1
+    while True:
+        B = B * n2 / (k * k)
+        A = (A * n2 / k + B) / k
+        U += A; V += B
+        if k > n and V + B == V and U + A == U:
+            break
+        k += 1
+    return U / V
+
+constants = dict((c.name, c) for c in (
+    Constant('pi', lambda prec: binary_splitting.pi()),
+    Constant('e', lambda prec: binary_splitting.e()),
+    Constant('ln2', lambda prec: binary_splitting.ln2()),
+    Constant('ln10', lambda prec: Decimal(10).ln()),
+    Constant('sqrt2', lambda prec: Decimal(2).sqrt()),
+    Constant('euler_gamma', _euler_gamma),
+    Constant('golden_ratio', lambda prec: (1 + Decimal(5).sqrt()) / 2),
+))
+
+pi = constants['pi']
+e = constants['e']
+ln2 = constants['ln2']
+ln10 = constants['ln10']
+sqrt2 = constants['sqrt2']
+euler_gamma = constants['euler_gamma']
+golden_ratio = constants['golden_ratio']
+
+def clear():
+    ''' Forget the computed values of all of the constants. '''
+    for c in constants.values():
+        c.clear()
@@ -24,10 +24,11 @@ __author__ = 'Tom Wright <tom.tdw@gmail.com>'
 # Standard modules
 import math
 import re
-from decimal import Decimal
+import threading
+from decimal import Decimal, getcontext
 from functools import reduce, partial
 from operator import add, mul
-from numbers import Number
+from numbers import Number, Rational as RationalNumber
 
 # Third party modules
 import dmath
@@ -58,42 +59,126 @@ order.__doc__ = ''' Return the order of an equation '''
 evaluate = lambda y, x, variable=None: y(x, variable)\
     if hasattr(y, '__call__') else y
 evaluate.__doc__ = ''' Evaluate y at x '''
-
-def handle_type (x):
-    ''' Takes in a variable, x, and output it in the most desirable
-    type '''
+size = lambda a: getattr(a, '_size', 1)
+size.__doc__ = ''' Return the number of nodes in the tree of an expression '''
+depth = lambda a: getattr(a, '_depth', 1)
+depth.__doc__ = ''' Return the depth of the tree of an expression '''
+
+class ExpressionTooLarge(ValueError):
+    ''' Raised on building an expression larger than the limits set by
+    Algebra.max_size and Algebra.max_depth. '''
+
+def record_size(a, children):
+    ''' Store the size and depth of the expression a, calculated from those of
+    its children, aborting if either exceeds its limit. '''
+    a._size = 1 + sum(map(size, children))
+    a._depth = 1 + max(map(depth, children))
+    if Algebra.max_size is not None and a._size > Algebra.max_size:
+        raise ExpressionTooLarge('Expression of {} nodes exceeds the limit of'
+            ' {}'.format(a._size, Algebra.max_size))
+    elif Algebra.max_depth is not None and a._depth > Algebra.max_depth:
+        raise ExpressionTooLarge('Expression of depth {} exceeds the limit of'
+            ' {}'.format(a._depth, Algebra.max_depth))
+
+class _MachineFloats(threading.local):
+    ''' Whether handle_type leaves machine floats and complex numbers as they
+    are in a thread, rather than converting them to Reals and Complexs, so
+    that numeric work is done quickly in floating point (see
+    Calculator.set_mode). '''
+    enabled = False
+
+_machine_floats = _MachineFloats()
+
+def machine_floats():
+    ''' Whether numbers are being worked with as machine floats. '''
+    return _machine_floats.enabled
+
+def with_machine_floats(enabled, f, *args):
+    ''' Call f(*args) working with machine floats if enabled and otherwise
+    with Reals, restoring the previous mode afterwards. '''
+    previous = _machine_floats.enabled
+    _machine_floats.enabled = enabled
+    try:
+        return f(*args)
+    finally:
+        _machine_floats.enabled = previous
+
+# The substitutions converting expressions to the gnuplot format: variables
+# become x, implied multiplication by numbers and by brackets is made
+# explicit, and ^ is replaced with ** for powers
+_GNUPLOT_SUBSTITUTIONS = [(re.compile(pattern), replacement)
+    for pattern, replacement in [(r'[a-z]', r'x'), (r'([0-9])x', r'\1*x'),
+        (r'([^/ ])\(', r'\1*('), (r'\^', r'**')]]
+
+# Strings of digits which handle_type converts to numbers
+_INTEGER_STRING = re.compile(r'^[0-9]+$')
+_DECIMAL_STRING = re.compile(r'^[0-9]+\.[0-9]+$')
+
+# The functions by which handle_type converts each type, found from the type's
+# place in the numeric tower the first time a value of it is met
+_handlers = {}
+
+def _identity(x):
+    return x
+
+def _handler(t):
+    ''' Return the function by which handle_type converts values of type t. '''
     # Required types are imported within the scope of the function rather than
     # that of the module to prevent a circular dependency.
-    from cas.numeric import Integer, Complex, Real
-    if isinstance(x, Integer) or isinstance(x, Real)\
-        or isinstance(x,Complex):
-        # Leave Integers, Reals and Complexs unchanged.
+    from cas.numeric import Integer, Long, Rational, Complex, Real, _integer
+
+    def handle_str(x):
+        if _INTEGER_STRING.match(x):
+            # Convert strs representing integers to Integers
+            return Integer(x)
+        elif _DECIMAL_STRING.match(x):
+            # Convert strs representing decimals to Reals
+            return Real(x)
         return x
-    elif isinstance(x, int):
-        # Convert standard python ints to Integers.
-        return Integer(x)
-    elif isinstance(x, Decimal):
-        # Convert standard python Decimals to Reals
-        return Real(x)
-    elif isinstance(x, str) and re.match(r'^[0-9]+$', x):
-        # Convert strs representing integers to Integers
-        return Integer(x)
-    elif isinstance(x, str) and re.match(r'^[0-9]+\.[0-9]+$', x):
-        # Convert strs representing decimals to Reals
-        return Real(x)
-    elif isinstance(x, float):
-        # Convert standard python floats to Reals
-        return +Real(repr(x))
-    elif isinstance(x, complex):
-        # Handle complex numbers
-        if abs(x.imag) < 0.0001:
+
+    def handle_float(x):
+        # Leave machine numbers unchanged in machine float mode, otherwise
+        # convert standard python floats to Reals
+        return x if _machine_floats.enabled else +Real(repr(x))
+
+    def handle_complex(x):
+        if _machine_floats.enabled:
+            return x
+        elif abs(x.imag) < 0.0001:
             # Covert complex numbers with small imaginary parts to Reals.
             return +Real.from_float(x.real)
         else:
-            # Convert all other standard python 
+            # Convert all other standard python complex numbers
             return Complex(x)
+
+    if issubclass(t, (Integer, Long, Rational, Real, Complex)):
+        # Leave Integers, Rationals, Reals and Complexs unchanged.
+        return _identity
+    elif issubclass(t, (int, long)):
+        # Convert standard python ints and longs to Integers.
+        return _integer
+    elif issubclass(t, RationalNumber):
+        # Convert other exact fractions to Rationals.
+        return lambda x: Rational(x.numerator, x.denominator)
+    elif issubclass(t, Decimal):
+        # Convert standard python Decimals to Reals
+        return Real
+    elif issubclass(t, str):
+        return handle_str
+    elif issubclass(t, float):
+        return handle_float
+    elif issubclass(t, complex):
+        return handle_complex
     else:
-        return x
+        return _identity
+
+def handle_type (x):
+    ''' Takes in a variable, x, and output it in the most desirable
+    type '''
+    handler = _handlers.get(type(x))
+    if handler is None:
+        handler = _handlers[type(x)] = _handler(type(x))
+    return handler(x)
 # Set ht as a shortcut to handle_type.
 ht = handle_type
 
@@ -179,10 +264,34 @@ def partial_integral(y, x):
     I = expand(_partial_integral(y,x))
     return I + Symbol('c') if I != NotImplemented else NotImplemented
 
+def definite_integral(y, x, a, b):
+    ''' Return the integral of y with respect to x from a to b, exactly if y
+    can be integrated symbolically and otherwise numerically by adaptive
+    Gauss-Kronrod quadrature to around the working precision of floats '''
+    try:
+        I = partial_integral(y, x)
+    except (AttributeError, AssertionError, TypeError):
+        # Some forms which cannot be integrated symbolically fail part way
+        # rather than returning NotImplemented
+        I = NotImplemented
+    if I is not NotImplemented:
+        return I.limit(a, b, variable=x)
+    f = lambda t: float(evaluate(y, t, x))
+    tolerance = max(10.0**-getcontext().prec, 1e-13)
+    result = nm.quad(f, float(a), float(b), tolerance).value
+    return result if _machine_floats.enabled\
+        else Decimal.from_float(result).normalize()
+
 
 class Algebra (object):
     ''' A class to hold an arbitrary algebraic expression; the superclass of
     all algebraic classes '''
+    # The largest number of nodes and depth of an expression which may be
+    # built (None for no limit); expressions much deeper than this cannot be
+    # printed within the recursion limit
+    max_size = 1000000
+    max_depth = 150
+
     def __add__(self, other):
         return self if other == 0 else 2 * self if self == other\
             else Sum(self, other)
@@ -216,12 +325,16 @@ class Algebra (object):
         return self if other == 1 else 1 if other == 0\
             else Power(self, other)
 
+    def __rpow__(self, other):
+        return Power(other, self)
+
     def numerical_integral(self, method, a, b, *n):
         ''' Numerically integrate between b and a using the specified 
         method '''
         f = lambda x: float(self(x))
-        return Decimal.from_float(method(f, float(a), float(b),
-            *n)).normalize()
+        result = method(f, float(a), float(b), *n)
+        return result if _machine_floats.enabled\
+            else Decimal.from_float(result).normalize()
 
     def trapezoidal_integral(self, *a):
         ''' Numerically integrate via the trapezium rule '''
@@ -240,6 +353,11 @@ class Algebra (object):
         accurate method currently supported) '''
         return self.numerical_integral(nm.romberg_integral, *a)
 
+    def quad_integral(self, *a):
+        ''' Numerically integrate by adaptive Gauss-Kronrod quadrature '''
+        return self.numerical_integral(
+            lambda f, a, b, *n: nm.quad(f, a, b, *n).value, *a)
+
     def limit(self, a, b, variable=None):
         ''' Take the limit between a and b '''
         return expand(self(b, variable=variable) - self(a, variable=variable))
@@ -247,13 +365,8 @@ class Algebra (object):
     def as_gnuplot_expression(self):
         ''' Convert into the gnuplot format '''
         expr = str(self)
-        expr = re.sub(r'[a-z]', r'x', expr, 100)
-        # Add * from multiplication
-        expr = re.sub(r'([0-9])x', r'\1*x', expr, 100)
-        # Add * for bracket multiplication
-        expr = re.sub(r'([^/ ])\(', r'\1*(', expr, 100)
-        # Replace ^ with ** for powers
-        expr = re.sub(r'\^', r'**', expr, 100)
+        for pattern, replacement in _GNUPLOT_SUBSTITUTIONS:
+            expr = pattern.sub(replacement, expr, 100)
         return expr
 
 class Symbol(Algebra):
@@ -289,7 +402,7 @@ class Symbol(Algebra):
 
     def partial_differential(self, x):
         ''' Return the partial differential with respect to x. '''
-        return ht(1) if self == x else y
+        return ht(1) if self == x else ht(0)
 
     def partial_integral(self, x):
         ''' Return the partial integral with respect to x. '''
@@ -350,12 +463,14 @@ class Product(Algebra):
         rank_type = lambda a: (1*I(a, Number) + 2*I(a, Symbol) + 3*I(a, Power)
             + 4*I(a, Product) + 5*I(a, Sum) + 6*I(a, Function))
         rank = lambda a: 10000*rank_type(a) + (ord(str(a)) if I(a, Symbol)
-            else ord(str(a.a())) if I(a, Power) and I(a.b(), Symbol)
+            else ord(str(a.a())) if I(a, Power) and I(a.a(), Symbol)
+                and I(a.b(), Symbol)
             else 100)
 
         terms = list(dedup(mul, sorted(a, key=rank), 1))
         if len(terms) > 1 and terms[0] != 0:
             b = Algebra.__new__(self); b.__terms = terms
+            record_size(b, terms)
             return b
         else:
             # For the product of 1 element, just return that element
@@ -437,8 +552,24 @@ class Product(Algebra):
 
 class Fraction(Algebra):
     ''' A class representing a fraction. '''
-    def __init__(self, a, b):
-        self.__numerator, self.__denominator = ht(a), ht(b)
+    def __new__(cls, a, b):
+        # Cancel any factors common to the numerator and denominator so that
+        # the size of quotients does not grow without bound.
+        from cas.polynomials import cancel
+        a, b = cancel(ht(a), ht(b))
+        if b == 1:
+            # A fraction over one is just its numerator
+            return a
+        elif isinstance(a, Number) and isinstance(b, Number):
+            # Fractions which cancel down to numbers are left as numbers
+            return a / b
+        elif isinstance(b, (RationalNumber, Decimal)) and b < 0:
+            # The sign of a negative denominator is moved to the numerator
+            return Fraction(expand(-a), -b)
+        c = Algebra.__new__(cls)
+        c.__numerator, c.__denominator = a, b
+        record_size(c, (a, b))
+        return c
 
     def __mul__(self, other):
         from matrices import Matrix
@@ -467,7 +598,7 @@ class Fraction(Algebra):
     def partial_differential(self, x):
         ''' Return the partial differential with respect to x. '''
         # Quotient rule
-        (partial_differential(self.numerator(),x)*self.denominator()
+        return (partial_differential(self.numerator(),x)*self.denominator()
             - partial_differential(self.denominator(),x)*self.numerator())\
             / self.denominator()**2
     
@@ -479,7 +610,8 @@ class Fraction(Algebra):
 
     def __call__(self, x, variable=None):
         ''' Evaluate the fraction when variable = x '''
-        return self.numerator()(x, variable) / self.denominator()(x, variable)
+        return evaluate(self.numerator(), x, variable)\
+            / evaluate(self.denominator(), x, variable)
 
     # This set identifies in which circumstances an expression needs to be
     # surrounded by brackets
@@ -499,6 +631,7 @@ class Sum(Algebra):
         terms = list(dedup(add, sorted(a, key=rank), ht(0)))
         if len(terms) > 1:
             b = Algebra.__new__(self); b.__terms = terms
+            record_size(b, terms)
             return b
         else:
             # For the sum of one element, just return that element
@@ -538,10 +671,11 @@ class Sum(Algebra):
 
     def __repr__(self):
         ''' Return the string representation of the sum. '''
+        from cas.numeric import Complex
         def sf(a):
             ''' A particularly complicated function to return a term in a
             string as the simplest possible mathematical expression '''
-            if isinstance(a, Product) and isinstance(a[0], complex):
+            if isinstance(a, Product) and isinstance(a[0], Complex):
                 return ' ' + ('- ' + m_str(handle_type(abs(a[0].imag))
                     if a[0].real > -0.00001 else -a[0])
                     if a[0].imag < 0 and a[0].real < 0.00001
@@ -549,7 +683,7 @@ class Sum(Algebra):
             if isinstance(a, Product) and isinstance(a[0], Number):
                 return ' ' + ('-' if a[0] < 0 else '+') + ' '\
                     + str(abs(a[0]) * a[1:])
-            elif isinstance(a, complex):
+            elif isinstance(a, Complex):
                 return ' ' + ('- ' + a_str(handle_type(abs(a.imag))
                     if a.real > -0.00001 else -a)
                     if a.imag < 0 and a.real < 0.00001 else '+ ' + a_str(a))
@@ -586,7 +720,13 @@ class Sum(Algebra):
         g = expand(self if isinstance(self[0], (Symbol, Power))\
             else self * (1 / self[0][0]))
 
-        # Invoke the Durand-Kerner method
+        # Invoke the Durand-Kerner method, polishing the roots to the working
+        # precision when the coefficients are known
+        from cas.polynomials import coefficients, variables
+        vs = variables(g)
+        p = coefficients(g, Symbol(vs.pop())) if vs and len(vs) == 1 else None
+        if p is not None and not any(isinstance(c, Complex) for c in p):
+            return nm.polynomial_roots(p, n)
         f = lambda x: complex(g(x))
         roots = nm.durand_kerner_roots(f, self.order(), n)
         return map(Complex, roots)
@@ -617,6 +757,7 @@ class Power(Algebra):
     def __init__(self, a, b):
         self.__a = ht(a)
         self.__b = ht(b)
+        record_size(self, (self.__a, self.__b))
 
     def __call__(self, x, variable=None):
         ev = partial(evaluate, variable=variable, x=x)
@@ -673,6 +814,7 @@ class Function(Algebra):
         self.__name = str(name)
         self.__argument = argument
         self.__action = action
+        record_size(self, (argument,))
 
     def x(self):
         ''' Return the expression the function is in terms of '''
@@ -693,20 +835,25 @@ class Function(Algebra):
         else:
             return NotImplemented
 
+def numeric_function(decimal, machine):
+    ''' Return a function evaluating exact and decimal numbers with decimal
+    (from dmath) and machine floats, or any number in float mode, with
+    machine (from math). '''
+    return lambda x: decimal(x) if isinstance(x, (Decimal, RationalNumber))\
+        and not _machine_floats.enabled else machine(x)
+
 class Ln(Function):
     ''' A class representing the natural logarithm of an algebraic
     expression '''
     def __init__(self, argument):
-        from cas.numeric import Integer
-        Function.__init__(self, 'ln', argument, action=lambda x: dmath.log(x)
-            if isinstance(x, (Decimal, Integer)) else math.log(x))
+        Function.__init__(self, 'ln', argument,
+            action=numeric_function(dmath.log, math.log))
 
 class Sin(Function):
     ''' A class representing the sine of an algebraic expression '''
     def __init__(self, argument):
-        from cas.numeric import Integer
-        Function.__init__(self, 'sin', argument, action=lambda x: dmath.sin(x)
-            if isinstance(x, (Decimal, Integer)) else math.sin(x))
+        Function.__init__(self, 'sin', argument,
+            action=numeric_function(dmath.sin, math.sin))
             
     def partial_integral(self, x):
         assert x == self.x()
@@ -715,9 +862,8 @@ class Sin(Function):
 class Cos(Function):
     ''' A class representing the cosine of an algebraic expression '''
     def __init__(self, argument):
-        from cas.numeric import Integer
-        Function.__init__(self, 'cos', argument, action=lambda x: dmath.cos(x)
-            if isinstance(x, (Decimal, Integer)) else math.cos(x))
+        Function.__init__(self, 'cos', argument,
+            action=numeric_function(dmath.cos, math.cos))
 
     def partial_integral(self, x):
         assert x == self.x()
@@ -726,10 +872,17 @@ class Cos(Function):
 class Tan(Function):
     ''' A class representing the tangent of an algebraic expression '''
     def __init__(self, argument):
-        from cas.numeric import Integer
         Function.__init__(self, 'tan', argument,
-            action=lambda x: dmath.tan(x if isinstance(x, (Decimal, Integer))
-            else math.tan(x)))
+            action=numeric_function(dmath.tan, math.tan))
+
+class Factorial(Function):
+    ''' A class representing the factorial of an algebraic expression '''
+    def __init__(self, argument):
+        from cas.statistics import factorial
+        Function.__init__(self, 'factorial', argument, action=factorial)
+
+    def __repr__(self):
+        return p_str(self.x()) + '!'
 
 class List():
     ''' A list type suitable for displaying variables '''
@@ -18,26 +18,39 @@ __author__ = 'Tom Wright <tom.tdw@gmail.com>'
 # You should have received a copy of the GNU General Public License along with
 # C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
 
-def gcd(a, b):
-    ''' A recursive implementation of the euclidean greatest common divisor
-    algorithm. '''
-    def _gcd_div(a, b):
-        return a if b == 1 else _gcd_div(b, a % b)
+# Standard modules
+from numbers import Number
+
+# Project modules
+from cas.core import handle_type as ht
+
+def _gcd_div(a, b):
+    ''' Euclid's algorithm. Integers (including those too large for a machine
+    integer) are handled as python integers so that the result is exact. '''
+    if isinstance(a, (int, long)) and isinstance(b, (int, long)):
+        a, b = int(a), int(b)
+    while b != 0:
+        a, b = b, a % b
+    return abs(a)
 
-    def _gcd_sub(a, b):
-        if a == 0: return b
-        while b != 0:
-            if a > b: a = a - b
-            else: b = b - a
-        return a
+def gcd(a, b):
+    ''' The greatest common divisor of a and b. Numbers are handled using
+    Euclid's algorithm and algebraic expressions as polynomials. '''
+    if isinstance(a, Number) and isinstance(b, Number):
+        return ht(_gcd_div(a, b))
+    else:
+        from cas.polynomials import polynomial_gcd
+        return polynomial_gcd(ht(a), ht(b))
 
-    if isinstance(a, int) and isinstance(b, int):
-        return _gcd_div(a, b)
+def lcm(a, b):
+    ''' The lowest common multiple of a and b. '''
+    if isinstance(a, Number) and isinstance(b, Number):
+        g = _gcd_div(a, b)
+        return ht(abs(a * b) // g if g else 0)
     else:
-        return _gcd_sub(a, b)
+        return ht(a) * ht(b) / gcd(a, b)
 
 if __name__ == '__main__':
     from cas.core import Symbol
     x = Symbol('x')
     print (gcd(6*x, 5*x))
-
@@ -26,7 +26,7 @@ from decimal import Decimal
 from operator import mul
 
 # Project modules
-from cas.core import Algebra, Product, Symbol, expand
+from cas.core import Algebra, Product, Symbol, expand, handle_type
 from cas.numeric import Integer
 
 def identity_matrix(n):
@@ -62,7 +62,7 @@ class Matrix(Algebra):
         elif len(a) == 1 and reduce(lambda a, b: a == b, map(len, a)):
             # If passed a multidimensional list with equal length rows,
             # use that for initial values.
-            self.__values = list(a[0])
+            self.__values = [list(map(handle_type, row)) for row in a[0]]
             self.__rows = len(self.__values)
             self.__cols = len(self.__values[0])
             # Check the multidimensional list passed is valid
@@ -156,7 +156,6 @@ class Matrix(Algebra):
         matrices can be derived recursively from it. '''
         if self.__rows == self.__cols:
             L, U = self.LU_decomposition()
-            print L, U
             return reduce(mul, [U[i][i] for i in range(self.__rows)],
                 Integer(1))
         # if self.__rows == self.__cols == 1:
@@ -242,7 +241,7 @@ class Matrix(Algebra):
     def LU_decomposition(self):
         ''' Split a square matrix into an upper and lower triangle matrix '''
         n = self.order()[0]
-        L = identity_matrix(n); U = Matrix(self.__values)
+        L = identity_matrix(n); U = Matrix([list(row) for row in self.__values])
 
         # Perform Gaussian elimination to find L and U
         for j in range(n):
@@ -19,64 +19,118 @@ __author__ = 'Tom Wright <tom.tdw@gmail.com>'
 # C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
 
 # Standard modules
-from decimal import Decimal, getcontext, localcontext
+import fractions
+import sys
+import threading
+from decimal import Decimal, Inexact, getcontext, localcontext
 from functools import reduce
 from operator import mul
 from copy import copy, deepcopy
 from numbers import Number
 
-# Third party modules
-from dmath import pi
-
 # Project modules
 from cas.cache import lru_cache
-from cas.core import handle_type, a_str, m_str
-import cas.numerical_methods as nm
-
-class Integer(int):
-    ''' An extended integer class, providing better mathematical
-    handling of integers '''
+from cas.core import handle_type, a_str, m_str, _identity
+from cas.recognition import recognise
+
+def _integer(n):
+    ''' Convert a python integer to an Integer, or to a Long if it is too large
+    for a machine integer. Small Integers are shared rather than built
+    afresh. '''
+    i = _small_integers.get(n)
+    if i is not None:
+        return i
+    return Integer(n) if -sys.maxint - 1 <= n <= sys.maxint else Long(n)
+
+def _rational(n, d=1):
+    ''' Return n/d in lowest terms as an Integer if it is whole or as a
+    Rational otherwise. '''
+    a = n if isinstance(n, fractions.Fraction) and d == 1\
+        else fractions.Fraction(n, d)
+    if a.denominator == 1:
+        return _integer(a.numerator)
+    else:
+        return a if isinstance(a, Rational)\
+            else Rational(a.numerator, a.denominator)
+
+def _iroot(n, k):
+    ''' Return the exact kth root of the natural number n, or None if n is not
+    a perfect kth power. '''
+    if n < 2:
+        return n
+    # Newton's method, starting from a power of two above the root
+    x = 1 << -(-n.bit_length() // k)
+    while True:
+        y = ((k - 1) * x + n // x ** (k - 1)) // k
+        if y >= x: break
+        x = y
+    return x if x ** k == n else None
+
+def _root_power(a, b):
+    ''' Raise the rational a to the rational power b, exactly whenever the
+    result is itself rational. '''
+    q = b.denominator
+    if a >= 0 or q % 2:
+        n = _iroot(abs(a.numerator), q)
+        d = _iroot(a.denominator, q)
+        if n is not None and d is not None:
+            return _rational(n if a >= 0 else -n, d) ** _integer(b.numerator)
+    return Real(a) ** Real(b)
+
+class _IntegerArithmetic(object):
+    ''' The exact arithmetic shared by Integers and Longs, whose results are
+    Integers, Longs or Rationals. '''
     def __truediv__(self, other):
-        if isinstance(other, int) or isinstance(other, Decimal):
-            if self % other == 0:
-                return Integer(self // other)
-            else:
-                return Real(self) / Real(other)
+        if isinstance(other, (int, long)):
+            return _rational(int(self), int(other))
+        elif isinstance(other, Decimal):
+            return Real(self) / Real(other)
+        else:
+            return NotImplemented
+
+    def __rtruediv__(self, other):
+        if isinstance(other, (int, long)):
+            return _rational(int(other), int(self))
         else:
             return NotImplemented
 
     def __sub__(self, other):
-        if isinstance(other, int):
-            return Integer(int(self) - int(other))
+        if isinstance(other, (int, long)):
+            return _integer(int(self) - int(other))
         else:
             return NotImplemented
 
     def __pow__(self, other):
-        if isinstance(other, int):
-            return self.__class__(int(self) ** other)
+        if isinstance(other, (int, long)) and other >= 0:
+            return _integer(int(self) ** int(other))
+        elif isinstance(other, (int, long)):
+            # Negative powers are exact fractions
+            return _rational(1, int(self) ** -int(other))
         else:
             return NotImplemented
 
     def __rpow__(self, other):
-        if isinstance(other, int):
-            return Integer(other ** int(self))
+        if isinstance(other, (int, long)):
+            return _integer(other) ** self
         else:
             return NotImplemented
 
     def __rsub__(self, other):
-        if isinstance(other, int):
-            return Integer(int(other) - int(self))
+        if isinstance(other, (int, long)):
+            return _integer(int(other) - int(self))
+        else:
+            return NotImplemented
 
     def __add__(self, other):
-        if isinstance(other, int):
-            return Integer(int(self) + int(other))
+        if isinstance(other, (int, long)):
+            return _integer(int(self) + int(other))
         else:
             return NotImplemented
     __radd__ = __add__
 
     def __mul__(self, other):
-        if isinstance(other, int):
-            return Integer(int(self) * int(other))
+        if isinstance(other, (int, long)):
+            return _integer(int(self) * int(other))
         else:
             return NotImplemented
     __rmul__ = __mul__
@@ -85,23 +139,16 @@ class Integer(int):
         return self
 
     def _factors(self):
-        ''' Naively factorise an integer using trial division. '''
-        # Copy self to a
-        a = self
-
-        if a < 0:
+        ''' Factorise an integer by trial division by small primes, Pollard's
+        rho method and the elliptic curve method (see cas.primes). '''
+        from cas.primes import factorise
+        if self == 0:
+            raise ValueError('Zero has no prime factorisation')
+        elif self < 0:
             # Handle negative numbers
-            a = abs(a)
-            yield Integer(-1)
-
-        i = Integer(2)
-        while a > 1:
-            if a % i == 0:
-                # Return all other integral factors greater that one
-                yield i
-                a /= i
-            else:
-                i += 1
+            yield _integer(-1)
+        for p in factorise(abs(int(self))):
+            yield _integer(p)
 
     def factors(self):
         ''' The Fundamental Theorem of Arithmetic states that every integer
@@ -110,46 +157,274 @@ class Integer(int):
         from cas.core import List
         return List(*self._factors())
 
+class Integer(_IntegerArithmetic, int):
+    ''' An extended integer class, providing better mathematical
+    handling of integers '''
+
+class Long(_IntegerArithmetic, long):
+    ''' An Integer too large to be held as a machine integer. '''
+
+# The Integers shared by _integer, which being immutable may be shared safely
+# between all callers and both dispatch tables
+_small_integers = dict((n, Integer(n)) for n in range(-256, 1025))
+
+# Number theoretic functions of integers (see cas.primes)
+def _whole(*xs):
+    ''' Check that the arguments are whole numbers, returning them as python
+    integers. '''
+    if not all(isinstance(x, (int, long)) or isinstance(x, Decimal)
+        and x.is_finite() and x == x.to_integral_value() for x in xs):
+        raise ValueError('Expected whole numbers')
+    return [int(x) for x in xs]
+
+def isprime(n):
+    ''' Test whether n is prime. '''
+    from cas.primes import is_prime
+    return is_prime(*_whole(n))
+
+def factors(n):
+    ''' Return a List of the prime factors of the whole number n (see
+    Integer.factors). '''
+    return _integer(*_whole(n)).factors()
+
+def nextprime(n):
+    ''' The smallest prime greater than n. '''
+    from cas.primes import next_prime
+    return _integer(next_prime(*_whole(n)))
+
+def prevprime(n):
+    ''' The largest prime less than n. '''
+    from cas.primes import previous_prime
+    return _integer(previous_prime(*_whole(n)))
+
+def primepi(n):
+    ''' The number of primes less than or equal to n. '''
+    from cas.primes import prime_count
+    return _integer(prime_count(*_whole(n)))
+
+def primes(a, b=None):
+    ''' Return a List of the primes from a to b inclusive (or up to a if
+    only one bound is given). '''
+    from cas.core import List
+    from cas.primes import primes_between
+    a, b = _whole(0, a) if b is None else _whole(a, b)
+    return List(*map(_integer, primes_between(a, b + 1)))
+
+def totient(n):
+    ''' Euler's totient function of the natural number n. '''
+    from cas.primes import totient
+    n, = _whole(n)
+    if n < 1:
+        raise ValueError('The totient is only defined for natural numbers')
+    return _integer(totient(n))
+
+def divisors(n):
+    ''' Return a List of the positive divisors of n. '''
+    from cas.core import List
+    from cas.primes import divisors
+    n, = _whole(n)
+    if n == 0:
+        raise ValueError('Every integer divides zero')
+    return List(*map(_integer, divisors(abs(n))))
+
+def modinv(a, m):
+    ''' The inverse of a modulo m. '''
+    from cas.primes import inverse_mod
+    a, m = _whole(a, m)
+    if m < 1:
+        raise ValueError('The modulus must be a natural number')
+    return _integer(inverse_mod(a, m))
+
+def powmod(a, b, m):
+    ''' Raise a to the power b modulo m, taking negative powers of the
+    inverse of a. '''
+    from cas.primes import inverse_mod
+    a, b, m = _whole(a, b, m)
+    if m < 1:
+        raise ValueError('The modulus must be a natural number')
+    if b < 0:
+        a, b = inverse_mod(a, m), -b
+    return _integer(pow(a, b, m))
+
+def _exact_operator(name):
+    ''' Wrap the arithmetic method name of fractions.Fraction so that exact
+    results are returned as Integers or Rationals and any operation involving
+    an inexact number is carried out on Reals instead. '''
+    method = getattr(fractions.Fraction, name)
+    def operator(self, other):
+        if isinstance(other, (int, long, fractions.Fraction)):
+            return _rational(method(self, other))
+        elif isinstance(other, (Decimal, float)):
+            return getattr(Real(self), name)(other)
+        else:
+            return NotImplemented
+    operator.__name__ = name
+    return operator
+
+class Rational(fractions.Fraction):
+    ''' A class representing an exact fraction of two integers, held in its
+    lowest terms. Rationals only become Reals when combined with an inexact
+    number. '''
+    __add__ = _exact_operator('__add__')
+    __radd__ = _exact_operator('__radd__')
+    __sub__ = _exact_operator('__sub__')
+    __rsub__ = _exact_operator('__rsub__')
+    __mul__ = _exact_operator('__mul__')
+    __rmul__ = _exact_operator('__rmul__')
+    __truediv__ = _exact_operator('__truediv__')
+    __rtruediv__ = _exact_operator('__rtruediv__')
+
+    def __pow__(self, other):
+        if isinstance(other, (int, long)):
+            return _rational(fractions.Fraction.__pow__(self, other))
+        elif isinstance(other, fractions.Fraction):
+            return _root_power(self, other)
+        elif isinstance(other, (Decimal, float)):
+            return Real(self) ** other
+        else:
+            return NotImplemented
+
+    def __rpow__(self, other):
+        if isinstance(other, (int, long, fractions.Fraction)):
+            return _root_power(fractions.Fraction(other), self)
+        elif isinstance(other, (Decimal, float)):
+            return other ** Real(self)
+        else:
+            return NotImplemented
+
+    def __pos__(self):
+        return self
+
+    def __neg__(self):
+        return Rational(-self.numerator, self.denominator)
+
+    def __abs__(self):
+        return Rational(abs(self.numerator), self.denominator)
+
+    def __eq__(self, other):
+        if isinstance(other, Decimal):
+            # Compare exactly against the value of the decimal
+            return other.is_finite()\
+                and self == fractions.Fraction(other)
+        else:
+            return fractions.Fraction.__eq__(self, other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def _richcmp(self, other, op):
+        if isinstance(other, Decimal):
+            if other.is_finite():
+                other = fractions.Fraction(other)
+            else:
+                return op(float(self), float(other))
+        return fractions.Fraction._richcmp(self, other, op)
+
+    def __reduce__(self):
+        return (Rational, (self.numerator, self.denominator))
+
+    def __str__(self):
+        if Real.exact_form:
+            return '{}/{}'.format(self.numerator, self.denominator)
+        else:
+            return str(Real(self))
+
+    def __repr__(self):
+        return 'Rational({}, {})'.format(self.numerator, self.denominator)
+
+    @property
+    def _hints(self):
+        ''' Fractions need brackets in products, fractions and indices. '''
+        return {'m','f','p'} if Real.exact_form else set()
+
 # Use a least recently used cache to prevent redundant conversions of real 
-# numbers to strings.
-@lru_cache(maxsize=1000)
+# numbers to strings; its key includes the precision of the context.
+@lru_cache(maxsize=1000, context=True, depends_on=('precision',))
 def _real_str(y, exact_form, prec_offset):
     ''' Convert a Real number to a string, with nice display.
     Returns a tuple containing the string an a bool indicating whether changes
     have been made. The function works in floats and is cached for speed. '''
-    small = 5 * 10**(-5)
-    x = float(y)
-    if abs(x - int(x)) < small:
-        return (str(int(x)), False)
-
-    if exact_form and abs(x) > small:
-        # Show pi in full
-        if abs(x - float(pi())) < small: return ('pi', True)
-
-        # Display small fractions as such
-        a, b = nm.to_fraction(x)
-        if b < 50: return ('{}/{}'.format(a,b), True) if b != 1\
-            else (str(a), False)
-
-        # Display small fractional coefficients of pi in exact form
-        q = x / float(pi()); a, b = nm.to_fraction(q);
-        if b <= 12:
-            return ((str(a) if a != 1 else '') + 'pi'\
-                    + ('/' + str(b) if b != 1 else ''), True)
-
-        # Sort out square roots
-        for n in [2,3,5,6,7,10,11,13]:
-            q = x / n ** 0.5
-            a, b = nm.to_fraction(q)
-            if b <= 100:
-                return ((str(a) + '*' if a != 1 else '') + str(n) + '^(1/2)'\
-                    + ('/' + str(b) if b != 1 else ''), True)
+    if not y.is_finite():
+        return ('-inf' if y < 0 else 'inf', False) if y.is_infinite()\
+            else ('nan', False)
+    # Numbers too small to be shown to the displayed precision are zero
+    display = getcontext().prec - prec_offset
+    if abs(y) < Decimal(5).scaleb(-display - 2):
+        return ('0', False)
+
+    # Only half of the guard digits are trusted to be correct
+    trusted = getcontext().prec - prec_offset // 2
+    if exact_form:
+        form = recognise(y, trusted)
+        if form is not None:
+            return form
+    else:
+        n = y.to_integral_value()
+        if abs(y - n) <= abs(y).scaleb(-trusted):
+            return (str(int(n)), False)
 
     # Otherwise display as a decimal
     with localcontext():
         getcontext().prec -= prec_offset
         return (str(Decimal(y).normalize()), False)
 
+class _Accuracy(threading.local):
+    ''' The estimated accuracy of the Reals calculated in a thread. '''
+    tracking = False
+    digits = None
+
+_accuracy = _Accuracy()
+
+def estimate_accuracy(f, *args):
+    ''' Call f(*args), returning its result along with an estimate of the
+    fewest significant figures left correct in the sum or difference of any
+    two Reals in the meantime, or None if no digits were lost.
+
+    Each addition or subtraction which cancels leading digits, after a
+    rounding error has been made, is taken to leave only the digits of the
+    working precision beyond those cancelled correct; a sum cancelling to
+    zero leaves none. This is a running estimate rather than a bound: losses
+    spread over many operations, as in the sum of an alternating series, are
+    not accumulated. '''
+    tracking, digits = _accuracy.tracking, _accuracy.digits
+    _accuracy.tracking, _accuracy.digits = True, None
+    try:
+        return f(*args), _accuracy.digits
+    finally:
+        if digits is not None and (_accuracy.digits is None
+            or digits < _accuracy.digits):
+            _accuracy.digits = digits
+        _accuracy.tracking = tracking
+
+def ignore_accuracy(f, *args):
+    ''' Call f(*args) without estimating the accuracy of the Reals it
+    calculates, for functions accurate to the working precision whatever
+    digits they cancel along the way (such as Newton's method, which makes
+    its residuals small). '''
+    tracking = _accuracy.tracking
+    _accuracy.tracking = False
+    try:
+        return f(*args)
+    finally:
+        _accuracy.tracking = tracking
+
+def _cancellation(a, b, result):
+    ''' Record the significant figures left in result, the sum of a and b,
+    for estimate_accuracy and return it. '''
+    if _accuracy.tracking and a and b:
+        context = getcontext()
+        if context.flags[Inexact]:
+            digits = context.prec + result.adjusted()\
+                - max(a.adjusted(), b.adjusted()) if result else 0
+            if digits < context.prec and (_accuracy.digits is None
+                or digits < _accuracy.digits):
+                _accuracy.digits = digits
+    return result
+
+# Builds a Decimal of a subclass from another Decimal without conversion
+_new = Decimal.__new__
+
 class Real(Decimal):
     ''' A class to provide better handling of real numbers '''
     # Print this fewer significant figures than are used internally
@@ -157,187 +432,351 @@ class Real(Decimal):
     # Print fractions as fractions including pi and square roots
     exact_form = True 
 
-    def __init__(self, x='0'):
-        self.__string, a = _real_str(x, self.__class__.exact_form,
-            self.__class__.prec_offset)
-        self._hints = {'m','f','p'} if a else {}
+    def __new__(cls, x='0', context=None):
+        if isinstance(x, fractions.Fraction):
+            # Rationals are converted at the current precision
+            x = Decimal(x.numerator) / Decimal(x.denominator)
+        return Decimal.__new__(cls, x, context)
+
+    # The display string and hints, with the settings they were made for
+    __display = None
+
+    def _display(self):
+        ''' Return the display string and hints of the number. These are only
+        formatted when first needed, and again if the display settings have
+        changed since. '''
+        key = (self.__class__.exact_form, self.__class__.prec_offset,
+            getcontext().prec)
+        if self.__display is None or self.__display[0] != key:
+            string, a = _real_str(self, key[0], key[1])
+            self.__display = (key, string, {'m','f','p'} if a else {})
+        return self.__display
+
+    @property
+    def _hints(self):
+        return self._display()[2]
 
     def __str__(self):
-        return self.__string
+        return self._display()[1]
 
     def __repr__(self):
         return "'" + super(Real,self).__str__() + "'"
 
+    def __reduce__(self):
+        # Decimal pickles via str, which may be in exact form e.g. 'pi'
+        return (self.__class__, (super(Real,self).__str__(),))
+
     def __float__(self):
         return float(super(Real,self).__str__())
 
+    # Results are built directly as Reals from the Decimals they are found as,
+    # rather than through Real.__new__
     def __add__(self, other, context=None):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Real(super(Real,self).__add__(other, context))
+        if other is NotImplemented: return other
+        return _cancellation(self, other,
+            _new(Real, Decimal.__add__(self, other, context)))
     __radd__ = __add__
 
     def __sub__(self, other, context=None):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Real(super(Real,self).__sub__(other, context))
+        if other is NotImplemented: return other
+        return _cancellation(self, other,
+            _new(Real, Decimal.__sub__(self, other, context)))
 
     def __rsub__(self, other, context=None):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Real(super(Real,self).__rsub__(other, context))
+        if other is NotImplemented: return other
+        return _cancellation(self, other,
+            _new(Real, Decimal.__sub__(other, self, context)))
 
     def __mul__(self, other, context=None):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Real(super(Real,self).__mul__(other, context))
+        if other is NotImplemented: return other
+        return _new(Real, Decimal.__mul__(self, other, context))
     __rmul__ = __mul__
 
     def __truediv__(self, other, context=None):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Real(super(Real,self).__truediv__(other, context))
+        if other is NotImplemented: return other
+        return _new(Real, Decimal.__truediv__(self, other, context))
 
     def __rtruediv__(self, other, context=None):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Real(super(Real,self).__rtruediv__(other, context))
-
+        if other is NotImplemented: return other
+        return _new(Real, Decimal.__truediv__(other, self, context))
 
     def __pow__(self, other, context=None):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return self.__class__(Decimal(self) ** other)
+        if other is NotImplemented: return other
+        if self < 0 and other != other.to_integral_value():
+            # Fractional powers of negative numbers are complex
+            return Complex._new(self, Real(0)) ** other
+        return self.__class__(Decimal(self) ** Decimal(other))
 
     def __rpow__(self, other, context=None):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return self.__class__(Decimal(other) ** Decimal(self))
+        if other is NotImplemented: return other
+        return other.__pow__(self)
 
     def __pos__(self, context=None):
-        return Real(super(Real,self).__pos__(context))
+        return _new(Real, Decimal.__pos__(self, context))
 
     def __neg__(self, context=None):
-        return Real(super(Real,self).__neg__(context))
+        return _new(Real, Decimal.__neg__(self, context))
 
     def __deepcopy__(self, memo=None):
-        return Real(eval(repr(self)))
+        # Reals are immutable so may be shared rather than copied
+        return self
     __copy__ =  __deepcopy__
 
     def _convert_other(self, other):
-        if isinstance(other, Real):
-            return other
-        elif isinstance(other, float):
-            return Real(self.from_float(other))
-        elif isinstance(other, Number) and not isinstance(other, complex):
-            return Real(other)
-        else:
-            return NotImplemented
+        convert = _coercions.get((Real, type(other)))
+        if convert is None:
+            convert = _coercion(Real, type(other))
+        return convert(other)
+
+def _real(x):
+    ''' Convert a real number to a Real, as handle_type does. '''
+    if isinstance(x, Real):
+        return x
+    elif isinstance(x, float):
+        return +Real(repr(x))
+    else:
+        return Real(x)
+
+class Complex(Number):
+    ''' A complex number, the real and imaginary parts of which are Reals
+    held at the working precision. Numbers with no imaginary part are Reals
+    instead. '''
+    __slots__ = ('real', 'imag')
+
+    def __new__(cls, real=0, imag=0):
+        if isinstance(real, (complex, Complex)):
+            real, imag = real.real, real.imag + imag
+        real, imag = _real(real), _real(imag)
+        if not imag:
+            return real if real else _integer(0)
+        return cls._new(real, imag)
+
+    @classmethod
+    def _new(cls, real, imag):
+        ''' Build a complex number from two Reals, without simplification. '''
+        z = Number.__new__(cls)
+        z.real, z.imag = real, imag
+        return z
+
+    def __reduce__(self):
+        return (Complex, (self.real, self.imag))
 
-class Complex(complex):
-    ''' A class to provide better handling of complex numbers '''
-    def __new__(self, x):
-        small = 0.00001
-        x = complex(x)
-        # Complex numbers sufficiently small in magnitide should be replaced
-        # with zero.
-        if abs(x.real) < small and abs(x.imag) < small:
-            return Integer(0)
-        # Complex numbers very close to Real numbers should be replaced with 
-        # the Real number.
-        elif abs(x.imag) < small:
-            return handle_type(x.real)
-        else:
-            a = complex.__new__(self, x)
-            # Do not display brackets in multiplication if a number is close to
-            # the set of imaginary numbers.
-            if abs(x.real) < small: a._hints = {'a'}
-            else: a._hints = {'d','m','p','a'}
-            return a
+    def __deepcopy__(self, memo=None):
+        # Complex numbers are immutable so may be shared rather than copied
+        return self
+    __copy__ = __deepcopy__
 
     def __repr__(self):
-        r, i = +Real().from_float(self.real), +Real().from_float(self.imag)
-        small = Real('0.00001')
-        R = a_str(r)
-        I = (m_str(abs(i)) if -1 != i != 1 else '') + 'i'
-        if abs(r) < small: return ('-' if i < 0 else '') + I
-        else: return R + ('-' if i < 0 else '+') + I
+        r, i = str(self.real), str(abs(self.imag))
+        # Hide any part too small to show at the display precision
+        if i == '0': return r
+        I = (m_str(abs(self.imag)) if i != '1' else '') + 'i'
+        if r == '0': return ('-' if self.imag < 0 else '') + I
+        else: return a_str(self.real) + ('-' if self.imag < 0 else '+') + I
     __str__ = __repr__
 
+    @property
+    def _hints(self):
+        # Do not display brackets in multiplication if a number is close to
+        # the set of imaginary numbers.
+        return {'a'} if str(self.real) == '0' else {'d','m','p','a'}
+
+    def __complex__(self):
+        return complex(float(self.real), float(self.imag))
+
+    def __hash__(self):
+        return hash(complex(self))
+
+    def __nonzero__(self):
+        return self.real != 0 or self.imag != 0
+
     def argument(self):
         ''' Return the complex argument of a number. '''
-        from math import pi, atan
-        r, i = abs(self.real), abs(self.imag)
-        a = atan(i/r)
-        if self.real >= 0 and self.imag >= 0: return handle_type(a)
-        if self.real <= 0 and self.imag >= 0: return handle_type(pi - a)
-        if self.real >= 0 and self.imag <= 0: return handle_type(-a)
-        if self.real <= 0 and self.imag <= 0: return handle_type(a - pi)
+        import dmath
+        return handle_type(dmath.atan2(Decimal(self.imag), Decimal(self.real)))
 
     def _convert_other(self, other):
-        if isinstance(other, complex):
-            return other
-        if isinstance(other, Number):
-            return complex(float(other))
-        else:
-            return NotImplemented
+        convert = _coercions.get((Complex, type(other)))
+        if convert is None:
+            convert = _coercion(Complex, type(other))
+        return convert(other)
 
     def __add__(self, other):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Complex(super(Complex,self).__add__(other))
+        if other is NotImplemented: return other
+        return Complex(self.real + other.real, self.imag + other.imag)
     __radd__ = __add__
 
     def __sub__(self, other):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Complex(super(Complex,self).__sub__(other))
+        if other is NotImplemented: return other
+        return Complex(self.real - other.real, self.imag - other.imag)
 
     def __rsub__(self, other):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Complex(other - complex(self))
+        if other is NotImplemented: return other
+        return other - self
 
     def __mul__(self, other):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Complex(super(Complex,self).__mul__(other))
+        if other is NotImplemented: return other
+        a, b, c, d = self.real, self.imag, other.real, other.imag
+        return Complex(a * c - b * d, a * d + b * c)
     __rmul__ = __mul__
 
     def __truediv__(self, other):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Complex(super(Complex,self).__truediv__(other))
+        if other is NotImplemented: return other
+        a, b, c, d = self.real, self.imag, other.real, other.imag
+        m = c * c + d * d
+        return Complex((a * c + b * d) / m, (b * c - a * d) / m)
 
-    def __rtruediv__(self,other):
-        raise NotImplementedError()
-
-#    def __rtruediv__(self, other):
-#        other = self._convert_other(other)
-#        if other == NotImplemented: return other
-#        return Complex(super(Complex,other).__truediv__(self))
+    def __rtruediv__(self, other):
+        other = self._convert_other(other)
+        if other is NotImplemented: return other
+        return other / self
 
     def __pow__(self, other):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        return Complex(super(Complex,self).__pow__(other))
+        if other is NotImplemented: return other
+        n = other.real
+        if other.imag == 0 and n == n.to_integral_value() and abs(n) < 2**64:
+            # Whole powers are found exactly by repeated squaring
+            z, y, n = self, Complex._new(Real(1), Real(0)), int(n)
+            for bit in bin(abs(n))[2:]:
+                y = y * y
+                if bit == '1': y = y * z
+                if not isinstance(y, Complex): y = self._convert_other(y)
+            return Complex(y) if n >= 0 else 1 / y
+        elif not self:
+            return Integer(0)
+        w = other * self.log()
+        return self._convert_other(w).exp()
+
+    def __rpow__(self, other):
+        other = self._convert_other(other)
+        if other is NotImplemented: return other
+        return other ** self
 
-    # Due to the limitations of floating point complex numbers, equality is
-    # approximate
     def __eq__(self, other):
         other = self._convert_other(other)
-        if other == NotImplemented: return other
-        mag = lambda a: ( a.real**2 + a.imag**2 )**(1/2)
-        mag.__doc__ = ''' Euclidean normal / magnitude of complex number. '''
-        return abs(self - other) < 0.01
+        if other is NotImplemented: return other
+        return self.real == other.real and self.imag == other.imag
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
 
     def __pos__(self):
-        return Complex(super(Complex,self).__pos__())
+        return Complex(+self.real, +self.imag)
 
     def __neg__(self):
-        return Complex(super(Complex,self).__neg__())
+        return Complex._new(-self.real, -self.imag)
+
+    def __abs__(self):
+        return Real((self.real * self.real + self.imag * self.imag).sqrt())
 
     def conjugate(self):
         ''' Return the complex conjugate. '''
-        return Complex(super(Complex,self).conjugate())
-
+        return Complex._new(self.real, -self.imag)
+
+    # Transcendental functions are evaluated with guard digits and rounded to
+    # the working precision
+    def exp(self):
+        ''' e raised to the power of the number. '''
+        import dmath
+        with localcontext() as c:
+            c.prec += 5
+            r, b = Decimal(self.real).exp(), Decimal(self.imag)
+            z = Complex(r * dmath.cos(b), r * dmath.sin(b))
+        return +z
+
+    def log(self):
+        ''' The principal value of the natural logarithm. '''
+        import dmath
+        with localcontext() as c:
+            c.prec += 5
+            a, b = Decimal(self.real), Decimal(self.imag)
+            z = Complex((a * a + b * b).ln() / 2, dmath.atan2(b, a))
+        return +z
+
+    def sqrt(self):
+        ''' The principal square root. '''
+        with localcontext() as c:
+            c.prec += 5
+            a, b = Decimal(self.real), Decimal(self.imag)
+            r = (a * a + b * b).sqrt()
+            y = ((r - a) / 2).sqrt()
+            z = Complex(((r + a) / 2).sqrt(), y if b >= 0 else -y)
+        return +z
+
+    def _trig(self):
+        ''' Return sin a, cos a, sinh b and cosh b for the number a + bi. '''
+        import dmath
+        a, b = Decimal(self.real), Decimal(self.imag)
+        e = b.exp()
+        return dmath.sin(a), dmath.cos(a), (e - 1 / e) / 2, (e + 1 / e) / 2
+
+    def sin(self):
+        ''' The sine of the number in radians. '''
+        with localcontext() as context:
+            context.prec += 5
+            s, c, sh, ch = self._trig()
+            z = Complex(s * ch, c * sh)
+        return +z
+
+    def cos(self):
+        ''' The cosine of the number in radians. '''
+        with localcontext() as context:
+            context.prec += 5
+            s, c, sh, ch = self._trig()
+            z = Complex(c * ch, -s * sh)
+        return +z
+
+    def tan(self):
+        ''' The tangent of the number in radians. '''
+        with localcontext() as c:
+            c.prec += 5
+            z = self.sin() / self.cos()
+        return +z
+
+# The conversions of the other operand of the arithmetic of Reals and
+# Complexs, keyed by the pair of types; each is found from the numeric tower
+# the first time its pair is met
+_coercions = {}
+
+def _not_implemented(x):
+    return NotImplemented
+
+def _coercion(cls, t):
+    ''' Return the function converting values of type t to take part in the
+    arithmetic of cls, a Real or a Complex, which returns NotImplemented for
+    values which cannot. '''
+    if cls is Real:
+        if issubclass(t, Real):
+            convert = _identity
+        elif issubclass(t, float):
+            convert = Real.from_float
+        elif issubclass(t, Number) and not issubclass(t, (complex, Complex)):
+            convert = Real
+        else:
+            convert = _not_implemented
+    else:
+        if issubclass(t, Complex):
+            convert = _identity
+        elif issubclass(t, complex):
+            convert = lambda x: Complex._new(_real(x.real), _real(x.imag))
+        elif issubclass(t, Number):
+            convert = lambda x: Complex._new(_real(x), Real(0))
+        else:
+            convert = _not_implemented
+    _coercions[cls, t] = convert
+    return convert
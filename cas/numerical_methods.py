@@ -21,23 +21,90 @@ __author__ = 'Thomas Wright <tom.tdw@gmail.com>'
 # You should have received a copy of the GNU General Public License along with
 # C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import namedtuple
+from heapq import heappush, heappop
+from itertools import count
+from math import isinf
 from operator import mul
 from functools import reduce
 from copy import copy
 from decimal import Decimal, getcontext, localcontext
 
+# The result of a numerical integration: the estimate of the integral, an
+# estimate of its absolute error and the number of times the integrand was
+# evaluated
+Quadrature = namedtuple('Quadrature', ['value', 'error', 'evaluations'])
+
+# Romberg's method always fills at least this many levels of its tableau (so
+# evaluates the integrand at 2^ROMBERG_MIN_LEVEL + 1 points) before it may
+# stop, so that integrands which happen to agree with a low order polynomial
+# at the first few points are not taken to have converged
+ROMBERG_MIN_LEVEL = 4
+
+# Gauss-Kronrod rules on [-1, 1], by the number of points of the Kronrod rule:
+# the non-negative nodes (largest first), their Kronrod weights and the
+# weights of the Gauss rule, whose nodes are every other one of the Kronrod
+# nodes from the second. The values are from QUADPACK (R. Piessens et al.,
+# 1983).
+KRONROD_RULES = {
+    15: ((0.991455371120812639206854697526329,
+            0.949107912342758524526189684047851,
+            0.864864423359769072789712788640926,
+            0.741531185599394439863864773280788,
+            0.586087235467691130294144845693013,
+            0.405845151377397166906606412076961,
+            0.207784955007898467600689403773245, 0.0),
+        (0.022935322010529224963732008058970,
+            0.063092092629978553290700663189204,
+            0.104790010322250183839876322541518,
+            0.140653259715525918745189590510238,
+            0.169004726639267902826583426598550,
+            0.190350578064785409913256402421014,
+            0.204432940075298892414161999234649,
+            0.209482141084727828012999174891714),
+        (0.129484966168869693270611432679082,
+            0.279705391489276667901467771423780,
+            0.381830050505118944950369775488975,
+            0.417959183673469387755102040816327)),
+    21: ((0.995657163025808080735527280689003,
+            0.973906528517171720077964012084452,
+            0.930157491355708226001207180059508,
+            0.865063366688984510732096688423493,
+            0.780817726586416897063717578345042,
+            0.679409568299024406234327365114874,
+            0.562757134668604683339000099272694,
+            0.433395394129247190799265943165784,
+            0.294392862701460198131126603103866,
+            0.148874338981631210884826001129720, 0.0),
+        (0.011694638867371874278064396062192,
+            0.032558162307964727478818972459390,
+            0.054755896574351996031381300244580,
+            0.075039674810919952767043140916190,
+            0.093125454583697605535065465083366,
+            0.109387158802297641899210590325805,
+            0.123491976262065851077208703099913,
+            0.134709217311473325928054001771707,
+            0.142775938577060080797094273138717,
+            0.147739104901338491374841515972068,
+            0.149445554002916905664936468389821),
+        (0.066671344308688137593568809893332,
+            0.149451349150580593145776339657697,
+            0.219086362515982043995534934228163,
+            0.269266719309996355091226921569469,
+            0.295524224714752870173892994651338)),
+}
+# The relative precision of machine floats
+FLOAT_EPSILON = 2.0**-52
+
 def pi(n=None):
     ''' Estimate pi using n terms of the Chudnovsky brothers' formula. By 
-    default this will attempt to calculate it to the maximum number of digits 
-    storable in a decimal number. '''
-    from math import factorial
-    D = Decimal
-    if n == None: n = round(getcontext().prec/D(14)) + 10
-    with localcontext():
-        getcontext().prec += 5
-        f = lambda k: factorial(6*k)*D(13591409 + 545140134*k)\
-            / (factorial(3*k)*factorial(k)**3*D(-640320)**(3*k))
-        return 426880*D(10005)**D('0.5') / sum(f(k) for k in range (100))
+    default the shared value from cas.constants, accurate to the current
+    precision, is returned. '''
+    if n is None:
+        from cas.constants import pi
+        return pi()
+    from cas.binary_splitting import pi
+    return pi(n)
 
 def to_fraction(x, places=10):
     ''' Convert the decimal x to a fraction, a / b'''
@@ -45,7 +112,7 @@ def to_fraction(x, places=10):
     max_runs = 50; i = 0
     sign = 1 if x >= 0 else -1
     z = abs(x)
-    if z == int(z): return (x, 1)
+    if z == int(z): return (int(x), 1)
     a = 0; b = 1; B = 0
     while i < max_runs:
         z = (z - int(z))**(-1)
@@ -94,20 +161,197 @@ def boole_composite_integral(f,a,b,m=100):
     return (2*h/45)*sum(7*fx(n-4) + 32*fx(n-3) + 12*fx(n-2) + 32*fx(n-1)
         + 7*fx(n) for n in range(4,m+1,4))
 
-def romberg_integral(f,a,b,n=7,m=7):
-    ''' A recursive implementation of Romberg's method of integration.
-    See http://en.wikipedia.org/wiki/Romberg's_method. '''
-  #  if m == -1: m = n
-    R = lambda N,M: romberg_integral(f,a,b,N,M)
-    h = lambda n: (b-a)/(2**n)
+def _tolerance(value, tolerance):
+    ''' Return the relative tolerance for an integral of the same type as
+    value: by default 1e-12 for floats, and close to the current precision for
+    Decimals. '''
+    if isinstance(value, Decimal):
+        if tolerance is None:
+            return Decimal(10)**(3 - getcontext().prec)
+        return Decimal(repr(tolerance)) if isinstance(tolerance, float)\
+            else Decimal(tolerance)
+    return 1e-12 if tolerance is None else float(tolerance)
+
+def _romberg_rows(f, a, b):
+    ''' Yield the rows of the Romberg tableau for the integral of f from a to
+    b, each with the number of evaluations of f so far and the trapezium rule
+    estimate of the integral of |f|. Each row halves the strips of the
+    trapezium rule, so f is only evaluated at the new midpoints. '''
+    h = b - a
+    fa, fb = f(a), f(b)
+    row = [h*(fa + fb)/2]
+    magnitude = abs(h)*(abs(fa) + abs(fb))/2
+    evaluations = 2
+    n = 0
+    while True:
+        yield row, evaluations, magnitude
+        n += 1
+        h /= 2
+        ys = [f(a + (2*k - 1)*h) for k in range(1, 2**(n-1) + 1)]
+        evaluations += len(ys)
+        previous, row = row, [row[0]/2 + h*sum(ys)]
+        magnitude = magnitude/2 + abs(h)*sum(abs(y) for y in ys)
+        for m in range(1, n + 1):
+            row.append((4**m*row[m-1] - previous[m-1]) / (4**m - 1))
+
+def romberg(f, a, b, tolerance=None, max_level=16):
+    ''' Integrate f from a to b by Romberg's method, adding rows to the
+    tableau until successive diagonal entries agree to within the relative
+    tolerance (of the integral of |f|), or until max_level rows have been
+    added. Returns a Quadrature of the last diagonal entry, the difference
+    between it and the one before as an estimate of its error, and the number
+    of evaluations of f. See http://en.wikipedia.org/wiki/Romberg's_method.
+    '''
+    previous = None
+    for n, (row, evaluations, magnitude) in enumerate(_romberg_rows(f, a, b)):
+        value = row[-1]
+        if previous is not None:
+            error = abs(value - previous)
+            tolerance = _tolerance(value, tolerance)
+            if n >= ROMBERG_MIN_LEVEL and error <= tolerance*magnitude\
+                    or n >= max_level:
+                return Quadrature(value, error, evaluations)
+        previous = value
+
+def romberg_integral(f,a,b,n=None,m=None):
+    ''' Romberg's method of integration, returning the entry R(n, m) of the
+    tableau, or by default the estimate found by romberg to its default
+    tolerance. '''
+    if n is None:
+        return romberg(f, a, b).value
+    if m is None:
+        m = n
     assert (n >= m)
-    if n == 0 and m == 0:
-        return (1/2)*(b-a)*(f(a) + f(b))
-    elif m == 0:
-        return (1/2)*R(n-1, 0) + h(n)\
-            * sum(f(a + (2*k - 1)*h(n)) for k in range(1, 2**(n-1) + 1))
-    else:
-        return (4**m * R(n, m-1) - R(n-1, m-1)) / (4**m - 1)
+    for level, (row, evaluations, magnitude) in enumerate(
+            _romberg_rows(f, a, b)):
+        if level == n:
+            return row[m]
+
+def gauss_kronrod(f, a, b, rule=21):
+    ''' Integrate f from a to b by a single Gauss-Kronrod rule, in machine
+    floats, returning the Kronrod estimate, an estimate of its error and the
+    Kronrod estimate of the integral of |f|. The difference between the
+    Kronrod and Gauss estimates greatly overstates the error of the Kronrod
+    estimate for smooth integrands, so it is scaled as in QUADPACK's QK21.
+    '''
+    nodes, kronrod, gauss = KRONROD_RULES[rule]
+    c, h = (a + b)/2, (b - a)/2
+    y = float(f(c))
+    ys = [y]
+    K = kronrod[-1]*y
+    # The centre is one of the nodes of the Gauss rule when it has an odd
+    # number of them
+    G = gauss[-1]*y if len(nodes) % 2 == 0 else 0.0
+    for j, x in enumerate(nodes[:-1]):
+        y1, y2 = float(f(c - h*x)), float(f(c + h*x))
+        ys += [y1, y2]
+        K += kronrod[j]*(y1 + y2)
+        if j % 2:
+            G += gauss[j//2]*(y1 + y2)
+    # The integrals of |f| and of |f - mean of f|, from the Kronrod rule
+    mean = K/2
+    weights = [kronrod[-1]] + [w for w in kronrod[:-1] for i in range(2)]
+    absolute = sum(w*abs(y) for w, y in zip(weights, ys))
+    deviation = sum(w*abs(y - mean) for w, y in zip(weights, ys))
+    h = abs(h)
+    error = abs((K - G)*h)
+    if deviation and error:
+        error = deviation*h*min(1.0, (200*error/(deviation*h))**1.5)
+    # No estimate can be better than the rounding error in the sum
+    error = max(error, 50*FLOAT_EPSILON*absolute*h)
+    return K*(b - a)/2, error, absolute*h
+
+def quad(f, a, b, tol=1e-10, abs_tol=0.0, rule=21, max_intervals=1000):
+    ''' Integrate f from a to b in machine floats, by adaptive Gauss-Kronrod
+    quadrature with the G7-K15 (rule=15) or G10-K21 (rule=21) rule. The
+    subinterval with the largest estimated error is bisected until the total
+    estimated error is within abs_tol or the relative tolerance tol of the
+    integral of |f| (so that integrals which cancel to zero converge), or
+    until there are max_intervals subintervals or none can be bisected
+    further. Returns a Quadrature of the estimate, its estimated error and
+    the number of evaluations of f. '''
+    a, b = float(a), float(b)
+    if isinf(a) or isinf(b):
+        raise ValueError('Only integrals over finite intervals are supported')
+    value, error, magnitude = gauss_kronrod(f, a, b, rule)
+    evaluations = rule
+    # A heap of the subintervals, largest error first; the counter breaks
+    # ties so that they are taken in the order they were added
+    order = count()
+    intervals = [(-error, next(order), a, b, value, magnitude)]
+    while error > max(abs_tol, tol*magnitude)\
+            and len(intervals) < max_intervals:
+        interval = heappop(intervals)
+        a1, b1 = interval[2:4]
+        m = (a1 + b1)/2
+        if not a1 < m < b1:
+            # The interval is as small as floats allow
+            heappush(intervals, interval)
+            break
+        for a2, b2 in ((a1, m), (m, b1)):
+            v2, e2, m2 = gauss_kronrod(f, a2, b2, rule)
+            heappush(intervals, (-e2, next(order), a2, b2, v2, m2))
+        evaluations += 2*rule
+        # The totals are summed afresh so that rounding errors in them do
+        # not build up
+        value = sum(interval[4] for interval in intervals)
+        error = -sum(interval[0] for interval in intervals)
+        magnitude = sum(interval[5] for interval in intervals)
+    return Quadrature(value, error, evaluations)
+
+def levin_u_transform(terms, beta=1):
+    ''' Estimate the sum of the series whose first (non-zero) terms are given
+    using the Levin u-transform, or None if the transform is undefined. See:
+    http://en.wikipedia.org/wiki/Levin-type_sequence_transformations '''
+    k = len(terms) - 1
+    numerator = denominator = 0
+    s = 0; binomial = 1
+    for j, a in enumerate(terms):
+        s += a
+        # The common factor (beta + k)^(k - 1) cancels so is left out
+        c = (-1)**j * binomial * (beta + j)**(k - 1) / ((beta + j) * a)
+        numerator += c * s
+        denominator += c
+        binomial = binomial * (k - j) // (j + 1)
+    return numerator / denominator if denominator != 0 else None
+
+def levin_series(f, tolerance=None, max_terms=60, beta=1):
+    ''' Estimate the sum of f(n) for n from 0 to infinity, by applying the
+    Levin u-transform to increasing numbers of terms until successive
+    estimates agree to within the relative tolerance. By default this is
+    close to the current precision of Decimals. A series of terms in n + c
+    for large c converges far sooner with beta near c. '''
+    D = Decimal
+    if tolerance == None: tolerance = D(10)**(8 - getcontext().prec)
+    with localcontext():
+        # The transform suffers from cancellation so extra digits are needed
+        getcontext().prec += 20
+        terms = []; zeros = 0; estimate = None
+        for n in range(max_terms):
+            a = D(f(n))
+            if a == 0:
+                # Zero terms do not change the partial sums and a series whose
+                # terms have all vanished is summed directly
+                zeros += 1
+                if zeros == 5:
+                    estimate = sum(terms)
+                    break
+                continue
+            zeros = 0
+            terms.append(a)
+            if len(terms) < 2:
+                continue
+            previous, estimate = estimate, levin_u_transform(terms, beta)
+            if estimate is None:
+                estimate = previous
+            elif previous is not None and abs(estimate - previous)\
+                <= tolerance * abs(estimate)\
+                and abs(terms[-1]) < abs(terms[0]):
+                # The terms of a convergent series must also tend to zero
+                break
+        else:
+            raise ValueError('The series does not appear to converge')
+    return +estimate
 
 def durand_kerner_roots(f, order, n=100):
     ''' Numerically locate all roots (real and complex) of Polynomial of
@@ -120,3 +364,46 @@ def durand_kerner_roots(f, order, n=100):
             xs[i] -= f(xs[i])\
                 / product(xs[i] - xs[j] for j in range(order) if i != j)
     return xs
+
+def _horner(p, x):
+    ''' Evaluate the polynomial p (lowest order first) and its derivative at
+    x. '''
+    y, dy = p[-1], 0
+    for c in reversed(p[:-1]):
+        dy = dy * x + y
+        y = y * x + c
+    return y, dy
+
+def polynomial_roots(p, n=100, max_steps=200):
+    ''' Locate all of the roots of the polynomial with real coefficients p
+    (lowest order first) at the working precision. Approximations are found
+    quickly using n iterations of the Durand-Kerner method in machine floats
+    and then each is polished by Newton's method in Reals, or Complex numbers
+    for non-real roots. '''
+    from cas.numeric import Complex, Real
+    order = len(p) - 1
+    q = [complex(float(c) / float(p[-1])) for c in p]
+    f = lambda x: _horner(q, x)[0]
+    with localcontext() as context:
+        context.prec += 5
+        tolerance = Decimal(10) ** -(context.prec - 2)
+        # Roots of real polynomials too close to be told apart in floats are
+        # treated as real
+        loose = Decimal(10) ** -(context.prec // 2)
+        p = [Real(c) for c in p]
+        roots = []
+        for x in durand_kerner_roots(f, order, n):
+            z = Real(repr(x.real)) if abs(x.imag) <= 1e-8 * max(1, abs(x))\
+                else Complex(x)
+            for i in range(max_steps):
+                y, dy = _horner(p, z)
+                if y == 0 or dy == 0:
+                    break
+                step = y / dy
+                z -= step
+                if abs(step) <= tolerance * abs(z):
+                    break
+            if isinstance(z, Complex) and abs(z.imag) <= loose * abs(z):
+                z = z.real
+            roots.append(z)
+    return [+z for z in roots]
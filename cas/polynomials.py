@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# coding=utf-8
+''' Univariate polynomials over the rationals, used to find the greatest common
+divisor of algebraic expressions and to cancel common factors from fractions.
+
+Internally a polynomial is held as a dense list of coefficients, lowest order
+first, so that 3x^2 - 1 is stored as [-1, 0, 3] and the zero polynomial is [].
+The greatest common divisor is found via the heuristic method of Char, Geddes
+and Gonnet, falling back to the subresultant polynomial remainder sequence
+when the heuristic fails. See:
+    - http://en.wikipedia.org/wiki/Polynomial_greatest_common_divisor
+    - H. Cohen, A Course in Computational Algebraic Number Theory, 3.3
+'''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+from decimal import Decimal
+from functools import reduce
+from numbers import Number, Rational as RationalNumber
+from operator import mul
+
+# Project modules
+from cas.core import Symbol, Sum, Product, Power, Fraction, Function,\
+    handle_type as ht
+
+
+def _igcd(a, b):
+    ''' The greatest common divisor of two python integers. '''
+    while b:
+        a, b = b, a % b
+    return abs(a)
+
+def _strip(p):
+    ''' Remove any zero leading coefficients from p (in place). '''
+    while p and p[-1] == 0:
+        p.pop()
+    return p
+
+def _add(p, q):
+    ''' Add two polynomials. '''
+    if len(p) < len(q): p, q = q, p
+    return _strip([a + b for a, b in zip(p, q)] + list(p[len(q):]))
+
+def _mul(p, q):
+    ''' Multiply two polynomials. '''
+    if not p or not q:
+        return []
+    r = [0] * (len(p) + len(q) - 1)
+    for i, a in enumerate(p):
+        for j, b in enumerate(q):
+            r[i + j] = r[i + j] + a * b
+    return _strip(r)
+
+def _pow(p, n):
+    ''' Raise a polynomial to a natural power by repeated squaring. '''
+    r = [1]
+    while n:
+        if n & 1: r = _mul(r, p)
+        n >>= 1
+        if n: p = _mul(p, p)
+    return r
+
+def _content(p):
+    ''' The greatest common divisor of the coefficients of p. '''
+    return reduce(_igcd, p, 0)
+
+def _primitive(p):
+    ''' Divide p through by its content. '''
+    c = _content(p)
+    return [a // c for a in p] if c > 1 else list(p)
+
+def _normalise(p):
+    ''' Choose the associate of p with a positive leading coefficient. '''
+    return [-a for a in p] if p and p[-1] < 0 else list(p)
+
+def _evaluate(p, x):
+    ''' Evaluate p at x using Horner's rule. '''
+    return reduce(lambda a, b: a * x + b, reversed(p), 0)
+
+def _pseudo_remainder(a, b):
+    ''' The remainder of lc(b)^(deg(a) - deg(b) + 1)·a on division by b,
+    which is always a polynomial over the integers. '''
+    r = list(a); lc = b[-1]
+    e = len(a) - len(b) + 1
+    while len(r) >= len(b):
+        c = r[-1]; shift = len(r) - len(b)
+        r = [lc * t for t in r]
+        for i, t in enumerate(b):
+            r[i + shift] -= c * t
+        _strip(r); e -= 1
+    return [lc ** e * t for t in r]
+
+def _divide(a, b):
+    ''' Return the quotient a / b if b divides a exactly over the integers,
+    otherwise None. '''
+    r = list(a); lc = b[-1]
+    q = [0] * max(len(a) - len(b) + 1, 0)
+    while len(r) >= len(b):
+        c, m = divmod(r[-1], lc)
+        if m:
+            return None
+        shift = len(r) - len(b)
+        q[shift] = c
+        for i, t in enumerate(b):
+            r[i + shift] -= c * t
+        _strip(r)
+    return q if not r else None
+
+def subresultant_gcd(a, b):
+    ''' The greatest common divisor of two integer polynomials via the
+    subresultant polynomial remainder sequence, which keeps the growth of the
+    intermediate coefficients polynomial rather than exponential. '''
+    if len(b) > len(a): a, b = b, a
+    if not b:
+        return _normalise(a)
+    d = _igcd(_content(a), _content(b))
+    a, b = _primitive(a), _primitive(b)
+    g = h = 1
+    while True:
+        delta = len(a) - len(b)
+        r = _pseudo_remainder(a, b)
+        if not r:
+            break
+        elif len(r) == 1:
+            b = [1]
+            break
+        a, b = b, [t // (g * h ** delta) for t in r]
+        g = a[-1]
+        h = h if delta == 0 else g ** delta // h ** (delta - 1)
+    return _normalise([d * t for t in _primitive(b)])
+
+def heuristic_gcd(a, b, tries=6):
+    ''' The greatest common divisor of two primitive integer polynomials via
+    the GCDHEU algorithm: the polynomials are evaluated at a large integer,
+    xi, and the integer greatest common divisor of the results is
+    interpolated back into a polynomial. Return None on failure. '''
+    norm = min(max(abs(t) for t in a), max(abs(t) for t in b))
+    xi = 2 * norm + 2
+    for i in range(tries):
+        # Give up before the integers involved become unreasonably large
+        if xi.bit_length() * max(len(a), len(b)) > 4000:
+            return None
+        h = _igcd(_evaluate(a, xi), _evaluate(b, xi))
+        # Interpolate using the symmetric representation modulo xi
+        g = []
+        while h:
+            c = h % xi
+            if c > xi // 2: c -= xi
+            g.append(c)
+            h = (h - c) // xi
+        g = _normalise(_primitive(g))
+        if _divide(a, g) is not None and _divide(b, g) is not None:
+            return g
+        xi = xi * 73794 // 27011
+    return None
+
+def integer_polynomial_gcd(a, b):
+    ''' The greatest common divisor of two polynomials over the integers,
+    with a positive leading coefficient. '''
+    if not a or not b:
+        return _normalise(a or b)
+    c = _igcd(_content(a), _content(b))
+    a, b = _primitive(a), _primitive(b)
+    g = heuristic_gcd(a, b) or subresultant_gcd(a, b)
+    return [c * t for t in g]
+
+def coefficients(y, x):
+    ''' Return the numeric coefficients of y as a polynomial in the Symbol x
+    (lowest order first) or None if y is not such a polynomial. '''
+    if isinstance(y, Number):
+        return _strip([y])
+    elif isinstance(y, Symbol):
+        return [0, 1] if y == x else None
+    elif isinstance(y, (Sum, Product)):
+        f = _add if isinstance(y, Sum) else _mul
+        ps = [coefficients(a, x) for a in y]
+        return None if None in ps else reduce(f, ps)
+    elif isinstance(y, Fraction) and isinstance(y.denominator(), Number):
+        p = coefficients(y.numerator(), x)
+        return None if p is None else [c / y.denominator() for c in p]
+    elif isinstance(y, Power):
+        p, n = coefficients(y.a(), x), y.b()
+        return _pow(p, int(n)) if p is not None and isinstance(n, int)\
+            and n >= 0 else None
+    else:
+        return None
+
+def from_coefficients(p, x):
+    ''' Build an algebraic expression from the polynomial p in x. '''
+    terms = [ht(c) * x ** ht(k) if k else ht(c)
+        for k, c in enumerate(p) if c != 0]
+    return Sum(*terms) if len(terms) > 1 else terms[0] if terms else ht(0)
+
+def _lcm(a, b):
+    ''' The lowest common multiple of two python integers. '''
+    return a * b // _igcd(a, b)
+
+def _integer_coefficients(y, x):
+    ''' Return the coefficients of y, scaled by the lowest common multiple
+    of their denominators, as python integers along with that multiple; or
+    None if y is not a polynomial over the rationals. '''
+    p = coefficients(y, x)
+    if p is None or not all(isinstance(c, RationalNumber)
+        or isinstance(c, Decimal) and c == int(c) for c in p):
+        return None
+    p = [c if isinstance(c, RationalNumber) else int(c) for c in p]
+    d = reduce(_lcm, (c.denominator for c in p), 1)
+    return [int(c * d) for c in p], d
+
+def variables(y):
+    ''' Return the set of names of the symbols occurring in y, or None if y
+    contains anything other than algebraic expressions and numbers. '''
+    if isinstance(y, Number):
+        return set()
+    elif isinstance(y, Symbol):
+        return set([str(y)])
+    elif isinstance(y, (Sum, Product)):
+        vs = [variables(a) for a in y]
+    elif isinstance(y, Power):
+        vs = [variables(y.a()), variables(y.b())]
+    elif isinstance(y, Fraction):
+        vs = [variables(y.numerator()), variables(y.denominator())]
+    elif isinstance(y, Function):
+        vs = [variables(y.x())]
+    else:
+        return None
+    return None if None in vs else reduce(set.union, vs, set())
+
+def _factor_list(y):
+    ''' Split an expression into a list of multiplicative factors. '''
+    return list(y) if isinstance(y, Product) else [y]
+
+def _common_factors(a, b):
+    ''' Split off the factors of a and b which are syntactically equal,
+    returning the common part and the remainders. '''
+    xs, ys, common = _factor_list(a), _factor_list(b), []
+    for f in list(xs):
+        if not isinstance(f, Number) and f in ys:
+            xs.remove(f); ys.remove(f); common.append(f)
+    product = lambda zs: reduce(mul, zs, ht(1))
+    return product(common), product(xs), product(ys)
+
+def _univariate(a, b):
+    ''' Return the variable and integer coefficients of a and b if both are
+    polynomials over the rationals in (at most) one shared variable; the
+    coefficients are scaled such that their ratio is unchanged. '''
+    vs = variables(a), variables(b)
+    if None in vs or len(vs[0] | vs[1]) != 1:
+        return None
+    x = Symbol((vs[0] | vs[1]).pop())
+    p, q = _integer_coefficients(a, x), _integer_coefficients(b, x)
+    if p is None or q is None:
+        return None
+    # Clear the denominators of both whilst keeping their ratio the same
+    (p, c), (q, d) = p, q
+    return x, [t * d for t in p], [t * c for t in q]
+
+def polynomial_gcd(a, b):
+    ''' The greatest common divisor of two algebraic expressions. Univariate
+    polynomials with integer coefficients are handled in full; otherwise only
+    syntactically common factors are found. '''
+    u = _univariate(a, b)
+    if u is not None:
+        x, p, q = u
+        return from_coefficients(integer_polynomial_gcd(p, q), x)
+    return _common_factors(a, b)[0]
+
+def cancel(a, b):
+    ''' Remove the common factors of the numerator a and denominator b of a
+    fraction, returning the new numerator and denominator. The originals are
+    returned if nothing cancels. '''
+    common, c, d = _common_factors(a, b)
+    if common != 1:
+        a, b = c, d
+    u = _univariate(a, b)
+    if u is None:
+        return a, b
+    x, p, q = u
+    g = integer_polynomial_gcd(p, q)
+    if len(g) > 1 or g[0] != 1:
+        a = from_coefficients(_divide(p, g), x)
+        b = from_coefficients(_divide(q, g), x)
+    return a, b
@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+''' Primality testing, integer factorisation and prime sieving.
+
+Small factors are removed by trial division by the primes below TRIAL_BOUND;
+what remains is split using Brent's variant of Pollard's rho method and, for
+cofactors whose smallest prime factor is too large for rho to find quickly,
+Lenstra's elliptic curve method, with each factor proven (or, above 3.3e24,
+very probably) prime by the Miller-Rabin test.
+
+Ranges of primes are found with a segmented Sieve of Eratosthenes over the odd
+numbers, so that the memory used is bounded by SEGMENT_SIZE however far the
+range extends, and primes are counted with the Lucy_Hedgehog (Legendre-style)
+method in O(n^(3/4)) time and O(n^(1/2)) space. See:
+    - R. P. Brent, An improved Monte Carlo factorization algorithm, BIT 20
+      (1980), 176-184
+    - P. L. Montgomery, Speeding the Pollard and elliptic curve methods of
+      factorization, Math. Comp. 48 (1987), 243-264
+    - http://en.wikipedia.org/wiki/Lenstra_elliptic_curve_factorization
+'''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import random
+from bisect import bisect_right
+from fractions import gcd
+from itertools import compress
+
+# Project modules
+from cas.cache import lru_cache
+
+# Trial division is used for the primes below this bound
+TRIAL_BOUND = 1000
+# Pollard's rho method gives up after this many iterations
+RHO_ITERATIONS = 1 << 16
+# The stage one bounds and numbers of curves for the elliptic curve method,
+# tried in order (stage two runs to 50 times the stage one bound)
+ECM_SCHEDULE = ((2000, 25), (11000, 90), (50000, 300), (250000, 700))
+# The number of odd numbers sieved at a time
+SEGMENT_SIZE = 1 << 18
+
+@lru_cache(maxsize=8)
+def small_primes(n):
+    ''' Return a list of the primes below n, by the Sieve of Eratosthenes. '''
+    sieve = bytearray([1]) * n
+    sieve[:2] = bytearray(2)
+    for i in range(2, int(n ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytearray((n - 1 - i * i) // i + 1)
+    return [i for i in range(n) if sieve[i]]
+
+_primes = small_primes(TRIAL_BOUND)
+
+# The first thirteen primes as bases make the Miller-Rabin test deterministic
+# for all n below 3317044064679887385961981
+_bases = _primes[:13]
+_deterministic_bound = 3317044064679887385961981
+
+def is_prime(n):
+    ''' Test whether n is prime by the Miller-Rabin test. The answer is
+    certain for n below 3.3e24 and otherwise wrong with probability below
+    4^-30. '''
+    if n < 2:
+        return False
+    for p in _primes[:25]:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while not d & 1:
+        d >>= 1; s += 1
+    bases = _bases if n < _deterministic_bound\
+        else _bases + random.Random(n).sample(range(43, 1 << 20), 17)
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for i in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def integer_root(n, k):
+    ''' Return the integer kth root of n if n is a perfect kth power,
+    otherwise None. '''
+    from cas.numeric import _iroot
+    return _iroot(n, k)
+
+def pollard_brent(n, c=1, iterations=RHO_ITERATIONS):
+    ''' Find a non-trivial factor of the composite n by Brent's variant of
+    Pollard's rho method with the polynomial x^2 + c, multiplying up the
+    differences in batches so that only one in m steps takes a gcd. Return
+    None if none is found within the given number of iterations. '''
+    y, r, q, g, m = 2, 1, 1, 1, 128
+    while g == 1:
+        x = y
+        for i in range(r):
+            y = (y * y + c) % n
+        k = 0
+        while k < r and g == 1:
+            ys = y
+            for i in range(min(m, r - k)):
+                y = (y * y + c) % n
+                q = q * abs(x - y) % n
+            g = gcd(q, n)
+            k += m
+        r <<= 1
+        if r > iterations and g == 1:
+            return None
+    if g == n:
+        # The batch overshot; step through it one gcd at a time
+        while True:
+            ys = (ys * ys + c) % n
+            g = gcd(abs(x - ys), n)
+            if g > 1:
+                break
+    return g if g != n else None
+
+class _FactorFound(Exception):
+    ''' Raised within the elliptic curve method when a non-invertible element
+    reveals a factor. '''
+    def __init__(self, factor):
+        self.factor = factor
+
+def _add(P, Q, D, n):
+    ''' Add the points P and Q, the difference of which is D, on a
+    Montgomery curve in projective x-only coordinates. '''
+    u = (P[0] - P[1]) * (Q[0] + Q[1])
+    v = (P[0] + P[1]) * (Q[0] - Q[1])
+    return D[1] * (u + v) ** 2 % n, D[0] * (u - v) ** 2 % n
+
+def _double(P, a24, n):
+    ''' Double the point P on the curve with (A + 2)/4 = a24. '''
+    s, d = (P[0] + P[1]) ** 2 % n, (P[0] - P[1]) ** 2 % n
+    t = s - d
+    return s * d % n, t * (d + a24 * t) % n
+
+def _multiply(k, P, a24, n):
+    ''' Multiply the point P by the natural number k with Montgomery's
+    ladder. '''
+    if k == 0:
+        return 0, 0
+    elif k == 1:
+        return P
+    Q, R = P, _double(P, a24, n)
+    for bit in bin(k)[3:]:
+        if bit == '1':
+            Q, R = _add(R, Q, P, n), _double(R, a24, n)
+        else:
+            Q, R = _double(Q, a24, n), _add(R, Q, P, n)
+    return Q
+
+def _curve(n, sigma):
+    ''' Return a starting point and the constant a24 of Suyama's
+    parametrisation of a curve with a group order divisible by 12. '''
+    u, v = (sigma * sigma - 5) % n, 4 * sigma % n
+    x, z = pow(u, 3, n), pow(v, 3, n)
+    numerator = pow(v - u, 3, n) * (3 * u + v) % n
+    denominator = 16 * x * v % n
+    return (x, z), numerator * _inverse(denominator, n) % n
+
+def _extended_gcd(a, n):
+    ''' Return the greatest common divisor, g, of a and n along with s such
+    that s*a = g (mod n), by the extended Euclidean algorithm. '''
+    r0, r1, s0, s1 = n, a % n, 0, 1
+    while r1:
+        q = r0 // r1
+        r0, r1, s0, s1 = r1, r0 - q * r1, s1, s0 - q * s1
+    return r0, s0 % n
+
+def _inverse(a, n):
+    ''' The inverse of a modulo n, raising _FactorFound if there is none. '''
+    g, s = _extended_gcd(a, n)
+    if g != 1:
+        raise _FactorFound(g)
+    return s
+
+def inverse_mod(a, n):
+    ''' The inverse of a modulo the natural number n. '''
+    g, s = _extended_gcd(a, n)
+    if g != 1:
+        raise ValueError('{} has no inverse modulo {}'.format(a, n))
+    return s
+
+def ecm_curve(n, sigma, B1, B2):
+    ''' Try to find a factor of n with a single elliptic curve: stage one
+    multiplies the point by every prime power up to B1 and stage two looks for
+    a single remaining prime factor of the group order in (B1, B2] by the
+    baby-step giant-step continuation. Return the factor or None. '''
+    try:
+        P, a24 = _curve(n, sigma)
+    except _FactorFound as e:
+        return e.factor if e.factor != n else None
+    # Stage one
+    for p in small_primes(B1 + 1):
+        q = p
+        while q * p <= B1:
+            q *= p
+        P = _multiply(q, P, a24, n)
+    g = gcd(P[1], n)
+    if 1 < g < n:
+        return g
+    elif g == n:
+        return None
+    # Stage two: S[d] holds 2dP for the baby steps
+    D = max(int(B2 ** 0.5) // 2, 1)
+    S = [None, _double(P, a24, n)]
+    S.append(_double(S[1], a24, n))
+    for d in range(3, D + 1):
+        S.append(_add(S[d - 1], S[1], S[d - 2], n))
+    beta = [None] + [X * Z % n for X, Z in S[1:]]
+    B = B1 - 1 if B1 % 2 == 0 else B1
+    T = _multiply(abs(B - 2 * D), P, a24, n)
+    R = _multiply(B, P, a24, n)
+    primes = small_primes(B2 + 1)
+    primes = iter(primes[bisect_right(primes, B + 2):])
+    q, g = next(primes, None), 1
+    for r in range(B, B2, 2 * D):
+        alpha = R[0] * R[1] % n
+        while q is not None and q <= r + 2 * D:
+            X, Z = S[(q - r) // 2]
+            g = g * ((R[0] - X) * (R[1] + Z) - alpha + beta[(q - r) // 2]) % n
+            q = next(primes, None)
+        R, T = _add(R, S[D], T, n), R
+    g = gcd(g, n)
+    return g if 1 < g < n else None
+
+def ecm(n, schedule=ECM_SCHEDULE):
+    ''' Find a non-trivial factor of the composite n by Lenstra's elliptic
+    curve method, or None if the schedule of curves is exhausted. '''
+    generator = random.Random(n)
+    for B1, curves in schedule:
+        for i in range(curves):
+            g = ecm_curve(n, generator.randrange(6, n - 1), B1, 50 * B1)
+            if g is not None:
+                return g
+    return None
+
+def _perfect_power(n):
+    ''' Return (r, k) with n = r^k for the largest k possible. '''
+    for k in _primes:
+        if 1 << k > n:
+            break
+        r = integer_root(n, k)
+        if r is not None:
+            s, j = _perfect_power(r)
+            return s, k * j
+    return n, 1
+
+def _split(n):
+    ''' Find a non-trivial factor of the composite n, free of small primes,
+    which is not a perfect power. '''
+    for c in (1, 3, 5):
+        g = pollard_brent(n, c)
+        if g is not None:
+            return g
+    g = ecm(n)
+    if g is None:
+        raise ValueError('Unable to factorise {}'.format(n))
+    return g
+
+@lru_cache(maxsize=1000)
+def factorise(n):
+    ''' Return the prime factors of the natural number n as a sorted tuple,
+    with repeated factors repeated. '''
+    factors = []
+    for p in _primes:
+        if p * p > n:
+            break
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+    remaining = [n] if n > 1 else []
+    while remaining:
+        m = remaining.pop()
+        if m < TRIAL_BOUND ** 2 or is_prime(m):
+            factors.append(m)
+            continue
+        r, k = _perfect_power(m)
+        if k > 1:
+            remaining.extend(factorise(r) * k)
+        else:
+            g = _split(m)
+            remaining.extend((g, m // g))
+    return tuple(sorted(factors))
+
+def isqrt(n):
+    ''' The integer square root of the natural number n. '''
+    if n < 2:
+        return n
+    x = 1 << -(-n.bit_length() // 2)
+    while True:
+        y = (x + n // x) // 2
+        if y >= x:
+            return x
+        x = y
+
+def base_primes(n):
+    ''' Return a list of the primes up to n. The sieve is rounded up to a
+    power of two so that it is shared by later calls for similar n. '''
+    limit = 1 << max(n, 1).bit_length()
+    primes = small_primes(limit)
+    return primes[:bisect_right(primes, n)]
+
+def primes_between(a, b):
+    ''' Generate the primes p with a <= p < b, by a segmented sieve of the
+    odd numbers. '''
+    if b <= 2:
+        return
+    if a <= 2:
+        yield 2
+    a = max(a, 3) | 1
+    sieving = base_primes(isqrt(b - 1))[1:]
+    lo = a
+    while lo < b:
+        hi = min(lo + 2 * SEGMENT_SIZE, b)
+        # The flags of the odd numbers lo, lo + 2, ... below hi
+        n = (hi - lo + 1) // 2
+        segment = bytearray([1]) * n
+        for p in sieving:
+            if p * p >= hi:
+                break
+            start = max(p * p, -(-lo // p) * p)
+            if not start & 1:
+                start += p
+            i = (start - lo) // 2
+            if i < n:
+                segment[i::p] = bytearray((n - 1 - i) // p + 1)
+        for q in compress(xrange(lo, hi, 2), segment):
+            yield q
+        lo = hi if hi & 1 else hi + 1
+
+def prime_count(n):
+    ''' The number of primes up to n, by the Lucy_Hedgehog method: S(v, p),
+    the count of the numbers up to v which are prime or have no prime factor
+    below p, is sieved prime by prime for the values v = n // i. '''
+    if n < 2:
+        return 0
+    r = isqrt(n)
+    # small[v] = S(v, p) for v <= r and large[i] = S(n // i, p) for i <= r
+    small = [v - 1 for v in range(r + 1)]
+    large = [0] + [n // i - 1 for i in range(1, r + 1)]
+    for p in range(2, r + 1):
+        if small[p] == small[p - 1]:
+            continue
+        count, square = small[p - 1], p * p
+        for i in range(1, min(r, n // square) + 1):
+            d = i * p
+            large[i] -= (large[d] if d <= r else small[n // d]) - count
+        for v in range(r, square - 1, -1):
+            small[v] -= small[v // p] - count
+    return large[1]
+
+def next_prime(n):
+    ''' The smallest prime greater than n. '''
+    if n < 2:
+        return 2
+    n += 1 + (n & 1)
+    while not is_prime(n):
+        n += 2
+    return n
+
+def previous_prime(n):
+    ''' The largest prime less than n. '''
+    if n <= 2:
+        raise ValueError('There is no prime less than {}'.format(n))
+    elif n == 3:
+        return 2
+    n -= 1 + (n & 1)
+    while not is_prime(n):
+        n -= 2
+    return n
+
+def _powers(n):
+    ''' Return the prime factorisation of n as (prime, exponent) pairs. '''
+    powers = []
+    for p in factorise(n):
+        if powers and powers[-1][0] == p:
+            powers[-1][1] += 1
+        else:
+            powers.append([p, 1])
+    return powers
+
+def totient(n):
+    ''' Euler's totient function: the number of integers from 1 to n which
+    are coprime to n. '''
+    result = 1
+    for p, k in _powers(n):
+        result *= p ** (k - 1) * (p - 1)
+    return result
+
+def divisors(n):
+    ''' Return a sorted list of the positive divisors of n. '''
+    ds = [1]
+    for p, k in _powers(n):
+        ds = [d * p ** j for d in ds for j in range(k + 1)]
+    return sorted(ds)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+''' Recognition of real numbers in simple exact forms, such as 3/4, 2pi/3 or
+3*2^(1/2)/2, for display.
+
+Candidate forms are found in floating point: rationals from the convergents
+of the continued fraction of a number, and small rational multiples of pi, e,
+square roots and logarithms from an index of their values, sorted so that
+those near a number may be found by bisection. Each candidate is then checked
+against the number at the working precision, and is only accepted if the two
+agree to as many significant figures as the number is trusted to. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import math
+from bisect import bisect_left
+from decimal import Decimal
+from fractions import Fraction, gcd
+from threading import Lock
+
+# Project modules
+from cas.cache import lru_cache
+import cas.constants as constants
+
+# Rationals are recognised with denominators below this
+MAX_DENOMINATOR = 50
+# Multiples of the constants are recognised with denominators up to this
+MAX_MULTIPLE_DENOMINATOR = 12
+# The index holds the multiples of the constants up to this value; larger
+# numbers are divided by each constant and their quotients recognised as
+# rationals instead
+INDEX_LIMIT = 100
+# Forms p/q, or p/q times a constant, which are not exactly equal to a number
+# are only recognised in it if it is trusted to at least this many significant
+# figures more than there are in p*q, below which too many of them agree with
+# any number
+SPARE_DIGITS = 4
+
+def _symbol(name):
+    ''' Return a function writing p/q times a constant named by a symbol,
+    as in 2pi/3. '''
+    return lambda p, q: (str(p) if p != 1 else '') + name\
+        + ('/' + str(q) if q != 1 else '')
+
+def _factor(name):
+    ''' Return a function writing p/q times a constant written as a power or
+    a function, as in 2*3^(1/2)/3. '''
+    return lambda p, q: (str(p) + '*' if p != 1 else '') + name\
+        + ('/' + str(q) if q != 1 else '')
+
+@lru_cache(maxsize=100, context=True)
+def _sqrt(n):
+    return Decimal(n).sqrt()
+
+@lru_cache(maxsize=100, context=True)
+def _ln(n):
+    return Decimal(n).ln()
+
+def _perfect_power(n):
+    ''' Return whether n is a perfect power, such as 8 or 9. '''
+    return any(int(round(n ** (1 / k))) ** k == n for k in range(2, 7))
+
+class Base(object):
+    ''' A constant whose rational multiples are recognised. The value is a
+    function returning the constant at the current precision. '''
+    def __init__(self, name, value, approximation, write):
+        self.name, self.value, self.approximation = name, value, approximation
+        self.write = write
+
+    def __repr__(self):
+        return '<Base {}>'.format(self.name)
+
+# The constants, in order of preference where multiples of more than one
+# agree with a number. Square roots and logarithms are of integers which
+# are not multiples of one another.
+BASES = [Base('pi', constants.pi, math.pi, _symbol('pi')),
+    Base('e', constants.e, math.e, _symbol('e'))]\
+    + [Base('{}^(1/2)'.format(n), lambda n=n: _sqrt(n), math.sqrt(n),
+        _factor('{}^(1/2)'.format(n))) for n in range(2, 51)
+        if all(n % (k * k) for k in range(2, 8))]\
+    + [Base('ln({})'.format(n), lambda n=n: _ln(n), math.log(n),
+        _factor('ln({})'.format(n))) for n in range(2, 21)
+        if not _perfect_power(n)]
+
+# The index of the multiples of the constants, as a sorted list of their
+# values and a list of the (denominator, rank of constant, numerator) each
+# value stands for; it is built when first needed
+_index = None
+_index_lock = Lock()
+
+def index():
+    ''' Return the index of the multiples of the constants up to INDEX_LIMIT
+    with denominators up to MAX_MULTIPLE_DENOMINATOR. '''
+    global _index
+    with _index_lock:
+        if _index is None:
+            entries = sorted((p * base.approximation / q, q, rank, p)
+                for rank, base in enumerate(BASES)
+                for q in range(1, MAX_MULTIPLE_DENOMINATOR + 1)
+                for p in range(1, int(INDEX_LIMIT * q / base.approximation) + 1)
+                if gcd(p, q) == 1)
+            _index = ([e[0] for e in entries], [e[1:] for e in entries])
+        return _index
+
+def convergents(x, max_terms=30):
+    ''' Yield the convergents (p, q) of the continued fraction of the positive
+    float x, stopping once it has been represented to the precision of a
+    float. '''
+    p0, q0, p1, q1 = 0, 1, 1, 0
+    y = x
+    for i in range(max_terms):
+        a = int(y)
+        p0, q0, p1, q1 = p1, q1, a * p1 + p0, a * q1 + q0
+        yield p1, q1
+        if abs(p1 - x * q1) <= 1e-15 * x * q1 or y == a:
+            return
+        y = 1 / (y - a)
+
+def recognise(y, digits):
+    ''' Return a string of the simplest exact form of the Decimal y, with the
+    same sign, agreeing with it to the given number of significant figures,
+    along with whether it is anything more than an integer; or None if there
+    is no such form. Simpler forms have smaller denominators, and rationals
+    are simpler than multiples of any constant. '''
+    sign = '-' if y < 0 else ''
+    y = abs(y)
+    x = float(y)
+    if not y or math.isinf(x):
+        return None
+
+    # The largest p*q of the inexact forms which may be recognised
+    size = 10 ** (digits - SPARE_DIGITS)
+
+    # Candidates are (denominator, rank of constant, numerator), rationals
+    # being given a rank of -1
+    candidates = []
+    for p, q in convergents(x):
+        if q >= MAX_DENOMINATOR:
+            break
+        if p:
+            candidates.append((q, -1, p))
+
+    if size >= 1:
+        if x <= INDEX_LIMIT:
+            keys, forms = index()
+            window = x * max(10.0 ** -digits, 1e-12)
+            i = bisect_left(keys, x - window)
+            while i < len(keys) and keys[i] <= x + window:
+                candidates.append(forms[i])
+                i += 1
+        else:
+            for rank, base in enumerate(BASES):
+                for p, q in convergents(x / base.approximation):
+                    if q > MAX_MULTIPLE_DENOMINATOR or p * q > size:
+                        break
+                    candidates.append((q, rank, p))
+
+    # Check the candidates at the working precision, simplest first
+    tolerance = y.scaleb(-digits)
+    for q, rank, p in sorted(candidates):
+        if rank == -1:
+            if Fraction(y) == Fraction(p, q) or p * q <= size\
+                    and abs(Decimal(p) / q - y) <= tolerance:
+                return (sign + str(p), False) if q == 1\
+                    else (sign + '{}/{}'.format(p, q), True)
+        elif p * q <= size:
+            base = BASES[rank]
+            if abs(p * base.value() / q - y) <= tolerance:
+                return sign + base.write(p, q), True
+    return None
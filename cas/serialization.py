@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+# coding=utf-8
+''' A compact, versioned binary encoding for algebraic expressions, numbers,
+vectors and matrices, used to store sessions and caches and to send work to
+other processes.
+
+Every value is written as a one byte tag followed by its fields. Integers are
+written as variable length (base 128) integers, with signed values zigzag
+encoded, and Reals as their decimal sign, exponent and coefficient. Any
+expression which appears more than once in a tree is written once and
+afterwards referred to by its position in the order in which expressions were
+completed, so shared subtrees are neither duplicated nor rebuilt. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import struct
+from binascii import hexlify, unhexlify
+from decimal import Decimal
+
+# Project modules
+from cas.core import Algebra, Symbol, Sum, Product, Power, Fraction, Ln, Sin,\
+    Cos, Tan, Factorial, List, StrWithHtml, record_size
+from cas.numeric import Integer, Long, Rational, Real, Complex, _integer
+from cas.vectors import Vector
+from cas.matrices import Matrix
+
+# The header identifying the format and its version
+MAGIC = b'C1K'
+VERSION = 1
+
+# Functions which may be encoded, by name
+functions = {'ln': Ln, 'sin': Sin, 'cos': Cos, 'tan': Tan,
+    'factorial': Factorial}
+function_names = dict((f, name) for name, f in functions.items())
+
+
+class SerializationError(ValueError):
+    ''' Raised when a value cannot be encoded or data cannot be decoded. '''
+
+
+def _varint(out, n):
+    ''' Append the natural number n in base 128, least significant first. '''
+    while n > 0x7f:
+        out.append(0x80 | (n & 0x7f))
+        n >>= 7
+    out.append(n)
+
+def _zigzag(out, n):
+    ''' Append a signed integer, interleaving positive and negative values. '''
+    _varint(out, 2 * n if n >= 0 else -2 * n - 1)
+
+def _string(out, s):
+    ''' Append a length prefixed utf-8 string. '''
+    s = s.encode('utf-8') if isinstance(s, unicode) else s
+    _varint(out, len(s))
+    out.extend(s)
+
+def _natural(out, n):
+    ''' Append a natural number of any size as a length prefixed big endian
+    string of bytes, which is quicker to produce than base 128 for the long
+    coefficients of Decimals. '''
+    h = '%x' % n
+    s = unhexlify('0' + h if len(h) & 1 else h)
+    _varint(out, len(s))
+    out.extend(s)
+
+def _decimal(out, x):
+    ''' Append the fields of a Decimal: a flag byte holding its sign and kind,
+    followed by the exponent and coefficient of finite values. '''
+    if x.is_finite():
+        out.append(x.is_signed())
+        # The pure python implementation of Decimal stores its exponent and
+        # coefficient directly, which saves the cost of building a tuple
+        try:
+            exponent, digits = x._exp, x._int
+        except AttributeError:
+            sign, digits, exponent = x.as_tuple()
+            digits = ''.join(map(str, digits))
+        _zigzag(out, exponent)
+        _natural(out, int(digits))
+    else:
+        out.append(x.is_signed() | (1 if x.is_infinite() else
+            2 if x.is_qnan() else 3) << 1)
+
+
+class _Encoder(object):
+    ''' Encode a single value into a bytearray. '''
+    def __init__(self):
+        self.out = bytearray()
+        self.memo = {}
+        # The objects whose identities are used in the memo must be kept
+        # alive until encoding has finished
+        self.seen = []
+
+    def encode(self, x):
+        memoise = isinstance(x, (Algebra, List))
+        if memoise:
+            # Back references to expressions which have already been written
+            key = ('s', str(x)) if isinstance(x, Symbol) else id(x)
+            if key in self.memo:
+                self.out.extend(b'@')
+                _varint(self.out, self.memo[key])
+                return
+
+        t = x.__class__
+        try:
+            method = _encoders[t]
+        except KeyError:
+            # Subclasses are encoded as the nearest class which is supported
+            for base in t.__mro__ if hasattr(t, '__mro__') else ():
+                if base in _encoders:
+                    method = _encoders[t] = _encoders[base]
+                    break
+            else:
+                raise SerializationError('Cannot serialize ' + t.__name__)
+        method(self, x)
+
+        # Expressions are numbered in the order they are completed
+        if memoise:
+            self.memo[key] = len(self.memo)
+            self.seen.append(x)
+
+    def none(self, x):
+        self.out.extend(b'N')
+
+    def bool(self, x):
+        self.out.extend(b'T' if x else b'Z')
+
+    def integer(self, x):
+        self.out.extend(b'i')
+        _zigzag(self.out, int(x))
+
+    def int(self, x):
+        self.out.extend(b'I')
+        _zigzag(self.out, x)
+
+    def rational(self, x):
+        self.out.extend(b'q')
+        _zigzag(self.out, x.numerator)
+        _varint(self.out, x.denominator)
+
+    def real(self, x):
+        self.out.extend(b'r')
+        _decimal(self.out, x)
+
+    def decimal(self, x):
+        self.out.extend(b'd')
+        _decimal(self.out, x)
+
+    def float(self, x):
+        self.out.extend(b'f')
+        self.out.extend(struct.pack('<d', x))
+
+    def complex_(self, x):
+        self.out.extend(b'C')
+        self.encode(x.real)
+        self.encode(x.imag)
+
+    def complex(self, x):
+        self.out.extend(b'c')
+        self.out.extend(struct.pack('<dd', x.real, x.imag))
+
+    def str(self, x):
+        self.out.extend(b'u')
+        _string(self.out, x)
+
+    def str_with_html(self, x):
+        self.out.extend(b'h')
+        _string(self.out, x.plain)
+        _string(self.out, x.html)
+
+    def symbol(self, x):
+        self.out.extend(b's')
+        _string(self.out, str(x))
+
+    def power(self, x):
+        self.out.extend(b'W')
+        self.encode(x.a())
+        self.encode(x.b())
+
+    def fraction(self, x):
+        self.out.extend(b'F')
+        self.encode(x.numerator())
+        self.encode(x.denominator())
+
+    def function(self, x):
+        self.out.extend(b'x')
+        _string(self.out, function_names[type(x)])
+        self.encode(x.x())
+
+    def matrix(self, x):
+        self.out.extend(b'M')
+        rows, cols = x.order()
+        _varint(self.out, rows)
+        _varint(self.out, cols)
+        for row in x:
+            for a in row:
+                self.encode(a)
+
+    def dict(self, x):
+        self.out.extend(b'D')
+        _varint(self.out, len(x))
+        for k, v in sorted(x.items()):
+            self.encode(k)
+            self.encode(v)
+
+# The method used to encode each type, chosen by the exact type of a value
+_encoders = {
+    type(None): _Encoder.none, bool: _Encoder.bool, Integer: _Encoder.integer,
+    Long: _Encoder.integer, int: _Encoder.int, long: _Encoder.int,
+    Rational: _Encoder.rational, Real: _Encoder.real,
+    Decimal: _Encoder.decimal, float: _Encoder.float,
+    Complex: _Encoder.complex_, complex: _Encoder.complex, str: _Encoder.str,
+    unicode: _Encoder.str, StrWithHtml: _Encoder.str_with_html,
+    Symbol: _Encoder.symbol, Power: _Encoder.power,
+    Fraction: _Encoder.fraction, Matrix: _Encoder.matrix,
+    dict: _Encoder.dict,
+}
+
+def _sequence(tag):
+    ''' Return a method encoding a sequence of values with the given tag. '''
+    def encode(self, x):
+        self.out.extend(tag)
+        xs = list(x)
+        _varint(self.out, len(xs))
+        for a in xs:
+            self.encode(a)
+    return encode
+
+_encoders.update((t, _sequence(tag)) for t, tag in [(Sum, b'S'),
+    (Product, b'P'), (Vector, b'V'), (List, b'L'), (tuple, b't'),
+    (list, b'l')])
+_encoders.update((f, _Encoder.function) for f in function_names)
+
+
+def _build(cls, children, **state):
+    ''' Create an expression directly from its (already normalised) state,
+    bypassing the simplification done by its constructor. '''
+    a = Algebra.__new__(cls)
+    for name, value in state.items():
+        setattr(a, '_{}__{}'.format(cls.__name__, name), value)
+    if children is not None:
+        record_size(a, children)
+    return a
+
+
+class _Decoder(object):
+    ''' Decode a single value from a buffer. '''
+    def __init__(self, data, i):
+        self.data, self.i = bytearray(data), i
+        self.memo = []
+
+    def byte(self):
+        try:
+            b = self.data[self.i]
+        except IndexError:
+            raise SerializationError('Unexpected end of data')
+        self.i += 1
+        return b
+
+    def varint(self):
+        n = shift = 0
+        while True:
+            b = self.byte()
+            n |= (b & 0x7f) << shift
+            shift += 7
+            if not b & 0x80:
+                return n
+
+    def zigzag(self):
+        n = self.varint()
+        return n // 2 if not n & 1 else -(n + 1) // 2
+
+    def take(self, n):
+        if self.i + n > len(self.data):
+            raise SerializationError('Unexpected end of data')
+        self.i += n
+        return bytes(self.data[self.i - n:self.i])
+
+    def string(self):
+        return self.take(self.varint()).decode('utf-8')
+
+    def raw(self, fmt):
+        return struct.unpack(fmt, self.take(struct.calcsize(fmt)))
+
+    def decimal(self):
+        ''' Return the string representation of an encoded Decimal. '''
+        flags = self.byte()
+        sign, kind = '-' if flags & 1 else '', flags >> 1
+        if kind:
+            return sign + {1: 'Infinity', 2: 'NaN', 3: 'sNaN'}[kind]
+        exponent = self.zigzag()
+        coefficient = int(hexlify(self.take(self.varint())) or '0', 16)
+        return '{}{}E{}'.format(sign, coefficient, exponent)
+
+    def decode(self):
+        tag = self.byte()
+        try:
+            method = _decoders[tag]
+        except KeyError:
+            raise SerializationError('Unknown tag ' + repr(chr(tag)))
+        x = method(self)
+        # Back references are not numbered by the encoder, so must not be here
+        if tag != _REFERENCE and isinstance(x, (Algebra, List)):
+            self.memo.append(x)
+        return x
+
+    def reference(self):
+        try:
+            return self.memo[self.varint()]
+        except IndexError:
+            raise SerializationError('Invalid back reference')
+
+    def function(self):
+        name = self.string()
+        if name not in functions:
+            raise SerializationError('Unknown function ' + name)
+        return functions[name](self.decode())
+
+    def matrix(self):
+        rows, cols = self.varint(), self.varint()
+        values = [[self.decode() for j in range(cols)] for i in range(rows)]
+        return _build(Matrix, None, values=values, rows=rows, cols=cols)
+
+    def dict(self):
+        x = {}
+        for i in range(self.varint()):
+            k = self.decode()
+            x[k] = self.decode()
+        return x
+
+    def sequence(self):
+        return [self.decode() for i in range(self.varint())]
+
+    def terms(self, cls):
+        xs = self.sequence()
+        return _build(cls, xs, terms=xs)
+
+    def power(self):
+        a, b = self.pair()
+        return _build(Power, (a, b), a=a, b=b)
+
+    def fraction(self):
+        a, b = self.pair()
+        return _build(Fraction, (a, b), numerator=a, denominator=b)
+
+    def pair(self):
+        return self.decode(), self.decode()
+
+# The tag of a back reference to an expression already decoded
+_REFERENCE = ord('@')
+
+# The method used to decode the value following each tag
+_decoders = dict((ord(tag), f) for tag, f in {
+    '@': lambda self: self.reference(),
+    'N': lambda self: None,
+    'T': lambda self: True,
+    'Z': lambda self: False,
+    'i': lambda self: _integer(self.zigzag()),
+    'I': lambda self: self.zigzag(),
+    'q': lambda self: Rational(self.zigzag(), self.varint()),
+    'r': lambda self: Real(self.decimal()),
+    'd': lambda self: Decimal(self.decimal()),
+    'f': lambda self: self.raw('<d')[0],
+    'c': lambda self: complex(*self.raw('<dd')),
+    'C': lambda self: Complex(*self.pair()),
+    'u': lambda self: self.string(),
+    'h': lambda self: StrWithHtml(self.string(), self.string()),
+    's': lambda self: Symbol(self.string()),
+    'S': lambda self: self.terms(Sum),
+    'P': lambda self: self.terms(Product),
+    'V': lambda self: Vector(self.sequence()),
+    'L': lambda self: List(*self.sequence()),
+    't': lambda self: tuple(self.sequence()),
+    'l': lambda self: self.sequence(),
+    'W': lambda self: self.power(),
+    'F': lambda self: self.fraction(),
+    'x': lambda self: self.function(),
+    'M': lambda self: self.matrix(),
+    'D': lambda self: self.dict(),
+}.items())
+
+
+def dumps(x):
+    ''' Encode x as a string of bytes. '''
+    encoder = _Encoder()
+    encoder.out.extend(MAGIC)
+    encoder.out.append(VERSION)
+    encoder.encode(x)
+    return bytes(encoder.out)
+
+def loads(data):
+    ''' Decode a value encoded by dumps. '''
+    if data[:len(MAGIC)] != MAGIC:
+        raise SerializationError('Not a serialized expression')
+    version = bytearray(data[len(MAGIC):len(MAGIC) + 1])
+    if not version or version[0] > VERSION:
+        raise SerializationError('Unsupported version')
+    decoder = _Decoder(data, len(MAGIC) + 1)
+    x = decoder.decode()
+    if decoder.i != len(decoder.data):
+        raise SerializationError('Trailing data')
+    return x
@@ -0,0 +1,502 @@
+#!/usr/bin/env python
+''' Special functions of real Decimals to the current precision: the gamma
+and beta functions, the error function, the Riemann zeta function and the
+regularized incomplete gamma and beta functions.
+
+Each is evaluated by whichever of its series, continued fractions and
+asymptotic expansions converges quickest for its argument, with a few guard
+digits beyond the working precision, and more wherever digits are lost to
+cancellation. Continued fractions are evaluated by the modified Lentz
+method. See:
+    - W. H. Press et al., Numerical Recipes, 3rd edition (2007), chapters 5
+      and 6
+    - P. Borwein, An efficient algorithm for the Riemann zeta function,
+      Canadian Mathematical Society Conference Proceedings 27 (2000),
+      29-34 '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import math
+from decimal import Decimal, getcontext, localcontext
+from fractions import Fraction
+from numbers import Integral, Rational as RationalNumber
+from threading import Lock
+
+# Third party modules
+import dmath
+
+# Project modules
+import cas.constants as constants
+
+# The number of digits computed beyond the working precision
+GUARD_DIGITS = 5
+# The gamma function of positive integers up to this is found exactly, as a
+# factorial
+EXACT_FACTORIALS = 1000
+# The most terms or iterations of any series or continued fraction, beyond
+# which it is taken not to converge
+MAX_ITERATIONS = 100000
+
+def _decimal(x):
+    ''' Convert a number to a Decimal, exactly for Decimals and integers and
+    otherwise at the current precision. '''
+    if isinstance(x, Decimal):
+        # Subclasses, such as cas.numeric.Real, are converted so that the
+        # working is all in plain Decimals
+        return Decimal(x)
+    elif isinstance(x, Integral):
+        return Decimal(int(x))
+    elif isinstance(x, RationalNumber):
+        return Decimal(x.numerator) / Decimal(x.denominator)
+    return Decimal(repr(float(x)))
+
+def _is_integer(x):
+    return x == x.to_integral_value()
+
+def _epsilon():
+    ''' Return the relative size of a unit in the last place at the current
+    precision. '''
+    return Decimal(10) ** -getcontext().prec
+
+def _lentz(b0, terms):
+    ''' Evaluate the continued fraction b0 + a1/(b1 + a2/(b2 + ...)), where
+    terms yields the pairs (an, bn), to the current precision. '''
+    tiny = Decimal(10) ** (-2 * getcontext().prec)
+    eps = _epsilon()
+    f = b0 or tiny
+    C, D = f, Decimal(0)
+    for i, (a, b) in enumerate(terms):
+        D = b + a * D
+        D = 1 / (D or tiny)
+        C = b + a / C
+        C = C or tiny
+        delta = C * D
+        f *= delta
+        if abs(delta - 1) <= eps:
+            return f
+        if i > MAX_ITERATIONS:
+            break
+    raise ValueError('A continued fraction failed to converge')
+
+# The Bernoulli numbers B(2), B(4), ... found so far, as Fractions
+_bernoulli_numbers = []
+_bernoulli_lock = Lock()
+
+def _tangent_numbers(n):
+    ''' Return the first n tangent numbers T(1), ..., T(n), the coefficients
+    of x^(2k - 1)/(2k - 1)! in tan(x), with O(n^2) small integer
+    multiplications. See:
+        - R. P. Brent and D. Harvey, Fast computation of Bernoulli, tangent
+          and secant numbers, Springer Proceedings in Mathematics and
+          Statistics 50 (2013), 127-142 '''
+    T = [0, 1] + [0] * (n - 1)
+    for k in range(2, n + 1):
+        T[k] = (k - 1) * T[k - 1]
+    for k in range(2, n + 1):
+        for j in range(k, n + 1):
+            T[j] = (j - k) * T[j - 1] + (j - k + 2) * T[j]
+    return T[1:]
+
+def _bernoulli(k):
+    ''' Return the kth Bernoulli number (taking B1 = +1/2) as a Decimal.
+    The even Bernoulli numbers are found from the tangent numbers, all of
+    those up to the one asked for together, and remembered. '''
+    if k < 2 or k % 2:
+        return Decimal(1) if k == 0 else Decimal('0.5') if k == 1\
+            else Decimal(0)
+    with _bernoulli_lock:
+        if k // 2 > len(_bernoulli_numbers):
+            n = max(k // 2, 2 * len(_bernoulli_numbers))
+            _bernoulli_numbers[:] = [Fraction((-1) ** (i - 1) * 2 * i * T,
+                    4 ** i * (4 ** i - 1))
+                for i, T in enumerate(_tangent_numbers(n), 1)]
+        b = _bernoulli_numbers[k // 2 - 1]
+    return Decimal(b.numerator) / Decimal(b.denominator)
+
+#
+# The gamma and beta functions
+#
+
+def _lgamma_stirling(x):
+    ''' Return the logarithm of the gamma function of x > 0 by Stirling's
+    series, after shifting x up until the series converges to the working
+    precision with only a few terms. '''
+    prec = getcontext().prec
+    # The terms of the series fall as (k / (pi x))^2k, so shifting x up to
+    # around the precision makes each fall by a factor of at least a few
+    # hundred
+    shift = max(0, int(prec + 10 - x))
+    product = Decimal(1)
+    for i in range(shift):
+        product *= x + i
+    y = x + shift
+    s = (y - Decimal('0.5')) * y.ln() - y\
+        + (2 * constants.pi()).ln() / 2
+    eps = _epsilon() * abs(s)
+    y2 = y * y
+    power = y
+    for k in range(1, MAX_ITERATIONS):
+        term = _bernoulli(2 * k) / (2 * k * (2 * k - 1) * power)
+        s += term
+        if abs(term) <= eps:
+            break
+        power *= y2
+    return s - product.ln() if shift else s
+
+def _sin_pi(x):
+    ''' Return sin(pi x), reducing x exactly modulo 2 first so that no digits
+    are lost for large x. '''
+    with localcontext() as c:
+        c.prec = max(c.prec, x.adjusted() + 2)
+        r = x % 2
+    return dmath.sin(constants.pi() * r)
+
+def lgamma(x):
+    ''' Return the natural logarithm of the absolute value of the gamma
+    function of x. '''
+    x = _decimal(x)
+    if x <= 0 and _is_integer(x):
+        raise ValueError('The gamma function has poles at the integers <= 0')
+    with localcontext() as c:
+        c.prec += GUARD_DIGITS
+        if x > 0 and _is_integer(x) and x <= EXACT_FACTORIALS:
+            y = Decimal(math.factorial(int(x) - 1)).ln()
+        elif x > 0:
+            y = _lgamma_stirling(x)
+        else:
+            # The reflection formula, gamma(x) gamma(1 - x) = pi / sin(pi x)
+            y = constants.pi().ln() - abs(_sin_pi(x)).ln()\
+                - _lgamma_stirling(1 - x)
+    return +y
+
+def _gamma_sign(x):
+    ''' Return the sign of the gamma function of x, which is not a pole. '''
+    return 1 if x > 0 or int(x.to_integral_value(rounding='ROUND_FLOOR')) % 2\
+        == 0 else -1
+
+def gamma(x):
+    ''' Return the gamma function of x, which is (x - 1)! for positive
+    integers x. '''
+    x = _decimal(x)
+    if x <= 0 and _is_integer(x):
+        raise ValueError('The gamma function has poles at the integers <= 0')
+    if x > 0 and _is_integer(x) and x <= EXACT_FACTORIALS:
+        return +Decimal(math.factorial(int(x) - 1))
+    with localcontext() as c:
+        # The error in the logarithm becomes a relative error in the result,
+        # so it is found to as many more digits as there are before its point
+        c.prec += GUARD_DIGITS
+        l = lgamma(x)
+        c.prec += max(0, l.adjusted() + 1)
+        y = _gamma_sign(x) * lgamma(x).exp()
+    return +y
+
+def beta(a, b):
+    ''' Return the beta function of a and b, gamma(a) gamma(b) / gamma(a + b).
+    '''
+    a, b = _decimal(a), _decimal(b)
+    if all(x > 0 and _is_integer(x) for x in (a, b))\
+            and a + b <= EXACT_FACTORIALS:
+        m, n = int(a), int(b)
+        return Decimal(math.factorial(m - 1) * math.factorial(n - 1))\
+            / Decimal(math.factorial(m + n - 1))
+    if a + b <= 0 and _is_integer(a + b):
+        # gamma(a + b) is infinite where gamma(a) and gamma(b) are not
+        if not (a <= 0 and _is_integer(a) or b <= 0 and _is_integer(b)):
+            return Decimal(0)
+    with localcontext() as c:
+        c.prec += GUARD_DIGITS
+        l = lgamma(a) + lgamma(b) - lgamma(a + b)
+        c.prec += max(0, l.adjusted() + 1)
+        l = lgamma(a) + lgamma(b) - lgamma(a + b)
+        y = _gamma_sign(a) * _gamma_sign(b) * _gamma_sign(a + b) * l.exp()
+    return +y
+
+#
+# The error function
+#
+
+def _erf_series(x):
+    ''' Return erf(x) for x >= 0 by the series
+        erf(x) = 2/sqrt(pi) exp(-x^2) sum(2^n x^(2n+1) / (1.3.5...(2n+1)))
+    the terms of which are all positive. '''
+    x2 = x * x
+    term = s = x
+    eps = _epsilon()
+    n = 0
+    while term > eps * s:
+        n += 1
+        term = term * 2 * x2 / (2 * n + 1)
+        s += term
+    return 2 * s * (-x2).exp() / constants.pi().sqrt()
+
+def _erfc_fraction(x):
+    ''' Return erfc(x) for x > 0 by the continued fraction
+        erfc(x) = exp(-x^2)/sqrt(pi) / (x + (1/2)/(x + 1/(x + (3/2)/(x + ...))))
+    '''
+    f = _lentz(x, ((Decimal(n) / 2, x) for n in range(1, MAX_ITERATIONS)))
+    return (-x * x).exp() / constants.pi().sqrt() / f
+
+def _erfc_asymptotic(x):
+    ''' Return erfc(x) for large x by the asymptotic expansion
+        erfc(x) = exp(-x^2)/(x sqrt(pi)) sum((-1)^n (2n - 1)!! / (2x^2)^n)
+    the error of which is less than its first omitted term. '''
+    y = 1 / (2 * x * x)
+    term = s = Decimal(1)
+    eps = _epsilon()
+    n = 0
+    while abs(term) > eps:
+        n += 1
+        next_term = -term * (2 * n - 1) * y
+        if abs(next_term) >= abs(term):
+            break
+        term = next_term
+        s += term
+    return (-x * x).exp() * s / (x * constants.pi().sqrt())
+
+def _erfc_positive(x):
+    ''' Return erfc(x) for x >= 0 in the current context. '''
+    digits = getcontext().prec * math.log(10)
+    x2 = float(x * x)
+    if x2 > digits + 10:
+        # The smallest term of the asymptotic expansion is around exp(-x^2)
+        return _erfc_asymptotic(x)
+    elif x2 > digits / 4:
+        # The continued fraction needs around (digits / 4x)^2 iterations,
+        # which beyond here are fewer than the terms of the series
+        return _erfc_fraction(x)
+    # erfc(x) = 1 - erf(x) is around exp(-x^2), so the digits before it are
+    # lost in the subtraction
+    with localcontext() as c:
+        c.prec += int(x2 / math.log(10)) + 2
+        y = 1 - _erf_series(x)
+    return +y
+
+def erf(x):
+    ''' Return the error function of x, 2/sqrt(pi) times the integral of
+    exp(-t^2) from 0 to x. '''
+    x = _decimal(x)
+    if x.is_infinite():
+        return Decimal(1 if x > 0 else -1)
+    with localcontext() as c:
+        c.prec += GUARD_DIGITS
+        digits = c.prec * math.log(10)
+        if float(x * x) <= digits / 4:
+            y = _erf_series(abs(x))
+        else:
+            y = 1 - _erfc_positive(abs(x))
+    return +y if x >= 0 else -y
+
+def erfc(x):
+    ''' Return the complementary error function of x, 1 - erf(x). '''
+    x = _decimal(x)
+    if x.is_infinite():
+        return Decimal(0 if x > 0 else 2)
+    with localcontext() as c:
+        c.prec += GUARD_DIGITS
+        y = _erfc_positive(x) if x >= 0 else 1 + erf(-x)
+    return +y
+
+def normal_cdf(x):
+    ''' Return the cumulative distribution function of the standard normal
+    distribution at x, erfc(-x/sqrt(2))/2. '''
+    x = _decimal(x)
+    if x.is_infinite():
+        return Decimal(1 if x > 0 else 0)
+    with localcontext() as c:
+        # The relative error in erfc(y) is around 2y^2 times that in y
+        c.prec += GUARD_DIGITS + len(str(int(x * x)))
+        y = erfc(-x / constants.sqrt2()) / 2
+    return +y
+
+#
+# The Riemann zeta function
+#
+
+def _zeta_borwein(s):
+    ''' Return the Riemann zeta function of s > 0 from the alternating series
+    for (1 - 2^(1 - s)) zeta(s), accelerated by Borwein's algorithm 2, with
+    an error of around 3 / (3 + sqrt(8))^n for n terms. '''
+    prec = getcontext().prec
+    n = int(prec * math.log(10) / math.log(3 + math.sqrt(8))) + 2
+    # The coefficients d(k) = n sum((n + i - 1)! 4^i / ((n - i)! (2i)!)),
+    # summed for i from 0 to k, are integers
+    d, term = [], 1
+    for i in range(n + 1):
+        if i:
+            term = term * 4 * (n + i - 1) * (n - i + 1) // (2 * i * (2 * i - 1))
+        d.append(term + (d[-1] if d else 0))
+    integer = _is_integer(s)
+    total = Decimal(0)
+    for k in range(n):
+        power = Decimal(k + 1) ** int(s) if integer\
+            else (s * Decimal(k + 1).ln()).exp()
+        term = Decimal((-1) ** k * (d[k] - d[n])) / power
+        total += term
+    return -total / (d[n] * (1 - Decimal(2) ** (1 - s)))
+
+def zeta(s):
+    ''' Return the Riemann zeta function of s, the sum of 1/k^s for positive
+    integers k where s > 1, and its analytic continuation elsewhere. '''
+    s = _decimal(s)
+    if s == 1:
+        raise ValueError('The zeta function has a pole at 1')
+    elif s.is_infinite():
+        if s > 0:
+            return Decimal(1)
+        raise ValueError('The zeta function has no limit at -infinity')
+    with localcontext() as c:
+        c.prec += GUARD_DIGITS
+        prec = c.prec
+        if _is_integer(s) and s <= 0:
+            # zeta(-n) = (-1)^n B(n + 1) / (n + 1)
+            n = -int(s)
+            y = (-1) ** n * _bernoulli(n + 1) / (n + 1)\
+                if n else Decimal('-0.5')
+        elif _is_integer(s) and s % 2 == 0 and s <= 2 * prec:
+            # zeta(2n) = (-1)^(n + 1) B(2n) (2 pi)^(2n) / (2 (2n)!)
+            n = int(s) // 2
+            y = (-1) ** (n + 1) * _bernoulli(2 * n)\
+                * (2 * constants.pi()) ** (2 * n)\
+                / (2 * math.factorial(2 * n))
+        elif s < 0:
+            # The functional equation,
+            # zeta(s) = 2^s pi^(s - 1) sin(pi s / 2) gamma(1 - s) zeta(1 - s),
+            # with more digits for those lost in the large powers
+            c.prec += int(float(abs(s)) * math.log10(2 * math.pi)) + 2
+            y = 2 ** s * constants.pi() ** (s - 1) * _sin_pi(s / 2)\
+                * gamma(1 - s) * zeta(1 - s)
+        else:
+            # The terms of the sum itself become small enough after n of them
+            # for large s
+            log_n = prec * math.log(10) / float(s - 1) if s > 1\
+                else float('inf')
+            if log_n <= math.log(prec):
+                y = sum(1 / Decimal(k) ** s if not _is_integer(s)
+                    else 1 / Decimal(k ** int(s))
+                    for k in range(1, int(math.exp(log_n)) + 2))
+            else:
+                # Digits are lost in dividing by 1 - 2^(1 - s) near s = 1
+                c.prec += max(0, -(1 - Decimal(2) ** (1 - s)).adjusted())
+                y = _zeta_borwein(s)
+    return +y
+
+#
+# The regularized incomplete gamma and beta functions
+#
+
+def _gamma_prefactor(a, x):
+    ''' Return x^a exp(-x) / gamma(a), with more digits for those lost in
+    exponentiating its logarithm. '''
+    with localcontext() as c:
+        l = a * x.ln() - x - lgamma(a)
+        c.prec += max(0, l.adjusted() + 1)
+        l = a * x.ln() - x - lgamma(a)
+        y = l.exp()
+    return +y
+
+def _gammainc_series(a, x):
+    ''' Return P(a, x) for x < a + 1 by the series
+        P(a, x) = x^a exp(-x) / gamma(a) sum(x^n / (a (a + 1) ... (a + n))) '''
+    term = s = 1 / a
+    eps = _epsilon()
+    n = 0
+    while abs(term) > eps * abs(s):
+        n += 1
+        term = term * x / (a + n)
+        s += term
+        if n > MAX_ITERATIONS:
+            raise ValueError('A series failed to converge')
+    return s * _gamma_prefactor(a, x)
+
+def _gammaincc_fraction(a, x):
+    ''' Return Q(a, x) for x >= a + 1 by its continued fraction. '''
+    f = _lentz(x + 1 - a, ((-n * (n - a), x + 2 * n + 1 - a)
+        for n in range(1, MAX_ITERATIONS)))
+    return _gamma_prefactor(a, x) / f
+
+def _check_gammainc(a, x):
+    a, x = _decimal(a), _decimal(x)
+    if a <= 0 or x < 0:
+        raise ValueError('The incomplete gamma function is only defined for'
+            ' a > 0 and x >= 0')
+    return a, x
+
+def gammainc(a, x):
+    ''' Return the regularized lower incomplete gamma function P(a, x), the
+    integral of t^(a - 1) exp(-t) from 0 to x divided by gamma(a). '''
+    a, x = _check_gammainc(a, x)
+    if x == 0:
+        return Decimal(0)
+    with localcontext() as c:
+        c.prec += GUARD_DIGITS
+        y = _gammainc_series(a, x) if x < a + 1\
+            else 1 - _gammaincc_fraction(a, x)
+    return +y
+
+def gammaincc(a, x):
+    ''' Return the regularized upper incomplete gamma function
+    Q(a, x) = 1 - P(a, x). '''
+    a, x = _check_gammainc(a, x)
+    if x == 0:
+        return Decimal(1)
+    with localcontext() as c:
+        c.prec += GUARD_DIGITS
+        y = 1 - _gammainc_series(a, x) if x < a + 1\
+            else _gammaincc_fraction(a, x)
+    return +y
+
+def _betainc_fraction(a, b, x):
+    ''' Return I_x(a, b) for x < (a + 1) / (a + b + 2) by its continued
+    fraction. '''
+    def terms():
+        for m in range(1, MAX_ITERATIONS):
+            k = m // 2
+            if m % 2:
+                yield -(a + k) * (a + b + k) * x\
+                    / ((a + 2 * k) * (a + 2 * k + 1)), Decimal(1)
+            else:
+                yield k * (b - k) * x / ((a + 2 * k - 1) * (a + 2 * k)),\
+                    Decimal(1)
+    with localcontext() as c:
+        l = lgamma(a + b) - lgamma(a) - lgamma(b) + a * x.ln()\
+            + b * (1 - x).ln()
+        c.prec += max(0, l.adjusted() + 1)
+        l = lgamma(a + b) - lgamma(a) - lgamma(b) + a * x.ln()\
+            + b * (1 - x).ln()
+        front = l.exp() / a
+    return front / _lentz(Decimal(1), terms())
+
+def betainc(a, b, x):
+    ''' Return the regularized incomplete beta function I_x(a, b), the
+    integral of t^(a - 1) (1 - t)^(b - 1) from 0 to x divided by beta(a, b).
+    '''
+    a, b, x = _decimal(a), _decimal(b), _decimal(x)
+    if a <= 0 or b <= 0 or not 0 <= x <= 1:
+        raise ValueError('The incomplete beta function is only defined for'
+            ' a > 0, b > 0 and 0 <= x <= 1')
+    if x in (0, 1):
+        return Decimal(int(x))
+    with localcontext() as c:
+        c.prec += GUARD_DIGITS
+        # The continued fraction converges quickly on the smaller side of the
+        # peak of the integrand, and the other side is found by symmetry
+        y = _betainc_fraction(a, b, x) if x < (a + 1) / (a + b + 2)\
+            else 1 - _betainc_fraction(b, a, 1 - x)
+    return +y
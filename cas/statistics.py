@@ -18,20 +18,26 @@ __author__ = 'Thomas Wright <tom.tdw@gmail.com>'
 # You should have received a copy of the GNU General Public License along with
 # C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
 
-# Third party modules
-from dmath import e, pi
+# Standard modules
+from numbers import Rational as RationalNumber
 
 # Project modules
-from .core import handle_type as ht
-from .numerical_methods import romberg_integral
-
-# Calculate constants
-e = ht(e())
-pi = ht(pi())
+from .core import Algebra, Factorial, handle_type as ht
+from . import constants
+from . import special
 
 def factorial(x):
-    ''' An iterative factorial function. '''
-    if x < 0 or not isinstance(x, int):
+    ''' An iterative factorial function, extended to real numbers other than
+    the negative integers by the gamma function. '''
+    if isinstance(x, Algebra):
+        # The factorials of expressions are left unevaluated
+        return Factorial(x)
+    elif not isinstance(x, int):
+        if x == int(x) and x < 0:
+            raise ValueError('The factorial of negative integers is not'
+                ' defined')
+        return ht(special.gamma(x + 1))
+    if x < 0:
         raise ValueError('The factorial of negative numbers in not defined')
     ans = x.__class__(1)
     while x > 0:
@@ -53,24 +59,32 @@ def binomialpdf(n, p, r):
     return nCr(n,r) * p**r * (n.__class__(1)-p)**(n-r)
 
 def binomialcdf(n, p, r):
-    ''' Binomial cumulative probability density function. '''
+    ''' Binomial cumulative probability density function. This is a sum of
+    the probability densities for exact probabilities p, and otherwise the
+    regularized incomplete beta function I_(1-p)(n - r, r + 1). '''
     if r < 0:
         return ht(0)
-    if r >= 0:
-        return binomialpdf(n, p, r) + binomialcdf(n, p, r - r.__class__(1))
+    if r >= n:
+        return ht(1)
+    if isinstance(p, RationalNumber):
+        ans = binomialpdf(n, p, r.__class__(0))
+        for k in range(1, int(r) + 1):
+            ans += binomialpdf(n, p, r.__class__(k))
+        return ans
+    r = int(r)
+    return ht(special.betainc(n - r, r + 1, 1 - p))
 
 def poissonpdf(t, r):
     ''' Poisson probability density function. '''
-    return e**(-t) * t**r / factorial(r)
+    return ht(constants.e())**(-t) * t**r / factorial(r)
     
 def poissoncdf(t, r):
-    ''' Poisson cumulative probability density function. '''
+    ''' Poisson cumulative probability density function, the regularized
+    upper incomplete gamma function Q(r + 1, t). '''
     if r < 0:
         return r.__class__(0)
-    if r >= 0:
-        return poissonpdf(t, r) + poissoncdf(t, r - r.__class__(1))
+    return ht(special.gammaincc(int(r) + 1, t))
         
 def normalcdf(x):
     ''' Normal cumulative probability density function. '''
-    f = lambda x: (2*pi*e**(x**2))**(-1/2)
-    return ht(0.5 + romberg_integral(f, 0, x, 5,5))
+    return ht(special.normal_cdf(x))
@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+# coding=utf-8
+''' Sums and products of algebraic expressions over a range of integers.
+
+Closed forms are used wherever possible: polynomial summands are summed via
+Faulhaber's formula, geometric summands as geometric series, and constant
+factors and the terms of sums are handled separately. Otherwise the terms are
+evaluated numerically; large finite ranges are split into chunks which are
+summed in separate processes and infinite sums are estimated from their first
+few terms via the Levin u-transform. See:
+    - http://en.wikipedia.org/wiki/Faulhaber's_formula
+    - http://en.wikipedia.org/wiki/Levin-type_sequence_transformations
+'''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+# Standard modules
+import math
+import multiprocessing
+from decimal import Decimal, getcontext, localcontext
+from functools import reduce
+from numbers import Number, Rational as RationalNumber
+from operator import add, mul
+
+# Third party modules
+import dmath
+
+# Project modules
+from cas.cache import lru_cache
+from cas.core import Symbol, Sum, Product, Power, Fraction, Ln, Sin, Cos, Tan,\
+    Factorial, evaluate, handle_type as ht
+from cas.numeric import Integer
+from cas.polynomials import coefficients, from_coefficients, variables
+from cas.statistics import factorial
+import cas.numerical_methods as nm
+import cas.serialization as serialization
+import cas.special as special
+
+# Finite ranges with at most this many terms are evaluated exactly
+EXACT_TERMS = 100
+# Finite sums of more than this many terms are found from the sums to infinity
+# from either end of the range where these converge
+TAIL_TERMS = 1000
+# Finite ranges with more than this many terms are split between processes
+PARALLEL_TERMS = 100000
+
+
+def _is_infinite(x):
+    ''' Determine whether x is the (positive) infinite upper limit. '''
+    return isinstance(x, (Decimal, float)) and x == Decimal('Infinity')
+
+def _integer(x):
+    ''' Convert a numeric limit which holds a whole number to an Integer. '''
+    if isinstance(x, Number) and not isinstance(x, complex)\
+        and not _is_infinite(x) and x == int(x):
+        return Integer(int(x))
+    return x
+
+@lru_cache(maxsize=1000)
+def bernoulli(k):
+    ''' Return the kth Bernoulli number (taking B1 = +1/2), via the
+    Akiyama-Tanigawa algorithm. '''
+    a = []
+    for i in range(k + 1):
+        a.append(Integer(1) / Integer(i + 1))
+        for j in range(i, 0, -1):
+            a[j - 1] = Integer(j) * (a[j - 1] - a[j])
+    return a[0]
+
+def faulhaber(k):
+    ''' Return the coefficients (lowest order first) of the polynomial in m
+    equal to 1^k + 2^k + ... + m^k. '''
+    p = [Integer(0)] * (k + 2)
+    binomial = Integer(1)
+    for j in range(k + 1):
+        # binomial is (k + 1) choose j
+        p[k + 1 - j] = binomial * bernoulli(j) / Integer(k + 1)
+        binomial = binomial * Integer(k + 1 - j) / Integer(j + 1)
+    return p
+
+def _polynomial(p, x):
+    ''' Evaluate the polynomial p at x, which may be a number or an
+    expression. '''
+    if isinstance(x, Number):
+        return reduce(lambda a, c: a * x + c, reversed(p), Integer(0))
+    return from_coefficients(p, x)
+
+def _geometric(f, n):
+    ''' Return c and r such that f = c·r^n for c and r independent of n, or
+    None if f is not of this form. '''
+    factors = list(f) if isinstance(f, Product) else [f]
+    c, r = ht(1), None
+    for a in factors:
+        vs = variables(a)
+        if vs is None:
+            return None
+        elif str(n) not in vs:
+            c = c * a
+        elif isinstance(a, Power) and r is None\
+            and str(n) not in variables(a.a()):
+            # Exponents linear in n, b^(pn + q) = b^q·(b^p)^n
+            p = coefficients(a.b(), n)
+            if p is None or len(p) > 2:
+                return None
+            p = list(p) + [Integer(0)] * (2 - len(p))
+            c, r = c * a.a() ** p[0], a.a() ** p[1]
+        else:
+            return None
+    return (c, r) if r is not None else None
+
+def _split(f, n):
+    ''' Split f into the product of its factors independent of n and the
+    remaining factors. '''
+    factors = list(f) if isinstance(f, Product) else [f]
+    vs = [variables(a) for a in factors]
+    const = [a for a, v in zip(factors, vs) if v is not None
+        and str(n) not in v]
+    rest = [a for a, v in zip(factors, vs) if v is None or str(n) in v]
+    product = lambda xs: reduce(mul, xs, ht(1))
+    return product(const), product(rest)
+
+def _closed_sum(f, n, a, b):
+    ''' Return the sum of f for n from a to b in closed form, or None if no
+    closed form is known. '''
+    vs = variables(f)
+    infinite = _is_infinite(b)
+    if vs is None:
+        return None
+    elif str(n) not in vs:
+        if infinite:
+            if f == 0: return Integer(0)
+            raise ValueError('The sum diverges')
+        return f * (b - a + Integer(1))
+
+    # Polynomials via Faulhaber's formula
+    p = coefficients(f, n)
+    if p is not None:
+        if infinite:
+            raise ValueError('The sum diverges')
+        q = [Integer(0)] * (len(p) + 1)
+        for k, c in enumerate(p):
+            for i, y in enumerate(faulhaber(k)):
+                q[i] = q[i] + c * y
+        return _polynomial(q, b) - _polynomial(q, a - Integer(1))
+
+    # Geometric series
+    g = _geometric(f, n)
+    if g is not None:
+        c, r = g
+        if r == 1:
+            return _closed_sum(c, n, a, b)
+        elif not infinite and isinstance(r, Number):
+            return c / (r - Integer(1)) * (r ** (b + Integer(1)) - r ** a)
+        elif not infinite:
+            return c * (r ** (b + Integer(1)) - r ** a) / (r - Integer(1))
+        elif isinstance(r, Number) and abs(r) < 1:
+            return c * r ** a / (Integer(1) - r)
+        else:
+            raise ValueError('The sum diverges')
+
+    # Otherwise sum terms and pull out constant factors where possible
+    if isinstance(f, Sum):
+        ys = [_closed_sum(y, n, a, b) for y in f]
+        return None if None in ys else reduce(add, ys)
+    c, g = _split(f, n)
+    if c != 1:
+        y = _closed_sum(g, n, a, b)
+        return None if y is None else c * y
+    return None
+
+def _closed_product(f, n, a, b):
+    ''' Return the product of f for n from a to b in closed form, or None if
+    no closed form is known. '''
+    vs = variables(f)
+    infinite = _is_infinite(b)
+    if vs is None:
+        return None
+    elif str(n) not in vs:
+        if infinite:
+            if f == 1: return Integer(1)
+            raise ValueError('The product diverges')
+        return f ** (b - a + Integer(1))
+    elif f == n and isinstance(a, int) and isinstance(b, int):
+        # Products of consecutive integers
+        if a <= 0 <= b:
+            return Integer(0)
+        elif a > 0:
+            return factorial(b) / factorial(a - Integer(1))
+        else:
+            sign = Integer(-1) ** (b - a + Integer(1))
+            return sign * factorial(-a) / factorial(-b - Integer(1))
+    elif isinstance(f, Power) and str(n) not in variables(f.a()):
+        # The exponents of a constant base are summed
+        y = _closed_sum(f.b(), n, a, b)
+        return None if y is None else f.a() ** y
+    elif isinstance(f, Power) and str(n) not in variables(f.b()):
+        y = _closed_product(f.a(), n, a, b)
+        return None if y is None else y ** f.b()
+    elif isinstance(f, Product):
+        ys = [_closed_product(y, n, a, b) for y in f]
+        return None if None in ys else reduce(mul, ys)
+    return None
+
+def _factorials(xs):
+    ''' Return the factorials of a list of Decimals, exactly for whole
+    numbers. '''
+    return [Decimal(math.factorial(int(x))) if x == int(x) and x >= 0
+        else special.gamma(x + 1) for x in xs]
+
+# The functions evaluating each kind of Function at a list of Decimals
+_decimal_functions = {Ln: dmath.log_many, Sin: dmath.sin_many,
+    Cos: dmath.cos_many, Tan: dmath.tan_many, Factorial: _factorials}
+
+def _whole_power(x, k):
+    ''' Raise the Decimal x to the whole power k by repeated squaring. '''
+    y, p = None, abs(k)
+    while p:
+        if p & 1: y = x if y is None else y * x
+        p >>= 1
+        if p: x *= x
+    y = Decimal(1) if y is None else y
+    return y if k >= 0 else 1 / y
+
+def decimal_batch(f, n):
+    ''' Convert f into a python function taking a list of values of n and
+    returning the list of values of f, working in Decimals throughout, which
+    is much quicker to evaluate at many points than f itself. The functions
+    of n are evaluated at all of the points at once, sharing the constants
+    they use. '''
+    if isinstance(f, Decimal) or isinstance(f, (int, long)):
+        c = Decimal(f)
+        return lambda xs: [c] * len(xs)
+    elif isinstance(f, RationalNumber):
+        c = Decimal(f.numerator) / Decimal(f.denominator)
+        return lambda xs: [c] * len(xs)
+    elif isinstance(f, Symbol) and f == n:
+        return list
+    elif isinstance(f, (Sum, Product)):
+        gs = [decimal_batch(a, n) for a in f]
+        op = add if isinstance(f, Sum) else mul
+        return lambda xs: [reduce(op, ys) for ys in zip(*[g(xs) for g in gs])]
+    elif isinstance(f, Power) and isinstance(f.b(), (int, long)):
+        # Whole powers by repeated squaring are much quicker than Decimal's
+        # general power function
+        g, k = decimal_batch(f.a(), n), int(f.b())
+        return lambda xs: [_whole_power(y, k) for y in g(xs)]
+    elif isinstance(f, Power):
+        g, h = decimal_batch(f.a(), n), decimal_batch(f.b(), n)
+        return lambda xs: [y ** z for y, z in zip(g(xs), h(xs))]
+    elif isinstance(f, Fraction):
+        g = decimal_batch(f.numerator(), n)
+        h = decimal_batch(f.denominator(), n)
+        return lambda xs: [y / z for y, z in zip(g(xs), h(xs))]
+    elif type(f) in _decimal_functions:
+        g, action = decimal_batch(f.x(), n), _decimal_functions[type(f)]
+        return lambda xs: action(g(xs))
+    else:
+        raise ValueError('Cannot evaluate ' + str(f) + ' numerically')
+
+def _decimal_function(f, n):
+    ''' Convert f into a python function of n working in Decimals
+    throughout, for evaluating it at one point at a time. '''
+    g = decimal_batch(f, n)
+    return lambda x: g([x])[0]
+
+def _partial(args):
+    ''' Combine the terms f(n) for n from start up to (but not including)
+    stop, evaluated in a separate process. The expression and its result are
+    passed serialized. '''
+    data, name, start, stop, prec, operator = args
+    with localcontext() as context:
+        context.prec = prec
+        g = decimal_batch(serialization.loads(data), Symbol(name))
+        op = add if operator == 'add' else mul
+        return serialization.dumps(reduce(op,
+            g([Decimal(i) for i in range(start, stop)])))
+
+def _numeric(f, n, a, b, op):
+    ''' Combine the terms f(n) for n from a to b, exactly for small ranges and
+    otherwise in Decimals, splitting large ranges between processes. '''
+    count = b - a + 1
+    if count <= EXACT_TERMS:
+        return reduce(op, (evaluate(f, Integer(i), n)
+            for i in range(a, b + 1)))
+    elif count <= PARALLEL_TERMS or multiprocessing.cpu_count() == 1:
+        g = decimal_batch(f, n)
+        return ht(reduce(op, g([Decimal(i) for i in range(a, b + 1)])))
+
+    processes = multiprocessing.cpu_count()
+    chunk = -(-count // (4 * processes))
+    data = serialization.dumps(f)
+    operator = 'add' if op is add else 'mul'
+    jobs = [(data, str(n), i, min(i + chunk, b + 1), getcontext().prec,
+        operator) for i in range(a, b + 1, chunk)]
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = pool.map(_partial, jobs)
+    finally:
+        pool.terminate()
+    return ht(reduce(op, map(serialization.loads, results)))
+
+def _tails(f, n, a, b):
+    ''' Return the sum of f for n from a to b as the difference between the
+    sums from a and from b + 1 to infinity, or None if either of these does
+    not converge. The transform converges slowly for series starting far
+    from zero, so each sum is only found as accurately as the difference
+    needs. '''
+    g = _decimal_function(f, n)
+    series = lambda c: lambda i: g(Decimal(i + c))
+    tolerance = Decimal(10)**-getcontext().prec
+    limits = (a, b + 1)
+    try:
+        with localcontext() as context:
+            # For series starting far from zero the transform loses about as
+            # many digits to cancellation as the sum is needed to
+            context.prec *= 2
+            rough = [nm.levin_series(series(c), Decimal('0.001'),
+                beta=max(c, 1)) for c in limits]
+            y = rough[0] - rough[1]
+            head, tail = [nm.levin_series(series(c), tolerance * abs(y / x),
+                beta=max(c, 1)) for c, x in zip(limits, rough)]
+            y = head - tail
+    except (ValueError, ArithmeticError):
+        # Including poles beyond the range, which do not affect its sum
+        return None
+    return ht(+y)
+
+def _check(n, a, b):
+    ''' Check the arguments to a sum or product and convert the limits to
+    Integers. '''
+    if not isinstance(n, Symbol):
+        raise ValueError('The index of a sum or product must be a variable')
+    a, b = _integer(a), _integer(b)
+    if not isinstance(a, (int, Symbol)) or not (isinstance(b, (int, Symbol))
+        or _is_infinite(b)):
+        raise ValueError('The limits of a sum or product must be integers')
+    return a, b
+
+def summation(f, n, a, b):
+    ''' Return the sum of f for each integer value of n from a to b (which
+    may be infinite). '''
+    a, b = _check(n, a, b)
+    f = ht(f)
+    try:
+        return _summation(f, n, a, b)
+    except ZeroDivisionError:
+        raise ValueError('The terms of the sum ' + str(f)
+            + ' have a pole in its range')
+
+def _summation(f, n, a, b):
+    ''' Return the sum of f for n from a to b, once the limits are checked. '''
+    if isinstance(a, int) and isinstance(b, int) and a > b:
+        return Integer(0)
+    y = _closed_sum(f, n, a, b)
+    if y is not None:
+        return y
+    elif not all(isinstance(x, int) or _is_infinite(x) for x in (a, b))\
+        or variables(f) is None or variables(f) - set([str(n)]):
+        raise ValueError('No closed form for the sum ' + str(f) + ' is known')
+    elif not _is_infinite(b):
+        y = _tails(f, n, a, b) if b - a >= TAIL_TERMS else None
+        return y if y is not None else _numeric(f, n, a, b, add)
+    g = _decimal_function(f, n)
+    return ht(nm.levin_series(lambda i: g(Decimal(i + a)), beta=max(a, 1)))
+
+def product(f, n, a, b):
+    ''' Return the product of f for each integer value of n from a to b (which
+    may be infinite). '''
+    a, b = _check(n, a, b)
+    f = ht(f)
+    try:
+        return _product(f, n, a, b)
+    except ZeroDivisionError:
+        raise ValueError('The terms of the product ' + str(f)
+            + ' have a pole in its range')
+
+def _product(f, n, a, b):
+    ''' Return the product of f for n from a to b, once the limits are
+    checked. '''
+    if isinstance(a, int) and isinstance(b, int) and a > b:
+        return Integer(1)
+    y = _closed_product(f, n, a, b)
+    if y is not None:
+        return y
+    elif not all(isinstance(x, int) or _is_infinite(x) for x in (a, b))\
+        or variables(f) is None or variables(f) - set([str(n)]):
+        raise ValueError('No closed form for the product ' + str(f)
+            + ' is known')
+    elif not _is_infinite(b):
+        return _numeric(f, n, a, b, mul)
+    # Infinite products are found as the exponential of a sum of logarithms
+    g = _decimal_function(f, n)
+    return ht(dmath.exp(nm.levin_series(
+        lambda i: dmath.log(g(Decimal(i + a))))))
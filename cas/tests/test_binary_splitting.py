@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+''' Tests for the summation of series by binary splitting. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from decimal import Decimal, getcontext, localcontext
+from fractions import Fraction
+from math import factorial
+
+import cas.binary_splitting as bs
+import cas.numerical_methods as nm
+import dmath
+
+PI = '3.14159265358979323846264338327950288419716939937510582097494459'
+
+
+def reference(f, prec):
+    ''' Return f() computed with 20 more digits than prec. '''
+    with localcontext():
+        getcontext().prec = prec + 20
+        return f()
+
+
+def close(x, y, prec):
+    ''' Whether x is within an ulp of y at the given precision. '''
+    return abs(x - y) <= abs(y) * Decimal(10) ** (1 - prec)
+
+
+class TestHypergeometric():
+    def test_exact(self):
+        # sum(1/k! for k in range(10)) summed as a fraction
+        T, Q = bs.hypergeometric(10, lambda k: 1, lambda k: k if k else 1)
+        assert Fraction(T, Q) == sum(Fraction(1, factorial(k))
+            for k in range(10))
+
+    def test_denominators(self):
+        # sum(1/(2k + 1) for k in range(5))
+        T, Q = bs.hypergeometric(5, lambda k: 1, lambda k: 1,
+            b=lambda k: 2 * k + 1)
+        assert Fraction(T, Q) == sum(Fraction(1, 2 * k + 1) for k in range(5))
+
+
+class TestConstants():
+    def test_pi(self):
+        with localcontext():
+            for prec in (10, 28, 60):
+                getcontext().prec = prec
+                assert bs.pi() == +Decimal(PI)
+
+    def test_pi_terms(self):
+        with localcontext():
+            getcontext().prec = 60
+            # Each term of the Chudnovsky formula adds just over 14 digits
+            assert close(nm.pi(4), Decimal(PI), 56)
+            assert not close(nm.pi(3), Decimal(PI), 56)
+
+    def test_e_ln2(self):
+        with localcontext():
+            for prec in (10, 50, 200):
+                getcontext().prec = prec
+                assert close(bs.e(), reference(lambda: Decimal(1).exp(),
+                    prec), prec)
+                assert close(bs.ln2(), reference(lambda: Decimal(2).ln(),
+                    prec), prec)
+
+
+class TestRationals():
+    def test_exp(self):
+        with localcontext():
+            for prec in (10, 60, 200):
+                getcontext().prec = prec
+                for u, v in ((1, 3), (-7, 2), (50, 1), (1, 10 ** 15)):
+                    assert close(bs.exp_rational(u, v), reference(
+                        lambda: (Decimal(u) / v).exp(), prec), prec)
+
+    def test_atan(self):
+        with localcontext():
+            getcontext().prec = 60
+            # Machin's formula
+            assert close(16 * bs.atan_rational(1, 5)
+                - 4 * bs.atan_rational(1, 239), Decimal(PI), 59)
+            assert close(4 * bs.atan_rational(1, 1), Decimal(PI), 60)
+            assert bs.atan_rational(-1, 1) == -bs.atan_rational(1, 1)
+
+    def test_dmath(self):
+        with localcontext():
+            getcontext().prec = 50
+            assert dmath.exp(Fraction(1, 3)) == bs.exp_rational(1, 3)
+            assert dmath.exp(Decimal('-0.25')) == bs.exp_rational(-1, 4)
+            # atan(2) + atan(1/2) = pi/2
+            assert close(dmath.atan(2) + dmath.atan(Fraction(1, 2)),
+                Decimal(PI) / 2, 49)
+            assert close(dmath.atan(-2), -dmath.atan(2), 50)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+''' Tests for the caching layer. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import threading
+from decimal import Decimal, getcontext, localcontext
+
+from cas.cache import *
+from cas.cache import _registry
+
+
+class TestCache():
+    def test_lru(self):
+        c = Cache('test.lru', maxsize=2)
+        c['a'] = 1; c['b'] = 2
+        assert c['a'] == 1
+        c['c'] = 3
+        assert 'a' in c and 'c' in c and 'b' not in c
+        assert c.get('b') is None
+        info = c.info()
+        assert (info.hits, info.misses, info.evictions, info.size)\
+            == (1, 1, 1, 2)
+
+    def test_bytes(self):
+        c = Cache('test.bytes', maxsize=None, maxbytes=100,
+            sizeof=lambda key, value: value)
+        c['a'] = 60; c['b'] = 30
+        c['c'] = 20
+        assert 'a' not in c and c.info().bytes == 50
+        # Entries larger than the whole cache are not stored
+        c['d'] = 101
+        assert 'd' not in c and c.info().bytes == 50
+
+    def test_ttl(self):
+        now = [0]
+        c = Cache('test.ttl', ttl=10, clock=lambda: now[0])
+        c['a'] = 1
+        now[0] = 5
+        assert c['a'] == 1
+        now[0] = 11
+        assert c.get('a') is None
+        assert c.info().expirations == 1
+
+    def test_decorator(self):
+        calls = []
+        @lru_cache(maxsize=10, context=True)
+        def f(x):
+            calls.append(x)
+            return x / Decimal(3)
+        with localcontext():
+            getcontext().prec = 5
+            a = f(1); f(1)
+            getcontext().prec = 10
+            b = f(1)
+        assert len(calls) == 2 and a != b
+        assert f.cache_info().hits == 1
+        assert f.cache.name in cache_info()
+
+    def test_registry(self):
+        a = Cache('test.precision', depends_on=('precision',))
+        b = Cache('test.other')
+        a[1] = b[1] = 1
+        assert _registry['test.precision'] is a
+        invalidate('precision')
+        assert 1 not in a and 1 in b
+        clear_all()
+        assert 1 not in b
+
+    def test_threads(self):
+        c = Cache('test.threads', maxsize=50)
+        def work(n):
+            for i in range(2000):
+                c[(n, i % 70)] = i
+                c.get((n, (i * 7) % 70))
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        info = c.info()
+        assert info.size == 50
+        assert info.hits + info.misses == 8000
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+''' Tests of commands evaluated by the calculator. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import py.test
+from decimal import getcontext
+
+from cas.numeric import Real
+
+
+class TestCalculator():
+    def setup_method(self, method):
+        # The calculator sets the precision and the display of Reals for the
+        # whole process, so they are restored after each test
+        self.saved = getcontext().prec, Real.prec_offset, Real.exact_form
+        import calculator
+        getcontext().prec = 3 + calculator.PREC_OFFSET
+        self.calculator = calculator.Calculator()
+
+    def teardown_method(self, method):
+        getcontext().prec, Real.prec_offset, Real.exact_form = self.saved
+
+    def test_factors(self):
+        c = self.calculator
+        assert c.evaluate('factors(12)') == '= 2, 2, 3'
+        assert c.evaluate('factors(-10)') == '= -1, 2, 5'
+        assert c.evaluate('factors(2^64 + 1)') == '= 274177, 67280421310721'
+        assert c.evaluate('factors(2^61 - 1)') == '= 2305843009213693951'
+
+    def test_decimal_results(self):
+        # Plain Decimals are shown without the guard digits
+        c = self.calculator
+        assert c.evaluate('log(2, 10)') == '= 0.301'
+        assert c.evaluate('integrate(x*sin(x), 0, 1)') == '= 0.301'
+        assert c.evaluate('integrate(x*cos(x), -1, 1)') == '= 0'
+
+    def test_float_mode(self):
+        import cas.core
+        c = self.calculator
+        c.evaluate('setmode(float)')
+        assert c.evaluate('factors(12)') == '= 2, 2, 3'
+        assert c.evaluate('totient(12)') == '= 4'
+        assert c.evaluate('12!') == '= 479001600'
+        assert c.evaluate('(-4)^0.5') == '= 2i'
+        assert c.evaluate('(-8)^(1/3)') == '= 1+1.73i'
+        py.test.raises(ValueError, c.evaluate, '10^400/3')
+        # The mode only lasts for the commands of the calculator choosing it
+        assert not cas.core.machine_floats()
+        assert isinstance(cas.core.handle_type(0.5), Real)
+
+    def test_adaptive(self):
+        # The digits cancelled inside functions such as det are made up
+        c = self.calculator
+        c.evaluate('setadaptive')
+        assert c.evaluate('det([[1000000.0000123, 1000000], '
+            '[1000000, 1000000.0000456]])') == '= 57.9'
+
+    def test_set_precision(self):
+        # The previous answer is calculated again at the new precision
+        c = self.calculator
+        Real.exact_form = False
+        assert c.evaluate('ln(3)/2') == '= 0.549'
+        assert c.evaluate('setprec(10)') == '= 0.5493061443'
+        assert c.evaluate('ans*2') == '= 1.098612289'
+        assert c.evaluate('setprec(20)') == '= 1.0986122886681096914'
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+''' Tests for the shared mathematical constants. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from decimal import Decimal, getcontext, localcontext
+
+from cas import constants
+
+PI = '3.14159265358979323846264338327950288419716939937510582097494459230781'
+GAMMA = '0.57721566490153286060651209008240243104215933593992359880576723488486'
+
+
+class TestConstants():
+    def setup_class(self):
+        constants.clear()
+
+    def test_values(self):
+        with localcontext():
+            getcontext().prec = 60
+            assert constants.pi() == +Decimal(PI)
+            assert constants.euler_gamma() == +Decimal(GAMMA)
+            assert constants.e() == Decimal(1).exp()
+            assert constants.ln2() == Decimal(2).ln()
+            assert constants.ln10() == Decimal(10).ln()
+            assert constants.sqrt2() ** 2 - 2 < Decimal('1e-58')
+
+    def test_precision(self):
+        with localcontext():
+            for prec in (5, 40, 20, 65, 3):
+                getcontext().prec = prec
+                assert constants.pi() == +Decimal(PI)
+                assert len(constants.pi().as_tuple().digits) == prec
+
+    def test_extension(self):
+        pi = constants.pi
+        pi.clear()
+        with localcontext():
+            getcontext().prec = 30
+            pi()
+            assert pi.prec == 30 + constants.GUARD_DIGITS
+            # Increases in precision extend the stored value by half again
+            getcontext().prec = 35
+            pi()
+            assert pi.prec == 60
+            # So that later modest increases reuse the stored digits
+            getcontext().prec = 45
+            pi()
+            assert pi.prec == 60
+            assert pi() == +Decimal(PI)
@@ -18,11 +18,12 @@ __author__ = 'Tom Wright <tom.tdw@gmail.com>'
 # You should have received a copy of the GNU General Public License along with
 # C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
 
+import fractions
 import py.test
 from decimal import Decimal
 
 from cas.core import *
-from cas.numeric import Integer
+from cas.numeric import Integer, Long, Rational, Real, Complex
 from cas.core import handle_type as ht
 
 
@@ -41,7 +42,49 @@ class TestHandleType():
     def test_complex(self):
         xs = [1j, 2j, -1j, 2+3j, 3-2.2j]
         for x in xs:
-            assert isinstance(handle_type(x), complex)
+            assert isinstance(handle_type(x), Complex)
+
+    def test_unchanged(self):
+        xs = [Integer(3), Rational(1, 2), Real('2.5'), Complex(1, 2),
+            Symbol('x'), 'x']
+        for x in xs:
+            assert handle_type(x) is x
+
+    def test_long(self):
+        # Longs too large for a machine integer keep exact arithmetic
+        assert isinstance(handle_type(2**100), Long)
+        assert handle_type(2**100) == 2**100
+        assert isinstance(handle_type(2**70 - 2**70 + 3), Integer)
+
+    def test_subclasses(self):
+        # Types are converted by their place in the numeric tower
+        assert handle_type(True) == 1 and isinstance(handle_type(True), Integer)
+        assert handle_type(fractions.Fraction(3, 4)) == Rational(3, 4)
+
+    def test_machine_floats(self):
+        def check():
+            assert machine_floats()
+            for x in [34.2, 0.2, 4/5, 1j, 3-2.2j]:
+                assert handle_type(x) is x
+            assert isinstance(handle_type(3), Integer)
+            assert isinstance(y(Integer(0)), float)
+            assert isinstance(y.romberg_integral(0, 1), float)
+        y = Sin(Symbol('x'))
+        with_machine_floats(True, check)
+        assert not machine_floats()
+        assert isinstance(y(Integer(0)), Decimal)
+        with py.test.raises(ZeroDivisionError):
+            with_machine_floats(True, lambda: 1/0)
+        assert not machine_floats()
+
+    def test_machine_floats_threads(self):
+        # The mode is only changed in the thread which chooses it
+        import threading
+        modes = []
+        thread = threading.Thread(target=lambda: modes.append(
+            machine_floats()))
+        with_machine_floats(True, lambda: (thread.start(), thread.join()))
+        assert modes == [False]
 
 
 class TestExpand():
@@ -136,6 +179,16 @@ class TestPartialIntegral():
         for y, s in data:
             assert str(partial_integral(y, self.x)) == s
 
+    def test_definite(self):
+        x = self.x
+        assert definite_integral(x**2, x, 0, 1) == Rational(1, 3)
+        # x sin(x) and sin(2x) cannot be integrated symbolically, so are
+        # integrated numerically
+        for y, integral in [(x*Sin(x), '0.301168678939756789'),
+                (Sin(2*x), '0.708073418273571193')]:
+            assert abs(definite_integral(y, x, 0, 1) - Decimal(integral))\
+                < Decimal('1e-12')
+
 
 class TestAlgebra():
 
@@ -245,6 +298,38 @@ class TestFunctions(object):
 # TODO: Insert tests for Functions, Sums, Powers and Fractions here.
 
 
+class TestSize():
+
+    def setup_class(self):
+        self.x = Symbol('x')
+        self.y = Symbol('y')
+
+    def test_size(self):
+        assert size(self.x) == size(Integer(2)) == 1
+        assert size(2*self.x) == 3
+        assert size(self.x**2 + self.y) == 5
+        assert size(Sin(self.x) / (self.y + 1)) == 6
+
+    def test_depth(self):
+        assert depth(self.x) == 1
+        assert depth(self.x**2 + self.y) == 3
+        assert depth(Sin(Sin(self.x)) * self.y) == 4
+
+    def test_limits(self):
+        max_size, max_depth = Algebra.max_size, Algebra.max_depth
+        y = (self.x + self.y + 1) * (self.x + 2)
+        try:
+            Algebra.max_size = size(y)
+            py.test.raises(ExpressionTooLarge, expand, y)
+            Algebra.max_size, Algebra.max_depth = None, 5
+            y = self.x
+            for i in range(3):
+                y = Sin(y)
+            py.test.raises(ExpressionTooLarge, Power, Sin(y), 2)
+        finally:
+            Algebra.max_size, Algebra.max_depth = max_size, max_depth
+
+
 class TestList():
 
     def test_str(self):
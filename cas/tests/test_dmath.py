@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+''' Tests for the decimal maths functions. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import math
+import random
+from decimal import (Context, Decimal, Inexact, Overflow, getcontext,
+    localcontext)
+from fractions import Fraction
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
+import dmath
+
+# sin(10^30), cos(10^30) and sin(1000) to 40 significant figures
+SIN_1E30 = '-0.09011690191213805803038642895298733027440'
+COS_1E30 = '-0.9959311944053957023942485879970486411302'
+SIN_1000 = '0.8268795405320025602558874291092181412127'
+
+
+def close(x, y, digits):
+    ''' Whether x and y agree to the given number of significant figures. '''
+    return abs(x - y) <= abs(y) * Decimal(10) ** (1 - digits)
+
+
+class TestRangeReduction():
+    def test_trig(self):
+        with localcontext():
+            getcontext().prec = 40
+            assert close(dmath.sin(Decimal(10) ** 30), Decimal(SIN_1E30), 39)
+            assert close(dmath.cos(Decimal(10) ** 30), Decimal(COS_1E30), 39)
+            assert close(dmath.sin(Decimal(1000)), Decimal(SIN_1000), 39)
+            assert close(dmath.sin(Decimal(-1000)), -Decimal(SIN_1000), 39)
+
+    def test_quadrants(self):
+        with localcontext():
+            getcontext().prec = 30
+            for x in ['0.3', '1', '2', '3.5', '5', '-0.3', '-2', '-5', '-7.5']:
+                x = Decimal(x)
+                s, c = dmath.sin(x), dmath.cos(x)
+                assert close(s * s + c * c, Decimal(1), 28)
+                assert close(dmath.tan(x), s / c, 28)
+                assert close(dmath.sin(-x), -s, 30)
+
+    def test_near_multiples_of_pi(self):
+        with localcontext():
+            getcontext().prec = 30
+            # pi to 30 digits exceeds pi by about 4.97e-31
+            x = dmath.pi()
+            assert close(dmath.sin(x), Decimal('-4.9711580283060062489e-31'), 19)
+            assert close(dmath.sin(2 * x) / dmath.sin(x), Decimal(-2), 20)
+
+    def test_exp(self):
+        with localcontext():
+            getcontext().prec = 40
+            for x in ['0.5', '1', '-1', '20', '-20', '200', '-200', '1000',
+                '-1000', '123456.789']:
+                x = Decimal(x)
+                assert close(dmath.exp(x), x.exp(), 39)
+            assert dmath.exp(Decimal('-Inf')) == 0
+
+
+class TestLog():
+    def test_natural(self):
+        with localcontext():
+            getcontext().prec = 53
+            for x in ['3.65', '2', '1E-300', '0.999999999', '123.456']:
+                assert dmath.log(Decimal(x)) == Decimal(x).ln()
+            assert dmath.log(Decimal(0)) == Decimal('-Inf')
+            assert dmath.log(Decimal(-1)).is_nan()
+
+    def test_bases(self):
+        with localcontext():
+            getcontext().prec = 40
+            assert dmath.log(Decimal(1000), 10) == 3
+            assert dmath.log10(Decimal('1E-100')) == -100
+            assert close(dmath.log(Decimal(8), 2), Decimal(3), 40)
+            assert close(dmath.log(Decimal(81), 3), Decimal(4), 40)
+            assert close(dmath.log(Decimal(7), Decimal('2.5')),
+                Decimal(7).ln() / Decimal('2.5').ln(), 39)
+            assert dmath.log(Decimal(5), -2).is_nan()
+
+    def test_base_cache(self):
+        # The logarithm of a base is found once for each precision
+        dmath._ln_base.cache_clear()
+        with localcontext():
+            getcontext().prec = 30
+            for x in range(2, 10):
+                dmath.log(Decimal(x), 3)
+        assert len(dmath._ln_base.cache) == 1
+
+
+class TestContexts():
+    def test_explicit(self):
+        # Functions work to the precision of the context they are given,
+        # whatever the current precision
+        context = Context(prec=40)
+        with localcontext():
+            getcontext().prec = 10
+            for f in (dmath.sin, dmath.cos, dmath.tan, dmath.atan, dmath.exp,
+                    dmath.sinh, dmath.asin, dmath.acos):
+                x = Decimal('0.3456789')
+                with localcontext():
+                    getcontext().prec = 40
+                    expected = f(x)
+                assert f(x, context=context) == expected
+            a = dmath.atan2(Decimal(-1), Decimal(-3), context=context)
+            assert len(a.as_tuple().digits) == 40
+            assert getcontext().prec == 10
+        assert context.prec == 40
+        assert context.flags[Inexact]
+
+    def test_exception(self):
+        # The precision is not left raised by an exception in a series
+        context = Context(prec=30, Emax=99, traps=[Overflow])
+        with pytest.raises(Overflow):
+            dmath.exp(Decimal(1000), context=context)
+        assert context.prec == 30
+        with localcontext() as current:
+            current.prec = 30
+            current.Emax = 99
+            current.traps[Overflow] = True
+            with pytest.raises(Overflow):
+                dmath.exp(Decimal(1000))
+            assert current.prec == 30
+
+    def test_threads(self):
+        # Workers each using a different precision get the same results as
+        # when run one at a time
+        def work(prec):
+            context = Context(prec=prec)
+            x = Decimal('1.2345')
+            return [f(x, context=context) for f in (dmath.sin, dmath.cos,
+                dmath.exp, dmath.atan, dmath.log)]
+        precs = [10 + 7 * (i % 9) for i in range(36)]
+        expected = [work(prec) for prec in precs]
+        pool = ThreadPool(6)
+        try:
+            assert pool.map(work, precs) == expected
+        finally:
+            pool.close()
+
+
+class TestBatches():
+    def test_scalar(self):
+        # The batched functions give exactly the results of the scalar ones
+        xs = [Decimal(i) / 7 - 5 for i in range(80)] + [Decimal('-0.25'),
+            Fraction(1, 3), 7, Decimal(0)]
+        with localcontext():
+            for prec in (15, 40):
+                getcontext().prec = prec
+                for f in (dmath.sin, dmath.cos, dmath.tan, dmath.exp):
+                    many = getattr(dmath, f.__name__ + '_many')
+                    assert many(xs) == [f(x) for x in xs]
+                big = [Decimal('1E+30'), Decimal(-1000), Decimal(3)]
+                assert dmath.sin_many(big) == map(dmath.sin, big)
+                positive = [abs(x) + 1 for x in xs]
+                assert dmath.log_many(positive) == map(dmath.log, positive)
+                assert dmath.log_many(positive, 3)\
+                    == [dmath.log(x, 3) for x in positive]
+
+    def test_special(self):
+        with localcontext():
+            getcontext().prec = 20
+            assert dmath.sin_many([]) == []
+            assert dmath.sin_many([Decimal('Inf')])[0].is_nan()
+            assert dmath.exp_many([Decimal('-Inf'), Decimal(0)]) == [0, 1]
+            assert dmath.log_many([Decimal(0), Decimal(-2)])[0]\
+                == Decimal('-Inf')
+            with pytest.raises(ValueError):
+                dmath.log_many([Decimal(2)], 1)
+
+    def test_context(self):
+        context = Context(prec=40)
+        xs = [Decimal(i) / 3 for i in range(1, 10)]
+        with localcontext():
+            getcontext().prec = 40
+            expected = [dmath.cos(x) for x in xs]
+        with localcontext():
+            getcontext().prec = 10
+            assert dmath.cos_many(xs, context=context) == expected
+
+
+class TestFloatPath():
+    def sample(self, rng):
+        ''' A random Decimal of up to 20 digits, from around 1e-20 to 1e20. '''
+        digits = rng.randint(1, 20)
+        x = Decimal(rng.randint(1, 10 ** digits)).scaleb(
+            rng.randint(-digits - 3, 2))
+        return x if rng.random() < 0.5 else -x
+
+    def test_series(self, monkeypatch):
+        # The results of the float path and the series are the same after
+        # rounding, for random arguments and precisions
+        functions = [dmath.sin, dmath.cos, dmath.tan, dmath.atan,
+            lambda x: dmath.exp(x if abs(x) < 700 else x.scaleb(-x.adjusted())),
+            lambda x: dmath.log(abs(x))]
+        rng = random.Random(46)
+        cases = [(self.sample(rng), rng.randint(1, dmath.FLOAT_DIGITS))
+            for i in range(300)]
+        results = []
+        for digits in (dmath.FLOAT_DIGITS, 0):
+            monkeypatch.setattr(dmath, 'FLOAT_DIGITS', digits)
+            with localcontext() as context:
+                values = []
+                for x, prec in cases:
+                    context.prec = prec
+                    values.append([f(x) for f in functions])
+                results.append(values)
+        assert results[0] == results[1]
+
+    def test_uncertain(self):
+        # Results which the error in floats could change are left to the
+        # series
+        with localcontext():
+            getcontext().prec = 15
+            assert dmath._float_path(math.sin, Decimal('3.14159265358979'),
+                dmath._SIN_ERROR) is None
+            assert dmath._float_path(math.exp, Decimal(-800),
+                dmath._EXP_ERROR) is None
+            # sin(1) = 0.84147098480789650665..., which is too near a half
+            # unit in the fifteenth digit to round in floats
+            assert dmath._float_path(math.sin, Decimal(1),
+                dmath._SIN_ERROR) is None
+            getcontext().prec = 10
+            assert dmath._float_path(math.sin, Decimal(1),
+                dmath._SIN_ERROR) == Decimal('0.8414709848')
+            getcontext().prec = 16
+            assert dmath._float_path(math.sin, Decimal(1),
+                dmath._SIN_ERROR) is None
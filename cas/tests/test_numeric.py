@@ -39,15 +39,57 @@ class TestComplex():
                 assert str(Complex(x)) == string
 
     def test_addition(self):
-        # TODO: Update/change
         assert isinstance(Complex(3+2j) + Complex(-1+5j), Complex)
-        
-    # TODO: Add some more tests for complex numbers
+        assert Complex(3, 2) + Complex(-1, 5) == Complex(2, 7)
+        assert Complex(3, 2) - Integer(1) == Complex(2, 2)
+        assert Integer(1) - Complex(3, 2) == Complex(-2, -2)
+        # Cancelling imaginary parts leave a Real
+        assert isinstance(Complex(3, 2) + Complex(1, -2), Real)
+
+    def test_arithmetic(self):
+        assert Complex(1, 2) * Complex(3, -1) == Complex(5, 5)
+        assert Complex(1, 1) / Complex(1, -1) == Complex(0, 1)
+        assert Integer(1) / Complex(2, 1) == Complex(Rational(2, 5),
+            Rational(-1, 5))
+        assert Complex(0, 1) ** 2 == -1
+        assert Complex(1, 1) ** -2 == Complex(0, Rational(-1, 2))
+        assert abs(Complex(3, 4)) == 5
+        assert Complex(3, 4).conjugate() == Complex(3, -4)
+        assert Complex(3, 4) != Complex(3, 4.0001)
+
+    def test_precision(self):
+        with localcontext():
+            getcontext().prec = 40
+            z = Complex(1, 1) / Integer(3)
+            assert z.real == Decimal(1) / Decimal(3)
+            assert len(z.imag.as_tuple().digits) == 40
+
+    def test_functions(self):
+        with localcontext():
+            getcontext().prec = 30
+            tolerance = Decimal('1e-28')
+            i = Complex(0, 1)
+            pi = Real('3.14159265358979323846264338328')
+            assert abs(i.log() - i * pi / 2) < tolerance
+            assert abs((i * pi).exp() + 1) < tolerance
+            assert abs(i.sqrt() ** 2 - i) < tolerance
+            assert abs(Real(-4) ** Rational(1, 2) - 2 * i) < tolerance
+            z = Complex(1, 2)
+            assert abs(z.sin() ** 2 + z.cos() ** 2 - 1) < tolerance
+            assert abs(z.tan() - z.sin() / z.cos()) < tolerance
+            assert abs(i ** i - Real('0.207879576350761908546955619834'))\
+                < tolerance
 
 class TestInteger():
     def test_init(self):
         assert Integer(3) == 3
 
+    def test_shared(self):
+        # Small results are shared rather than built afresh
+        assert Integer(3) + Integer(2) is Integer(4) + Integer(1)
+        assert type(Integer(3) * Integer(-4)) is Integer
+        assert Integer(10**6) + 1 == 10**6 + 1
+
     def test_division(self):
         assert Integer(4) / Integer(2) == Integer(2)
         assert Integer(3) / Integer(2) == Decimal('1.5')
@@ -81,10 +123,150 @@ class TestInteger():
         assert isinstance(2 * Integer(3), Integer)
         assert Integer(3) * Integer(2) == 6
 
+    def test_negative_powers(self):
+        assert Integer(2) ** Integer(-2) == Rational(1, 4)
+        assert isinstance(Integer(2) ** Integer(-2), Rational)
+
+    def test_long(self):
+        # Values too large for a machine integer keep exact arithmetic
+        big = 2**70
+        assert isinstance(Integer(2) ** 100, Long)
+        assert Integer(2) ** 100 / 3 == Rational(2**100, 3)
+        assert Integer(3) / big == Rational(3, big)
+        assert isinstance(Integer(3) / big, Rational)
+        assert Integer(2) ** 64 / Integer(2) ** 63 == 2
+        assert isinstance(Integer(2) ** 64 / Integer(2) ** 63, Integer)
+        assert Integer(3) - big == 3 - big
+        assert big - Integer(3) == big - 3
+        assert Integer(2) * big == 2 * big
+        assert isinstance(Integer(2) ** 64 - Integer(2) ** 64 + 1, Integer)
+        assert Integer(2) ** Integer(-64) == Rational(1, 2**64)
+        assert list((Integer(2) ** 64 + 1).factors()) \
+            == [274177, 67280421310721]
+
     def test_factors(self):
         xs = (
             (2, [2]), (4, [2,2]), (10, [2,5]), (-10, [-1,2,5]),
+            (99999989*99999971, [99999971, 99999989]),
+            (2**61 - 1, [2**61 - 1]), (-3**30, [-1] + [3]*30),
         )
         for x, facts in xs:
             assert list(Integer(x).factors()) == facts
             assert x == reduce(mul, facts, 1)
+
+class TestRational():
+    def test_division(self):
+        assert isinstance(Integer(3) / Integer(2), Rational)
+        assert isinstance(Integer(4) / Integer(2), Integer)
+        assert Integer(6) / Integer(4) == Rational(3, 2)
+        assert Rational(1, 3) / Rational(1, 6) == 2
+
+    def test_exact_arithmetic(self):
+        a, b = Rational(1, 3), Rational(1, 6)
+        assert a + b == Rational(1, 2)
+        assert a - b == b
+        assert a * 3 == 1 and isinstance(a * 3, Integer)
+        assert 1 - a == Rational(2, 3)
+        assert Integer(2) * a == Rational(2, 3)
+        assert isinstance(-a, Rational) and isinstance(abs(-a), Rational)
+        assert sum(Rational(1, 2**k) for k in range(1, 60)) \
+            == 1 - Rational(1, 2**59)
+
+    def test_powers(self):
+        assert Rational(2, 3) ** 2 == Rational(4, 9)
+        assert Rational(2, 3) ** -1 == Rational(3, 2)
+        assert Rational(4, 9) ** Rational(1, 2) == Rational(2, 3)
+        assert Integer(8) ** Rational(1, 3) == 2
+        assert Integer(-8) ** Rational(2, 3) == 4
+        assert isinstance(Integer(2) ** Rational(1, 2), Real)
+
+    def test_inexact(self):
+        assert isinstance(Rational(1, 2) + Decimal('0.25'), Real)
+        assert Rational(1, 2) + Decimal('0.25') == Decimal('0.75')
+        assert Decimal('0.25') * Rational(1, 2) == Decimal('0.125')
+        assert isinstance(Real('1.5') - Rational(1, 2), Real)
+
+    def test_comparison(self):
+        assert Rational(3, 2) == Decimal('1.5')
+        assert Rational(1, 3) != Decimal('0.333')
+        assert Rational(1, 3) < Decimal('0.334')
+        assert Decimal('0.333') < Rational(1, 3)
+
+    def test_str(self):
+        assert str(Rational(3, 2)) == '3/2'
+        assert str(Rational(-1, 4)) == '-1/4'
+
+    def test_hints(self):
+        assert Rational(1, 2)._hints == {'m','f','p'}
+        try:
+            Real.exact_form = False
+            assert Rational(1, 2)._hints == set()
+        finally:
+            Real.exact_form = True
+
+class TestReal():
+    def test_str_follows_settings(self):
+        x = Real('0.5')
+        exact_form = Real.exact_form
+        try:
+            Real.exact_form = True
+            assert str(x) == '1/2'
+            Real.exact_form = False
+            assert str(x) == '0.5'
+        finally:
+            Real.exact_form = exact_form
+
+    def test_str_follows_precision(self):
+        x = Real('1.23456')
+        with localcontext():
+            getcontext().prec = 3
+            a = str(x)
+            getcontext().prec = 5
+            assert str(x) != a
+
+    def test_estimate_accuracy(self):
+        with localcontext() as c:
+            c.prec = 10
+            c.clear_flags()
+            # Exact arithmetic loses nothing, even if it cancels
+            x, digits = estimate_accuracy(lambda: Real('1.5') - Real('1.5'))
+            assert x == 0 and digits is None
+            # Cancellation after rounding is counted
+            third = Real(1) / Real(3)
+            x, digits = estimate_accuracy(lambda: (third + 1000) - 1000)
+            assert digits == 6
+            x, digits = estimate_accuracy(lambda: (third + 1) - (1 + third))
+            assert digits == 0
+            # Unless it is ignored
+            x, digits = estimate_accuracy(ignore_accuracy,
+                lambda: (third + 1000) - 1000)
+            assert digits is None
+
+class TestNumberTheory():
+    def test_primes(self):
+        assert isprime(Integer(97)) and not isprime(Integer(91))
+        assert isprime(2**127 - 1)
+        assert nextprime(Integer(100)) == 101 and prevprime(Integer(100)) == 97
+        assert isinstance(nextprime(Integer(100)), Integer)
+        assert primepi(Integer(1000)) == 168
+        assert list(primes(Integer(10), Integer(30))) ==\
+            [11, 13, 17, 19, 23, 29]
+        assert list(primes(Integer(10))) == [2, 3, 5, 7]
+        py.test.raises(ValueError, isprime, Real('2.5'))
+
+    def test_factors(self):
+        assert list(factors(Integer(12))) == [2, 2, 3]
+        assert list(factors(2**64 + 1)) == [274177, 67280421310721]
+        assert list(factors(-2**64)) == [-1] + [2] * 64
+        assert list(factors(Real('12'))) == [2, 2, 3]
+        py.test.raises(ValueError, factors, Integer(0))
+        py.test.raises(ValueError, factors, Real('2.5'))
+
+    def test_arithmetic(self):
+        assert totient(Integer(36)) == 12
+        assert list(divisors(Integer(-12))) == [1, 2, 3, 4, 6, 12]
+        assert modinv(Integer(3), Integer(11)) == 4
+        assert powmod(Integer(3), Integer(-1), Integer(11)) == 4
+        assert powmod(2, 10**20, 10**9 + 7) == pow(2, 10**20, 10**9 + 7)
+        py.test.raises(ValueError, modinv, Integer(6), Integer(9))
+        py.test.raises(ValueError, totient, Integer(0))
@@ -19,6 +19,7 @@ __author__ = 'Tom Wright <tom.tdw@gmail.com>'
 # C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
 
 from math import *
+from decimal import Decimal, getcontext, localcontext
 
 import py.test
 
@@ -61,6 +62,62 @@ class TestNumericalIntegration():
             assert almost_equal(romberg_integral(f, a, b, 7, 4),
                 integral, 0.0000005)
 
+    def test_romberg_tolerance(self):
+        for f, a, b, integral in self.data:
+            result = romberg(f, a, b, 1e-10)
+            assert almost_equal(result.value, integral, 0.0000005)
+            assert result.evaluations <= 2**16 + 1
+
+    def test_romberg_evaluations(self):
+        points = []
+        def f(x):
+            points.append(x)
+            return exp(x)
+        romberg_integral(f, 0, 1, 7, 4)
+        assert len(points) == len(set(points)) == 2**7 + 1
+        del points[:]
+        result = romberg(f, 0, 1)
+        assert result.evaluations == len(points) == len(set(points))
+        assert abs(result.value - (e - 1)) <= 1e-12
+        assert result.error <= 1e-12
+
+    def test_romberg_decimal(self):
+        with localcontext():
+            getcontext().prec = 30
+            result = romberg(lambda x: x.exp(), Decimal(0), Decimal(1))
+            assert abs(result.value - (Decimal(1).exp() - 1))\
+                <= Decimal('1e-27')
+
+    def test_quad(self):
+        for rule in (15, 21):
+            for f, a, b, integral in self.data:
+                result = quad(f, a, b, 1e-10, rule=rule)
+                assert almost_equal(result.value, integral, 0.0000005)
+                assert result.evaluations <= 7 * rule
+
+    def test_quad_error(self):
+        data = ((sqrt, 0, 1, 2/3), (lambda x: cos(50*x), 0, 1, sin(50)/50),
+            (lambda x: abs(x - 1/3), 0, 1, 5/18))
+        for f, a, b, integral in data:
+            result = quad(f, a, b)
+            assert abs(result.value - integral) <= result.error
+            assert result.error <= 1e-10 * abs(integral)
+        result = quad(lambda x: exp(-x*x), -10, 10, abs_tol=1e-6)
+        assert abs(result.value - 1.7724538509055160) <= 1e-6
+        py.test.raises(ValueError, quad, exp, 0, float('inf'))
+
+    def test_quad_zero(self):
+        # Integrals which cancel to zero converge relative to that of |f|
+        data = ((sin, -1, 1), (lambda x: x*cos(x), -1, 1),
+            (lambda x: x**3 - x, -2, 2), (cos, 0, 3.141592653589793))
+        for f, a, b in data:
+            result = quad(f, a, b)
+            assert abs(result.value) <= 1e-12
+            assert result.evaluations == 21
+        result = quad(lambda x: exp(x) - (e - 1), 0, 1)
+        assert abs(result.value) <= 1e-12
+        assert result.evaluations == 21
+
     def test_trapezoid_rule(self):
         for f, a, b, integral in self.data:
             assert almost_equal(trapezoidal_composite_integral(f, a, b),
@@ -80,4 +137,37 @@ class TestNumericalIntegration():
     def test_boyle_rule(self):
         for f, a, b, integral in self.data:
             assert almost_equal(boyle_composite_integral(f, a, b),
-                integral, 1)
\ No newline at end of file
+                integral, 1)
+class TestSeriesAcceleration():
+    def setup_class(self):
+        from decimal import Decimal
+        import math
+        self.data = (
+            (lambda n: Decimal(1) / (n + 1)**2, math.pi**2 / 6),
+            (lambda n: Decimal(-1)**n / (2*n + 1), math.pi / 4),
+            (lambda n: Decimal(1) / 2**n, 2),
+            (lambda n: Decimal(1) if n < 3 else Decimal(0), 3),
+        )
+
+    def test_levin(self):
+        for f, total in self.data:
+            assert almost_equal(float(levin_series(f)), total, 1e-10)
+
+    def test_divergent(self):
+        py.test.raises(ValueError, levin_series, lambda n: n + 1)
+
+
+class TestPolynomialRoots():
+    def test_roots(self):
+        from cas.numeric import Complex
+        with localcontext():
+            getcontext().prec = 40
+            tolerance = Decimal('1e-37')
+            # (x - 1)(x - 2)(x - 3) and x^2 + 1
+            roots = sorted(polynomial_roots([-6, 11, -6, 1]))
+            assert all(abs(a - b) < tolerance for a, b in zip(roots, [1, 2, 3]))
+            roots = polynomial_roots([1, 0, 1])
+            assert all(isinstance(z, Complex) for z in roots)
+            assert all(abs(z * z + 1) < tolerance for z in roots)
+            roots = polynomial_roots([-2, 0, 1])
+            assert all(abs(z * z - 2) < tolerance for z in roots)
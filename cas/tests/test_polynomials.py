@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+''' Tests for polynomial greatest common divisors and cancellation. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+import py.test
+
+from cas.core import Symbol, Sin, partial_differential
+from cas.functions import gcd, lcm
+from cas.numeric import Integer, Rational
+from cas.polynomials import *
+
+
+class TestIntegerPolynomials():
+
+    def setup_class(self):
+        # (x + 1)^2 (x - 3) and (x + 1)(2x + 5)
+        self.a = [-3, -5, -1, 1]
+        self.b = [5, 7, 2]
+
+    def test_subresultant_gcd(self):
+        assert subresultant_gcd(self.a, self.b) == [1, 1]
+        assert subresultant_gcd([1, 0, 1], [-1, 1]) == [1]
+        assert subresultant_gcd([0, 6], [0, 4]) == [0, 2]
+
+    def test_heuristic_gcd(self):
+        assert heuristic_gcd(self.a, self.b) == [1, 1]
+
+    def test_integer_polynomial_gcd(self):
+        assert integer_polynomial_gcd([-6, 0, 6], [4, 4]) == [2, 2]
+        assert integer_polynomial_gcd([], [-2, -1]) == [2, 1]
+        # Agreement between the two methods on larger inputs
+        p = [(-1)**k * (k + 3) for k in range(12)]
+        q = [k * k - 7 for k in range(9)]
+        a, b = integer_polynomial_gcd(p, q), subresultant_gcd(p, q)
+        assert a == b
+
+
+class TestGcd():
+
+    def setup_class(self):
+        self.x, self.y = Symbol('x'), Symbol('y')
+
+    def test_integers(self):
+        assert gcd(12, 18) == 6
+        assert gcd(-4, 6) == 2
+        assert gcd(7, 0) == 7
+        assert gcd(2**100 * 3, 6**50) == 2**50 * 3
+        assert lcm(4, 6) == 12 and lcm(0, 5) == 0
+        assert lcm(2**70, 3**50) == 2**70 * 3**50
+
+    def test_polynomials(self):
+        x = self.x
+        assert gcd(6*x, 5*x) == x
+        assert str(gcd(x**2 - 1, x**2 + 2*x + 1)) == 'x + 1'
+        assert str(gcd(6*x**2 - 6, 4*x + 4)) == '2x + 2'
+        assert str(lcm(x**2 - 1, x + 1)) == 'x^2 - 1'
+
+    def test_non_polynomials(self):
+        x, y = self.x, self.y
+        assert gcd(x*y, y*Sin(x)) == y
+
+
+class TestCancellation():
+
+    def setup_class(self):
+        self.x, self.y, self.z = Symbol('x'), Symbol('y'), Symbol('z')
+
+    def test_polynomials(self):
+        x = self.x
+        assert str((x**2 - 1)/(x + 1)) == 'x - 1'
+        assert str((x**2 - 1)/(x**2 + 2*x + 1)) == '(x - 1)/(x + 1)'
+        assert str((2*x + 2)/4) == '(x + 1)/2'
+        assert str((x**2 / 2 - Rational(1, 2))/(x + 1)) == '(x - 1)/2'
+        assert (2*x)/(4*x) == Rational(1, 2)
+
+    def test_common_factors(self):
+        x, y, z = self.x, self.y, self.z
+        assert str((x*y)/(x*z)) == 'y/z'
+        assert str(x/y) == 'x/y'
+
+    def test_negative_denominators(self):
+        x = self.x
+        assert str((x**2 - 1)/(1 - x)) == '-x - 1'
+        assert str((x + 1)/Integer(-3)) == '(-x - 1)/3'
+
+    def test_repeated_differentiation(self):
+        # Without cancellation the length of each derivative grows
+        # exponentially
+        x = self.x
+        y = x / (x + 1)
+        for i in range(6):
+            y = partial_differential(y, x)
+        assert str(y) == '-720/(x^7 + 7x^6 + 21x^5 + 35x^4 + 35x^3 + 21x^2'\
+            ' + 7x + 1)'
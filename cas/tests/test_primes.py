@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+''' Tests for primality testing and integer factorisation. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import py.test
+from functools import reduce
+from operator import mul
+
+from cas.primes import *
+
+
+class TestPrimes():
+    def setup_class(self):
+        self.primes = small_primes(3000)
+
+    def test_small_primes(self):
+        assert small_primes(30) == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+        assert len(self.primes) == 430
+
+    def test_is_prime(self):
+        assert [n for n in range(3000) if is_prime(n)] == self.primes
+        # Strong pseudoprimes to several small bases
+        for n in (3215031751, 2152302898747, 3474749660383, 341550071728321,
+            3825123056546413051):
+            assert not is_prime(n)
+        assert is_prime(2**89 - 1) and not is_prime(2**67 - 1)
+
+    def test_pollard_brent(self):
+        n = 1000000007 * 998244353
+        assert pollard_brent(n) in (1000000007, 998244353)
+
+    def test_ecm(self):
+        n = 100000000000031 * 1000000000000000003
+        assert ecm_curve(n, 11, 2000, 100000) in (None, 100000000000031,
+            1000000000000000003)
+        assert ecm(n) in (100000000000031, 1000000000000000003)
+
+    def test_factorise(self):
+        for n in (1, 2, 2**32 + 1, 600851475143, 3**40, 2**101 - 1,
+            (2**31 - 1)**2 * (2**61 - 1)):
+            f = factorise(n)
+            assert reduce(mul, f, 1) == n
+            assert all(is_prime(p) for p in f) and list(f) == sorted(f)
+        assert factorise(2**101 - 1) == (7432339208719, 341117531003194129)
+
+    def test_primes_between(self):
+        assert list(primes_between(0, 3000)) == self.primes
+        assert list(primes_between(1000, 1100)) ==\
+            [p for p in self.primes if 1000 <= p < 1100]
+        assert list(primes_between(2, 3)) == [2]
+        assert list(primes_between(24, 29)) == []
+        # Ranges spanning several segments beyond 10^9
+        a = 10**9
+        ps = list(primes_between(a, a + 3 * SEGMENT_SIZE))
+        assert len(ps) == prime_count(a + 3 * SEGMENT_SIZE - 1)\
+            - prime_count(a - 1) == 37851
+        assert ps[0] == 1000000007 and all(is_prime(p) for p in ps[:50])
+
+    def test_prime_count(self):
+        for n, count in ((0, 0), (2, 1), (10, 4), (1000, 168),
+            (10**6, 78498), (10**8, 5761455)):
+            assert prime_count(n) == count
+        assert prime_count(2999) == len(self.primes)
+
+    def test_next_prime(self):
+        assert next_prime(0) == 2 and next_prime(2) == 3
+        assert next_prime(1000) == 1009
+        assert previous_prime(3) == 2 and previous_prime(1009) == 997
+        assert next_prime(10**20) == 10**20 + 39
+        py.test.raises(ValueError, previous_prime, 2)
+
+    def test_arithmetic_functions(self):
+        assert totient(1) == 1 and totient(36) == 12
+        assert totient(2**61 - 1) == 2**61 - 2
+        assert divisors(1) == [1]
+        assert divisors(36) == [1, 2, 3, 4, 6, 9, 12, 18, 36]
+        assert inverse_mod(3, 11) == 4
+        assert 10**30 * inverse_mod(10**30, 2**89 - 1) % (2**89 - 1) == 1
+        py.test.raises(ValueError, inverse_mod, 6, 9)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+''' Tests for the recognition of exact forms. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from decimal import Decimal, getcontext, localcontext
+
+from cas import constants
+from cas.recognition import convergents, index, recognise
+
+
+class TestRecognition():
+    def test_convergents(self):
+        assert list(convergents(0.75)) == [(0, 1), (1, 1), (3, 4)]
+        assert (355, 113) in list(convergents(3.141592653589793))
+
+    def test_index(self):
+        keys, forms = index()
+        assert keys == sorted(keys)
+        assert len(keys) == len(forms)
+
+    def test_recognise(self):
+        with localcontext():
+            getcontext().prec = 30
+            pi = constants.pi()
+            assert recognise(Decimal(5), 20) == ('5', False)
+            assert recognise(Decimal(1) / 3, 20) == ('1/3', True)
+            assert recognise(-2 * pi / 3, 20) == ('-2pi/3', True)
+            assert recognise(100 * pi, 20) == ('100pi', True)
+            assert recognise(Decimal(2).sqrt() / 2, 20) == ('2^(1/2)/2', True)
+            assert recognise(3 * Decimal(2).ln(), 20) == ('3*ln(2)', True)
+            assert recognise(constants.e() / 2, 20) == ('e/2', True)
+            assert recognise(Decimal('1.4142'), 20) is None
+            assert recognise(Decimal('123456.789'), 20) is None
+
+    def test_trusted_digits(self):
+        with localcontext():
+            getcontext().prec = 30
+            # Agrees with pi to 7 significant figures
+            x = Decimal('3.141592')
+            assert recognise(x, 6) == ('pi', True)
+            assert recognise(x, 8) is None
+            # Only exact rationals are recognised with few digits
+            assert recognise(Decimal('4.3'), 3) == ('43/10', True)
+            assert recognise(Decimal('1.34'), 3) is None
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+''' Tests for the binary serialization of expressions and numbers. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+import py.test
+import pickle
+from decimal import Decimal
+
+from cas.core import Symbol, Sin, Ln, List, StrWithHtml, size, depth
+from cas.numeric import Integer, Long, Rational, Real, Complex
+from cas.vectors import Vector
+from cas.matrices import Matrix
+from cas.serialization import *
+
+
+class TestSerialization():
+
+    def setup_class(self):
+        self.x = Symbol('x')
+        self.y = Symbol('y')
+        self.roundtrip = lambda self, a: loads(dumps(a))
+
+    def test_numbers(self):
+        for a in [Integer(0), Integer(-7), Integer(300), 2**100, -2**70,
+            Long(2**100), Long(-2**70), Rational(-3, 7), Real('1.2345'), Real('-0.000012'), Real('1e30'),
+            Decimal('Infinity'), Decimal('-7.50'), 0.1, 3+4j]:
+            b = self.roundtrip(a)
+            assert b == a
+            assert type(b) == type(a)
+        assert self.roundtrip(Complex(3 + 4j)) == 3 + 4j
+        assert str(self.roundtrip(Real('1.50'))) == str(Real('1.50'))
+
+    def test_expressions(self):
+        x, y = self.x, self.y
+        for a in [x, x**2 + 3*x - Integer(1), Sin(x * y), Ln(x**2) * x,
+            x**y]:
+            b = self.roundtrip(a)
+            assert str(b) == str(a)
+            assert b == a
+            assert size(b) == size(a) and depth(b) == depth(a)
+        a = self.roundtrip((x + 1)/(x - y))
+        assert str(a) == '(x + 1)/(-y + x)'
+        assert a.denominator() == x - y
+        assert self.roundtrip(Sin(x))(Integer(0)) == 0
+
+    def test_containers(self):
+        v = Vector([Integer(1), Real('2.5'), Integer(3)])
+        assert self.roundtrip(v) == v
+        m = Matrix([[1, 2], [3, Rational(1, 2)]])
+        assert str(self.roundtrip(m)) == str(m)
+        assert self.roundtrip(m).order() == (2, 2)
+        assert str(self.roundtrip(List(1, 2))) == '1, 2'
+        assert self.roundtrip(StrWithHtml('a', '<b>a</b>')).html == '<b>a</b>'
+        assert self.roundtrip({'a': [1, (2, 'b')], 'c': None, 'd': True})\
+            == {'a': [1, (2, 'b')], 'c': None, 'd': True}
+
+    def test_shared_subtrees(self):
+        a = (self.x + 1)**5
+        b = dumps(Vector([a, a, a]))
+        # The repeated subtree is written once and referred to twice
+        assert len(b) < len(dumps(a)) + 10
+        c = loads(b)
+        assert c[0] is c[1] is c[2]
+
+    def test_repeated_references(self):
+        x, y, z = self.x, self.y, Symbol('z')
+        a = self.roundtrip(List(x, x, y, y))
+        assert str(a) == 'x, x, y, y'
+        a = self.roundtrip(List(x + 1, x + 1, y, y))
+        assert str(a) == 'x + 1, x + 1, y, y'
+        a = (x + 1)*(y + 2) + (x + 1) + z + (y + 2)
+        b = self.roundtrip(a)
+        assert str(b) == str(a)
+        assert b == a
+
+    def test_size(self):
+        for a in [Real('1.2345'), Integer(5), Rational(1, 3),
+            Matrix([[1, 2], [3, 4]])]:
+            assert len(dumps(a)) < len(pickle.dumps(a, 2))
+
+    def test_errors(self):
+        py.test.raises(SerializationError, loads, b'xyz')
+        py.test.raises(SerializationError, loads, dumps(Integer(1))[:-1])
+        py.test.raises(SerializationError, loads, dumps(Integer(1)) + b'i')
+        py.test.raises(SerializationError, dumps, object())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+''' Tests for the special functions. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import math
+from decimal import Decimal, getcontext, localcontext
+from fractions import Fraction
+
+import pytest
+
+import cas.constants as constants
+import cas.special as special
+from cas.numeric import Integer, Rational, Real
+from cas.statistics import binomialpdf, binomialcdf, poissonpdf, poissoncdf,\
+    normalcdf, factorial
+from cas.summation import bernoulli
+
+
+def rounded(digits, prec=40):
+    ''' Round a string of digits to prec significant figures. '''
+    with localcontext() as c:
+        c.prec = prec
+        return +Decimal(digits)
+
+
+def reference(f, *args):
+    ''' Return f(*args) computed with 30 more digits than the working
+    precision, rounded to it. '''
+    with localcontext() as c:
+        c.prec += 30
+        y = f(*args)
+    return +y
+
+
+def close(x, y, ulps=1):
+    ''' Whether x is within a few ulps of y at the working precision. '''
+    return abs(x - y) <= ulps * abs(y).scaleb(1 - getcontext().prec)
+
+
+class TestGamma():
+    def setup_method(self, method):
+        getcontext().prec = 40
+
+    def test_integers(self):
+        assert special.gamma(1) == 1
+        assert special.gamma(10) == 362880
+        assert special.lgamma(1) == 0
+
+    def test_half(self):
+        assert special.gamma(Decimal('0.5')) == constants.pi().sqrt()
+        assert close(special.gamma(Decimal('-0.5')),
+            -2 * constants.pi().sqrt())
+
+    def test_values(self):
+        assert special.gamma(Decimal(1) / 3)\
+            == rounded('2.6789385347077476336556929409746776441287')
+        assert special.gamma(Rational(1, 3)) == special.gamma(Decimal(1) / 3)
+
+    def test_lgamma(self):
+        with localcontext() as c:
+            c.prec = 60
+            y = Decimal(math.factorial(199)).ln()
+        assert special.lgamma(200) == +y
+        assert special.lgamma(Decimal('199.5'))\
+            == reference(special.lgamma, Decimal('199.5'))
+
+    def test_reflection(self):
+        for x in ['-0.5', '-2.5', '-10.25', '-100.3']:
+            x = Decimal(x)
+            y = special.gamma(x)
+            assert close(y * special.gamma(1 - x) * special._sin_pi(x),
+                constants.pi(), 5)
+            assert float(y) == pytest.approx(math.gamma(float(x)))
+
+    def test_floats(self):
+        for x in [0.001, 0.7, 3.3, 20.5, 170.5]:
+            assert float(special.gamma(x)) == pytest.approx(math.gamma(x))
+            assert float(special.lgamma(x)) == pytest.approx(math.lgamma(x))
+
+    def test_poles(self):
+        for x in [0, -1, -5]:
+            with pytest.raises(ValueError):
+                special.gamma(x)
+            with pytest.raises(ValueError):
+                special.lgamma(x)
+
+    def test_beta(self):
+        assert special.beta(2, 3) * 12 == 1
+        assert special.beta(Decimal('0.5'), Decimal('0.5')) == constants.pi()
+        assert close(special.beta(Decimal('2.5'), Decimal('-1.5')),
+            special.gamma(Decimal('2.5')) * special.gamma(Decimal('-1.5')))
+
+    def test_bernoulli(self):
+        for k in range(30):
+            b = bernoulli(k)
+            assert close(special._bernoulli(k),
+                Decimal(b.numerator) / Decimal(b.denominator))
+
+
+class TestErf():
+    def setup_method(self, method):
+        getcontext().prec = 40
+
+    def test_values(self):
+        assert special.erf(0) == 0
+        assert special.erf(1) == rounded(
+            '0.84270079294971486934122063508260925929606699796630')
+        assert special.erfc(10) == rounded(
+            '2.0884875837625447570007862949577886115608181193211E-45')
+
+    def test_symmetry(self):
+        for x in ['0.3', '2', '7']:
+            x = Decimal(x)
+            assert special.erf(-x) == -special.erf(x)
+            assert close(special.erfc(-x), 2 - special.erfc(x))
+
+    def test_floats(self):
+        for x in [-3.0, -0.5, 0.01, 1.5, 4.0, 20.0]:
+            assert float(special.erf(x)) == pytest.approx(math.erf(x))
+            assert float(special.erfc(x)) == pytest.approx(math.erfc(x))
+
+    def test_regimes(self):
+        # Around the changes from the series to the continued fraction and
+        # from the continued fraction to the asymptotic expansion
+        digits = (getcontext().prec + special.GUARD_DIGITS) * math.log(10)
+        for x2 in [digits / 4, digits + 10]:
+            for dx in [-0.01, 0, 0.01]:
+                x = Decimal(repr(math.sqrt(x2) + dx))
+                assert special.erfc(x) == reference(special.erfc, x)
+                assert special.erf(x) == reference(special.erf, x)
+
+    def test_normal_cdf(self):
+        assert special.normal_cdf(0) == Decimal('0.5')
+        assert float(special.normal_cdf(-10))\
+            == pytest.approx(7.6198530241604696e-24)
+        assert close(special.normal_cdf(Decimal('1.5'))
+            + special.normal_cdf(Decimal('-1.5')), Decimal(1))
+
+
+class TestZeta():
+    def setup_method(self, method):
+        getcontext().prec = 40
+
+    def test_integers(self):
+        assert special.zeta(0) == Decimal('-0.5')
+        assert special.zeta(-1) * -12 == 1
+        assert special.zeta(-2) == 0
+        assert special.zeta(2) == constants.pi() ** 2 / 6
+        assert special.zeta(3) == rounded(
+            '1.2020569031595942853997381615114499907649862923405')
+
+    def test_values(self):
+        assert special.zeta(Decimal('0.5')) == rounded(
+            '-1.4603545088095868128894991525152980124672293310125814905429')
+        for s in ['1.0001', '2.5', '-1.5', '-7.25', '60.5', '200']:
+            s = Decimal(s)
+            assert close(special.zeta(s), reference(special.zeta, s))
+
+    def test_pole(self):
+        with pytest.raises(ValueError):
+            special.zeta(1)
+
+
+class TestIncomplete():
+    def setup_method(self, method):
+        getcontext().prec = 40
+
+    def test_gammainc(self):
+        for x in ['0.5', '2', '30']:
+            x = Decimal(x)
+            assert close(special.gammainc(1, x), 1 - (-x).exp())
+            assert close(special.gammainc(Decimal('2.5'), x)
+                + special.gammaincc(Decimal('2.5'), x), Decimal(1))
+        assert special.gammainc(3, 0) == 0
+        assert special.gammaincc(3, 0) == 1
+
+    def test_gammainc_regimes(self):
+        # Either side of the change from the series to the continued fraction
+        for x in ['3.99', '4', '4.01']:
+            x = Decimal(x)
+            assert special.gammaincc(3, x) == reference(special.gammaincc,
+                3, x)
+
+    def test_betainc(self):
+        for x in ['0.1', '0.5', '0.9']:
+            x = Decimal(x)
+            assert close(special.betainc(Decimal('2.5'), 1, x),
+                x ** Decimal('2.5'))
+            assert close(special.betainc(2, 3, x),
+                1 - special.betainc(3, 2, 1 - x))
+        assert special.betainc(2, 3, 0) == 0
+        assert special.betainc(2, 3, 1) == 1
+
+    def test_domain(self):
+        with pytest.raises(ValueError):
+            special.gammainc(0, 1)
+        with pytest.raises(ValueError):
+            special.betainc(1, 1, Decimal('1.5'))
+
+
+class TestStatistics():
+    def setup_method(self, method):
+        getcontext().prec = 40
+
+    def test_binomialcdf(self):
+        n, p = Integer(20), Real('0.3')
+        total = sum(Fraction(binomialpdf(n, Rational(3, 10), Integer(k)))
+            for k in range(4))
+        assert binomialcdf(n, Rational(3, 10), Integer(3)) == total
+        assert close(binomialcdf(n, p, Integer(3)),
+            Decimal(total.numerator) / Decimal(total.denominator))
+        assert binomialcdf(n, p, Integer(-1)) == 0
+        assert binomialcdf(n, p, Integer(20)) == 1
+
+    def test_poissoncdf(self):
+        t = Real(6)
+        total = sum(poissonpdf(t, Integer(k)) for k in range(4))
+        assert close(poissoncdf(t, Integer(3)), total, 5)
+
+    def test_normalcdf(self):
+        assert float(normalcdf(Real(2))) == pytest.approx(0.9772498680518208)
+
+    def test_factorial(self):
+        assert factorial(Integer(5)) == 120
+        assert close(factorial(Real('0.5')), constants.pi().sqrt() / 2)
+        with pytest.raises(ValueError):
+            factorial(Real(-2))
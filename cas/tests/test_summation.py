@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+''' Tests for symbolic and numeric sums and products. '''
+from __future__ import division
+__author__ = 'Tom Wright <tom.tdw@gmail.com>'
+# Copyright 2012 Thomas Wright <tom.tdw@gmail.com>
+# This file is part of C1000 Intelligent Calculator.
+#
+# C1000 Intelligent Calculator is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the License,
+# or (at your option) any later version.
+#
+# C1000 Intelligent Calculator is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along with
+# C1000 Intelligent Calculator.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import py.test
+from decimal import Decimal
+
+from cas.core import Symbol, Sin, Ln
+from cas.numeric import Integer, Rational, Real
+from cas.statistics import factorial
+from cas.summation import *
+
+
+class TestSummation():
+
+    def setup_class(self):
+        self.n = Symbol('n')
+        self.m = Symbol('m')
+        self.x = Symbol('x')
+        self.inf = Real('Infinity')
+
+    def test_bernoulli(self):
+        assert [bernoulli(k) for k in range(7)] == [1, Rational(1, 2),
+            Rational(1, 6), 0, Rational(-1, 30), 0, Rational(1, 42)]
+
+    def test_polynomials(self):
+        n = self.n
+        assert summation(n**2, n, 1, 10) == 385
+        assert summation(n**3 + 2*n, n, 3, 100) == 25512585
+        assert summation(Integer(5), n, -2, 2) == 25
+        assert summation(n, n, 5, 1) == 0
+        assert str(summation(n**2, n, 1, self.m))\
+            == '(1/3)m^3 + (1/2)m^2 + (1/6)m'
+        assert str(summation(self.x * n, n, 1, 5)) == '15x'
+
+    def test_geometric(self):
+        n = self.n
+        assert summation(Integer(2)**n, n, 0, 10) == 2047
+        assert summation(3 * Integer(2)**(n + 1), n, 1, 3) == 84
+        assert summation(Rational(1, 2)**n, n, 0, self.inf) == 2
+        py.test.raises(ValueError, summation, Integer(2)**n, n, 0, self.inf)
+        py.test.raises(ValueError, summation, n, n, 0, self.inf)
+        assert str(summation(Integer(2)**n, n, 0, self.m))\
+            == '-1 + 2^(m + 1)'
+        assert str(summation(self.x**n, n, 0, 3)) == 'x^3 + x^2 + x + 1'
+
+    def test_alternating(self):
+        n = self.n
+        assert summation(n * (-1)**n, n, 1, 2000) == 1000
+        assert summation(n * (-1)**n, n, 1, 5) == -3
+
+    def test_numeric(self):
+        n = self.n
+        assert summation(1/n, n, 1, 10) == Rational(7381, 2520)
+        assert abs(summation(1/n**2, n, 1, 1000) - Decimal('1.643934566681559'))\
+            < Decimal('1e-14')
+
+    def test_large_ranges(self):
+        n = self.n
+        # Found from the sums to infinity rather than term by term
+        assert abs(summation(1/n**2, n, 1, 10**6)
+            - Decimal('1.644933066848726')) < Decimal('1e-14')
+        assert abs(summation((-1)**n/n, n, 1, 10**6 + 1)
+            - Decimal('-0.693147680559195')) < Decimal('1e-14')
+        assert abs(summation(1/n**2, n, 10**6, 2 * 10**6)
+            - Decimal('5.000006250001458e-7')) < Decimal('1e-21')
+        # Divergent series are still summed term by term
+        assert abs(summation(1/n, n, 1, 2000)
+            - Decimal('8.178368103610282')) < Decimal('1e-14')
+
+    def test_factorials(self):
+        n = self.n
+        assert str(1/factorial(n)) == '1/n!'
+        assert summation(factorial(n), n, 1, 5) == 153
+        assert summation(1/factorial(n), n, 0, 5) == Rational(163, 60)
+        assert abs(summation(1/factorial(n), n, 0, self.inf)
+            - Decimal('2.718281828459045')) < Decimal('1e-14')
+        assert abs(summation(1/factorial(2*n + 1), n, 0, self.inf)
+            - Decimal('1.175201193643801')) < Decimal('1e-14')
+
+    def test_poles(self):
+        n = self.n
+        py.test.raises(ValueError, summation, 1/n**2, n, 0, self.inf)
+        py.test.raises(ValueError, summation, 1/n, n, -3, 3)
+        py.test.raises(ValueError, summation, 1/(n - 500)**2, n, 1, 2000)
+        py.test.raises(ValueError, product, 1/n, n, 0, 3)
+        # Poles beyond the range do not matter
+        assert summation(1/(n - 3000), n, 1, 2000) < 0
+
+    def test_infinite(self):
+        n = self.n
+        assert abs(summation(1/n**2, n, 1, self.inf)
+            - Decimal('1.644934066848226')) < Decimal('1e-14')
+        assert abs(summation((-1)**(n + 1)/n, n, 1, self.inf)
+            - Decimal('0.693147180559945')) < Decimal('1e-14')
+
+    def test_products(self):
+        n = self.n
+        assert product(n, n, 1, 10) == 3628800
+        assert product(n, n, -3, -1) == -6
+        assert product(n, n, -3, 3) == 0
+        assert product(Integer(2)**n, n, 1, 4) == 1024
+        assert product(1 + 1/n, n, 1, 9) == 10
+        assert abs(product(1 - 1/(4*n**2), n, 1, self.inf)
+            - Decimal('0.636619772367581')) < Decimal('1e-14')
+
+    def test_errors(self):
+        py.test.raises(ValueError, summation, self.n, Integer(2), 1, 3)
+        py.test.raises(ValueError, summation, self.n, self.n, Real('0.5'), 3)
+        py.test.raises(ValueError, summation, Sin(self.n), self.n, 1,
+            self.m)
+
+    def test_batch(self):
+        n = self.n
+        f = Sin(n) * n**2 + Ln(n + 1) / n
+        g = decimal_batch(f, n)
+        xs = [Decimal(i) / 7 for i in range(1, 30)]
+        assert g(xs) == [f(x) for x in xs]
+        assert decimal_batch(Integer(3), n)(xs[:2]) == [3, 3]
+        py.test.raises(ValueError, decimal_batch, Sin(self.m), n)
@@ -37,12 +37,47 @@ SOFTWARE.
 # TODO should use custom convert_other that has the option of converting floats (using float_to_decimal) if an option is set in advance (just not by default)
 # TODO try implementing something, say pi, in pyrex to compare the speed
 
+import contextlib
 import math
 import decimal
-from decimal import Decimal, getcontext, setcontext, _convert_other
+import numbers
+from decimal import Context, Decimal, Inexact, getcontext, localcontext, \
+    _convert_other
+
+from threading import Lock
+
+from cas.cache import lru_cache
+import cas.binary_splitting as binary_splitting
 
 D = Decimal
-context = getcontext()
+
+# Arguments with numerators and denominators of up to this many digits are
+# summed exactly by binary splitting, which is faster for them at any
+# precision; longer ones make the integers it multiplies too large.
+SHORT_DIGITS = 20
+# Exponentials are only summed by binary splitting up to this argument, beyond
+# which their series have too many terms
+SHORT_EXP_LIMIT = 100
+# The digits carried beyond the working precision by the trigonometric
+# functions and their inverses, so that all but around one in 10**GUARD_DIGITS
+# of their results are correctly rounded
+GUARD_DIGITS = 5
+# At precisions of up to this many digits functions are first evaluated in
+# machine floats, and only by their series if the error in the float result
+# could change its rounding
+FLOAT_DIGITS = 15
+# The unit in which the errors of float results are bounded: the largest
+# relative error in rounding a number to a float
+FLOAT_EPSILON = 2.0 ** -53
+# The bounds on the absolute errors of the float results y of math functions
+# of the floats a, in units of FLOAT_EPSILON: the error in rounding a to a
+# float times the derivative of the function, and two units of the last
+# place for that of the math function itself
+_EXP_ERROR = lambda a, y: (abs(a) + 2) * abs(y)
+_LOG_ERROR = lambda a, y: 1 + 2 * abs(y)
+_SIN_ERROR = _COS_ERROR = lambda a, y: abs(a) + 2 * abs(y)
+_TAN_ERROR = lambda a, y: abs(a) * (1 + y * y) + 2 * abs(y)
+_ATAN_ERROR = lambda a, y: abs(a) / (1 + a * a) + 2 * abs(y)
 
 #
 # utility functions
@@ -62,41 +97,67 @@ def float_to_decimal(f):
         exponent -= 1
     mantissa = int(mantissa)
 
-    oldcontext = getcontext()
-    setcontext(Context(traps=[Inexact]))
-    try:
+    with localcontext(Context(traps=[Inexact])) as exact:
         while True:
             try:
                return mantissa * Decimal(2) ** exponent
             except Inexact:
-                getcontext().prec += 1
-    finally:
-        setcontext(oldcontext)
+                exact.prec += 1
+
+def _short_rational(x):
+    """Return the numerator and denominator of an integer, fraction or finite
+    Decimal, or None if either has more than SHORT_DIGITS digits."""
+    if isinstance(x, Decimal):
+        if not x.is_finite():
+            return None
+        sign, digits, exponent = x.as_tuple()
+        if len(digits) > SHORT_DIGITS or abs(exponent) > SHORT_DIGITS:
+            return None
+        u = int(''.join(map(str, digits))) * (-1 if sign else 1)
+        if exponent >= 0:
+            return u * 10 ** exponent, 1
+        return u, 10 ** -exponent
+    elif isinstance(x, numbers.Integral):
+        u, v = int(x), 1
+    elif isinstance(x, numbers.Rational):
+        u, v = x.numerator, x.denominator
+    else:
+        return None
+    if len(str(abs(u))) > SHORT_DIGITS or len(str(v)) > SHORT_DIGITS:
+        return None
+    return u, v
+
+def _to_decimal(x):
+    """Convert integers and exact fractions to Decimal at the current precision,
+    so that series are not summed in exact arithmetic."""
+    if isinstance(x, numbers.Integral):
+        return D(int(x))
+    elif isinstance(x, numbers.Rational):
+        return D(x.numerator) / D(x.denominator)
+    else:
+        return x
 
 #
 # constants
 #
 
 def pi(context=None):
-    """Compute Pi to the current precision."""
-    getcontext().prec += 2
-    lasts = 0; t = D(3); s = 3; n = 1; na = 0; d = 0; da = 24
-    while s != lasts:
-        lasts = s
-        n, na = n + na, na + 8
-        d, da = d + da, da + 32
-        t = (t * n) / d
-        s += t
-    getcontext().prec -= 2
-    return +s
-
-def e():
-    """Compute the base of the natural logarithm to the current precision."""
-    return exp(D(1))
-
-def golden_ratio():
-    """Calculate the golden ratio to the current precision."""
-    return  (1 + D(5).sqrt()) / 2
+    """Return Pi to the current precision."""
+    from cas.constants import pi
+    with _working(context):
+        return pi()
+
+def e(context=None):
+    """Return the base of the natural logarithm to the current precision."""
+    from cas.constants import e
+    with _working(context):
+        return e()
+
+def golden_ratio(context=None):
+    """Return the golden ratio to the current precision."""
+    from cas.constants import golden_ratio
+    with _working(context):
+        return golden_ratio()
 
 #
 # transcendental functions
@@ -104,19 +165,14 @@ def golden_ratio():
 
 def exp(x, context=None):
     """Return e raised to the power of x."""
-    if context is None:
-        context = getcontext()
-    
-    context.prec += 2
-    i = 0; lasts = 0; s = 1; fact = 1; num = 1
-    while s != lasts:
-        lasts = s    
-        i += 1
-        fact *= i
-        num *= x     
-        s += num / fact   
-    context.prec -= 2        
-    return +s
+    return exp_many([x], context)[0]
+
+def exp_many(xs, context=None):
+    """Return e raised to the power of each of a sequence of numbers, the
+    same as those of exp, finding ln(2) once for all of them."""
+    shared = _Shared()
+    with _working(context):
+        return [_exp(x, shared) for x in xs]
 
 def log(x, base=None, context=None):
     """Return the logarithm of x to the given base.
@@ -124,38 +180,23 @@ def log(x, base=None, context=None):
     If the base not specified, return the natural logarithm (base e) of x.
     
     """
-    if context is None:
-        context = getcontext()
-    
-    if x < 0:
-        return D('NaN', context=context)
-    elif base == 1:
-        raise ValueError("Base was 1!")
-    elif x == base:
-        return D(1, context=context)
-    elif x == 0:
-        return D('-Inf', context=context)
+    return log_many([x], base, context)[0]
+
+def log_many(xs, base=None, context=None):
+    """Return the logarithms of each of a sequence of numbers to the given
+    base, the logarithm of which is only found once.
     
-    context.prec += 2    
+    The results are those of log.
     
-    if base is None:
-        log_base = 1
-        approx = math.log(x)
-    else:
-        log_base = log(base, context=context)
-        approx = math.log(x, base)
-
-    lasts, s = 0, D(repr(approx), context=context)
-    while lasts != s:
-        lasts = s
-        s -=  1 - x / exp(s, context=context)
-    s /= log_base
-    context.prec -= 2
-    return +s
+    """
+    with _working(context):
+        if base is not None:
+            base = _to_decimal(base)
+        return [_log(x, base) for x in xs]
 
-def log10(x):
+def log10(x, context=None):
     """Return the base 10 logarithm of x."""
-    return log(x, D(10))
+    return log(x, D(10), context=context)
 
 #
 # trigonometric functions
@@ -163,51 +204,37 @@ def log10(x):
 
 def sin(x, context=None):
     """Return the sine of x in radians."""
-    if context is None:
-        context = getcontext()
+    return sin_many([x], context)[0]
 
-    # Uses the series definition of cos, see:
-    # http://en.wikipedia.org/wiki/Trigonometric_function#Series_definitions
-    context.prec += 2
-    i, lasts, s, fact, num, sign = 1, 0, x, 1, x, 1
-    while s != lasts:
-        lasts = s    
-        i += 2
-        fact *= i * (i - 1)
-        num *= x * x
-        sign *= -1
-        s += num / fact * sign
-    context.prec -= 2
-    return +s
+def sin_many(xs, context=None):
+    """Return the sines of each of a sequence of numbers in radians, the same
+    as those of sin, finding pi, by which they are reduced, once for all of
+    them."""
+    shared = _Shared()
+    with _working(context):
+        return [_sin(x, shared) for x in xs]
 
 def cos(x, context=None):
     """Return the cosine of x in radians."""
-    if context is None:
-        context = getcontext()
-    
-    # Uses the series definition of cos, see:
-    # http://en.wikipedia.org/wiki/Trigonometric_function#Series_definitions
-    context.prec += 2
-    i = 0; lasts = 0; s = 1; fact = 1; num = 1; sign = 1
-    while s != lasts:
-        lasts = s    
-        i += 2
-        fact *= i * (i - 1)
-        num *= x * x
-        sign = -sign
-        s += num / fact * sign 
-    context.prec -= 2        
-    return +s
+    return cos_many([x], context)[0]
+
+def cos_many(xs, context=None):
+    """Return the cosines of each of a sequence of numbers in radians, the
+    same as those of cos."""
+    shared = _Shared()
+    with _working(context):
+        return [_cos(x, shared) for x in xs]
 
 def tan(x, context=None):
     """Return the tangent of x in radians."""
-    if context is None:
-        context = getcontext()
-    
-    context.prec += 2
-    t = sin(x, context=context) / cos(x, context=context)
-    context.prec -= 2
-    return +t
+    return tan_many([x], context)[0]
+
+def tan_many(xs, context=None):
+    """Return the tangents of each of a sequence of numbers in radians, the
+    same as those of tan."""
+    shared = _Shared()
+    with _working(context):
+        return [_tan(x, shared) for x in xs]
 
 #
 # inverse trigonometric functions
@@ -245,20 +272,23 @@ def tan(x, context=None):
 # This is way faster, I wonder if there's a downside?
 def asin(x, context=None):
     """Return the arcsine of x in radians."""
-    if abs(x) > 1:
-        raise ValueError("Domain error: asin accepts -1 <= x <= 1")
-    
     if context is None:
         context = getcontext()
+    with _working(context):
+        x = _to_decimal(x)
+    if abs(x) > 1:
+        raise ValueError("Domain error: asin accepts -1 <= x <= 1")
     
     if x == -1:
-        return pi(context=context) / -2
+        return context.divide(pi(context), -2)
     elif x == 0:
         return D(0, context=context)
     elif x == 1:
-        return pi(context=context) / 2
+        return context.divide(pi(context), 2)
     
-    return atan2(x, D.sqrt(1 - x ** 2), context=context)
+    with _working(context, 2) as working:
+        s = atan2(x, D.sqrt(1 - x ** 2), context=working)
+    return context.plus(s)
 
 # The version below is actually overwritten by the version using atan2 below
 # it, since it is much faster. If possible, I'd like to write a fast version
@@ -292,62 +322,81 @@ def asin(x, context=None):
 # This is way faster, I wonder if there's a downside?
 def acos(x, context=None):
     """Return the arccosine of x in radians."""
-    if abs(x) > 1:
-        raise ValueError("Domain error: acos accepts -1 <= x <= 1")
-
     if context is None:
         context = getcontext()
+    with _working(context):
+        x = _to_decimal(x)
+    if abs(x) > 1:
+        raise ValueError("Domain error: acos accepts -1 <= x <= 1")
     
     if x == 1:
         return D(0, context=context)
-    else:
-        PI = pi(context=context)
-        if x == -1:
-            return PI
-        elif x == 0:
-            return PI / 2
+    elif x == -1:
+        return pi(context)
+    elif x == 0:
+        return context.divide(pi(context), 2)
     
-    return PI / 2 - atan2(x, sqrt(1 - x ** 2, context=context), context=context)
+    with _working(context, 2) as working:
+        s = pi() / 2 - atan2(x, sqrt(1 - x ** 2), context=working)
+    return context.plus(s)
 
 def atan(x, context=None):
     """Return the arctangent of x in radians."""
     if context is None:
         context = getcontext()
-    c = 0
+    with _working(context):
+        y = _float_path(math.atan, x, _ATAN_ERROR)
+    if y is not None:
+        return y
+    short = _short_rational(x)
+    with _working(context):
+        x = _to_decimal(x)
+
+    if short is not None:
+        u, v = short
+        if abs(u) <= v:
+            with _working(context):
+                return binary_splitting.atan_rational(u, v)
+        # atan(x) = sgn(x) pi/2 - atan(1/x)
+        with _working(context, GUARD_DIGITS):
+            s = pi() / (2 if u > 0 else -2)\
+                - binary_splitting.atan_rational(v, u)
+        return context.plus(s)
     
     if x == 0:
         return D(0, context=context)
-    elif abs(x) > 1:
-        PI = pi(context=context)
-        x_is_inf = x._isinfinity()
-        if x_is_inf:
-            return PI / D((x._sign, (2,), 0), context=context)
-        else:
-            c = PI / D((x._sign, (2,), 0), context=context)
-            x = 1 / x
+    elif x._isinfinity():
+        return context.divide(pi(context), D((x._sign, (2,), 0)))
     
-    context.prec += 2
-    x_squared = x ** 2
-    y = x_squared / (1 + x_squared)
-    y_over_x = y / x
-    i = D(0); lasts = 0; s = y_over_x; coeff = 1; num = y_over_x
-    while s != lasts:
-        lasts = s 
-        i += 2
-        coeff *= i / (i + 1)
-        num *= y
-        s += coeff * num
-    if c:
-        s = c - s
-    context.prec -= 2
-    return +s
-
-def atan2(y, x, context=context):
+    with _working(context, GUARD_DIGITS):
+        c = 0
+        if abs(x) > 1:
+            c = pi() / D((x._sign, (2,), 0))
+            x = 1 / x
+        x_squared = x ** 2
+        y = x_squared / (1 + x_squared)
+        y_over_x = y / x
+        i = D(0); lasts = 0; s = y_over_x; coeff = 1; num = y_over_x
+        while s != lasts:
+            lasts = s 
+            i += 2
+            coeff *= i / (i + 1)
+            num *= y
+            s += coeff * num
+        if c:
+            s = c - s
+    return context.plus(s)
+
+def atan2(y, x, context=None):
     """Return the arctangent of y/x in radians.
     
     Unlike atan(y/x), the signs of both x and y are considered.
     
     """
+    if context is None:
+        context = getcontext()
+    with _working(context):
+        y, x = _to_decimal(y), _to_decimal(x)
 # TODO check the sign function make sure this still works
 # decimal zero has a sign
     abs_y = abs(y)
@@ -356,19 +405,21 @@ def atan2(y, x, context=context):
     
     if x != 0:
         if y_is_real:
-            a = y and atan(y / x, context=context) or D(0)
-            if x < 0:
-                a += D((y._sign, (1,), 0)) * pi(context=context)
-            return a
+            with _working(context, 2) as working:
+                a = y and atan(y / x, context=working) or D(0)
+                if x < 0:
+                    a += D((y._sign, (1,), 0)) * pi()
+            return context.plus(a)
         elif abs_y == abs_x:
             x = D((x._sign, (1,), 0))
             y = D((y._sign, (1,), 0))
-            return pi(context=context) * (2 - x) / (4 * y)
+            with _working(context):
+                return pi() * (2 - x) / (4 * y)
 
     if y != 0:
-        return atan(D((y._sign, (0,), 'F')))
+        return atan(D((y._sign, (0,), 'F')), context=context)
     elif x < 0:
-        return D((y._sign, (1,), 0)) * pi()
+        return context.multiply(D((y._sign, (1,), 0)), pi(context))
     else:
         return D(0)
 
@@ -376,45 +427,55 @@ def atan2(y, x, context=context):
 # hyperbolic trigonometric functions
 #
 
-def sinh(x):
+def sinh(x, context=None):
     """Return the hyperbolic sine of x."""
+    if context is None:
+        context = getcontext()
+    with _working(context):
+        x = _to_decimal(x)
     if x == 0:
         return D(0)
     
     # Uses the taylor series expansion of sinh, see:
     # http://en.wikipedia.org/wiki/Hyperbolic_function#Taylor_series_expressions
-    getcontext().prec += 2
-    i, lasts, s, fact, num = 1, 0, x, 1, x
-    while s != lasts:
-        lasts = s
-        i += 2
-        num *= x * x
-        fact *= i * (i - 1)
-        s += num / fact
-    getcontext().prec -= 2
-    return +s
-
-def cosh(x):
+    with _working(context, 2):
+        i, lasts, s, fact, num = 1, 0, x, 1, x
+        while s != lasts:
+            lasts = s
+            i += 2
+            num *= x * x
+            fact *= i * (i - 1)
+            s += num / fact
+    return context.plus(s)
+
+def cosh(x, context=None):
     """Return the hyperbolic cosine of x."""
+    if context is None:
+        context = getcontext()
+    with _working(context):
+        x = _to_decimal(x)
     if x == 0:
         return D(1)
     
     # Uses the taylor series expansion of cosh, see:
     # http://en.wikipedia.org/wiki/Hyperbolic_function#Taylor_series_expressions
-    getcontext().prec += 2
-    i, lasts, s, fact, num = 0, 0, 1, 1, 1
-    while s != lasts:
-        lasts = s
-        i += 2
-        num *= x * x
-        fact *= i * (i - 1)
-        s += num / fact
-    getcontext().prec -= 2
-    return +s
-
-def tanh(x):
+    with _working(context, 2):
+        i, lasts, s, fact, num = 0, 0, 1, 1, 1
+        while s != lasts:
+            lasts = s
+            i += 2
+            num *= x * x
+            fact *= i * (i - 1)
+            s += num / fact
+    return context.plus(s)
+
+def tanh(x, context=None):
     """Return the hyperbolic tangent of x."""
-    return +(sinh(x) / cosh(x))
+    if context is None:
+        context = getcontext()
+    with _working(context) as working:
+        x = _to_decimal(x)
+        return +(sinh(x, context=working) / cosh(x, context=working))
 
 #
 # miscellaneous functions
@@ -431,13 +492,15 @@ def sgn(x):
     else:
         return D(0)
 
-def degrees(x):
+def degrees(x, context=None):
     """Return angle x converted from radians to degrees."""
-    return x * 180 / pi()
+    with _working(context):
+        return x * 180 / pi()
 
-def radians(x):
+def radians(x, context=None):
     """Return angle x converted from degrees to radians."""
-    return x * pi() / 180
+    with _working(context):
+        return x * pi() / 180
 
 def ceil(x):
     """Return the smallest integral value >= x."""
@@ -447,9 +510,10 @@ def floor(x):
     """Return the largest integral value <= x."""
     return x.to_integral(rounding=decimal.ROUND_FLOOR)
 
-def hypot(x, y):
+def hypot(x, y, context=None):
     """Return the Euclidean distance, sqrt(x**2 + y**2)."""
-    return sqrt(x * x + y * y)
+    with _working(context):
+        return sqrt(x * x + y * y)
 
 def modf(x):
     """Return the fractional and integer parts of x."""
@@ -488,11 +552,13 @@ def pow(x, y, context=None):
     context, x, y = _initialize(context, x, y)
     # if y is an integer, just call regular pow
     if y._isinteger():
-        return x**y
+        return x.__pow__(y, context=context)
     # if x is negative, the result is complex
     if x < 0:
         return context._raise_error(decimal.InvalidOperation, 'x (negative) ** y (fractional)')
-    return exp(y * log(x))
+    with _working(context, 2) as working:
+        s = exp(y * log(x, context=working), context=working)
+    return context.plus(s)
 
 def tetrate(x, y, context=None):
     """Return x recursively raised to the power of x, y times. ;)
@@ -514,12 +580,288 @@ def tetrate(x, y, context=None):
             return x
         return x**_tetrate(x,y-1)
 
-    return _tetrate(x,y)
+    with _working(context):
+        return _tetrate(x,y)
 
 #
 # internal functions
 #
 
+@contextlib.contextmanager
+def _working(context=None, extra=0):
+    """Use a copy of context (or of the current context) with extra digits
+    of precision as the current context for the duration of a with statement.
+
+    The caller's context is never changed, even if the statement raises an
+    exception, and may be shared between threads; the flags raised in the
+    copy are copied back to it.
+
+    """
+    if context is None:
+        context = getcontext()
+    with localcontext(context) as working:
+        working.prec += extra
+        try:
+            yield working
+        finally:
+            for flag, raised in working.flags.items():
+                if raised:
+                    context.flags[flag] = True
+
+def _float_path(f, x, error):
+    """Return f(x), for a function f from math, evaluated in floats and
+    rounded to the current precision, or None if the precision is more than
+    FLOAT_DIGITS or the result may not be correctly rounded.
+    
+    error(a, y) bounds the error in the result y for the float a nearest x in
+    units of FLOAT_EPSILON. The result is only returned when both ends of the
+    interval it bounds round to the same number, which, since rounding is
+    monotonic, is then the correctly rounded value of f(x).
+    
+    """
+    if getcontext().prec > FLOAT_DIGITS:
+        return None
+    try:
+        a = float(x)
+        y = f(a)
+    except (OverflowError, ValueError):
+        return None
+    # Subnormal results may have lost digits, and zero ones all of them
+    if not 1e-290 < abs(y) < 1e290 or math.isinf(a):
+        return None
+    # The bound is doubled for the errors in computing it
+    bound = D(2 * FLOAT_EPSILON * error(a, y))
+    low, high = D(y) - bound, D(y) + bound
+    return low if low == high else None
+
+class _Shared(object):
+    """The constants used in evaluating a function at a batch of arguments,
+    each found once when first needed and shared between them. Constants are
+    kept for each precision they are taken to."""
+    def __init__(self):
+        self.half_pis = {}
+        self.ln2s = {}
+
+    def half_pi(self):
+        """Return pi/2 to the current precision."""
+        prec = getcontext().prec
+        if prec not in self.half_pis:
+            from cas.constants import pi
+            self.half_pis[prec] = pi() / 2
+        return self.half_pis[prec]
+
+    def ln2(self):
+        """Return ln(2) to the current precision."""
+        prec = getcontext().prec
+        if prec not in self.ln2s:
+            from cas.constants import ln2
+            self.ln2s[prec] = ln2()
+        return self.ln2s[prec]
+
+class _InverseFactorials(object):
+    """The reciprocals of the factorials, 1/k! for k from 0, to one
+    precision, which are the coefficients of the series for exp, sin and
+    cos. More are added as they are needed."""
+    def __init__(self):
+        self.values = [D(1)]
+        self.factorial = 1
+        self.lock = Lock()
+
+    def extend(self, k):
+        """Add the reciprocals up to 1/k! in the current context, which
+        should have the precision of the table."""
+        with self.lock:
+            values = self.values
+            while len(values) <= k:
+                self.factorial *= len(values)
+                values.append(1 / D(self.factorial))
+
+@lru_cache(maxsize=20, context=True)
+def _inverse_factorials():
+    """Return the table of reciprocals of factorials to the current
+    precision, which is shared between all of the series summed to it."""
+    return _InverseFactorials()
+
+def _exp(x, shared):
+    """Return e raised to the power of x in the current context."""
+    y = _float_path(math.exp, x, _EXP_ERROR)
+    if y is not None:
+        return y
+    short = _short_rational(x)
+    if short is not None and abs(short[0]) <= SHORT_EXP_LIMIT * short[1]:
+        return binary_splitting.exp_rational(*short)
+    x = _to_decimal(x)
+    if not x.is_finite():
+        return D(0) if x.is_infinite() and x < 0 else +x
+
+    # Write x = k*ln(2) + r with |r| <= ln(2)/2, so that exp(x) = 2**k exp(r),
+    # taking ln(2) to as many more digits as there are in k. The series is
+    # then summed for r / 2**n, and squared n times, which costs a digit of
+    # accuracy for each three squarings.
+    n = int(getcontext().prec ** 0.5)
+    with localcontext() as working:
+        working.prec += max(0, x.adjusted()) + n // 3 + 3
+        LN2 = shared.ln2()
+        k = (x / LN2).to_integral_value()
+        r = (x - k * LN2) / 2 ** n
+        inverses = _inverse_factorials()
+        i = 0; lasts = 0; s = 1; num = 1
+        while s != lasts:
+            lasts = s    
+            i += 1
+            num *= r
+            if i >= len(inverses.values):
+                inverses.extend(i)
+            s += num * inverses.values[i]
+        for i in range(n):
+            s *= s
+        s *= D(2) ** k
+    return +s
+
+def _log(x, base):
+    """Return the logarithm of x to the given base, or the natural logarithm
+    if it is None, in the current context."""
+    x = _to_decimal(x)
+    if x < 0:
+        return D('NaN')
+    elif base == 1:
+        raise ValueError("Base was 1!")
+    elif x == base:
+        return D(1)
+    elif x == 0:
+        return D('-Inf')
+    
+    # Decimal's own logarithms split x into a mantissa and a power of ten,
+    # the logarithm of which is taken from its cached digits of ln(10), and
+    # sum a series for the mantissa in integer arithmetic, after reducing it
+    # by as many square roots as suit the precision
+    if base is None:
+        y = _float_path(math.log, x, _LOG_ERROR)
+        return x.ln() if y is None else y
+    elif base == 10:
+        return x.log10()
+    with localcontext() as working:
+        working.prec += 2
+        s = x.ln() / _ln_base(base)
+    return +s
+
+def _sin(x, shared):
+    """Return the sine of x in the current context."""
+    y = _float_path(math.sin, x, _SIN_ERROR)
+    if y is not None:
+        return y
+    x = _to_decimal(x)
+    if not x.is_finite():
+        return D('NaN')
+    with localcontext() as working:
+        working.prec += GUARD_DIGITS
+        r, q = _reduce_angle(x, shared)
+        s = _cos_series(r) if q % 2 else _sin_series(r)
+    return -s if q >= 2 else +s
+
+def _cos(x, shared):
+    """Return the cosine of x in the current context."""
+    y = _float_path(math.cos, x, _COS_ERROR)
+    if y is not None:
+        return y
+    x = _to_decimal(x)
+    if not x.is_finite():
+        return D('NaN')
+    with localcontext() as working:
+        working.prec += GUARD_DIGITS
+        r, q = _reduce_angle(x, shared)
+        s = _sin_series(r) if q % 2 else _cos_series(r)
+    return -s if q in (1, 2) else +s
+
+def _tan(x, shared):
+    """Return the tangent of x in the current context."""
+    y = _float_path(math.tan, x, _TAN_ERROR)
+    if y is not None:
+        return y
+    x = _to_decimal(x)
+    if not x.is_finite():
+        return D('NaN')
+    with localcontext() as working:
+        working.prec += GUARD_DIGITS
+        r, q = _reduce_angle(x, shared)
+        s, c = _sin_series(r), _cos_series(r)
+        t = -c / s if q % 2 else s / c
+    return +t
+
+def _reduce_angle(x, shared):
+    """Return r and q, from 0 to 3, such that x = r + q*pi/2 modulo 2*pi and
+    |r| <= pi/4, with r to the working precision.
+    
+    pi is taken to as many more digits as there are in the integer part of x,
+    which are lost in the subtraction, and again to more if r is small, as
+    for x near a multiple of pi/2.
+    
+    """
+    if abs(x) < D('0.785'):
+        return x, 0
+    prec = getcontext().prec
+    whole = max(0, x.adjusted())
+    extra = whole + 3
+    while True:
+        with localcontext() as working:
+            working.prec += extra
+            half_pi = shared.half_pi()
+            q = (x / half_pi).to_integral_value()
+            r = x - q * half_pi
+        # The digits lost to zeros after the point of r
+        lost = -r.adjusted() - 1 if r else prec
+        if extra >= whole + 3 + lost or extra > whole + 2 * prec:
+            return +r, int(q) % 4
+        extra = whole + 3 + lost
+
+def _sin_series(x):
+    """Return the sine of x, which should be no more than pi/4 in magnitude."""
+    # Uses the series definition of sin, see:
+    # http://en.wikipedia.org/wiki/Trigonometric_function#Series_definitions
+    with localcontext() as working:
+        working.prec += 2
+        inverses = _inverse_factorials()
+        x2 = -x * x
+        i, lasts, s, num = 1, 0, x, x
+        while s != lasts:
+            lasts = s    
+            i += 2
+            num *= x2
+            if i >= len(inverses.values):
+                inverses.extend(i)
+            s += num * inverses.values[i]
+    return +s
+
+def _cos_series(x):
+    """Return the cosine of x, which should be no more than pi/4 in
+    magnitude."""
+    # Uses the series definition of cos, see:
+    # http://en.wikipedia.org/wiki/Trigonometric_function#Series_definitions
+    with localcontext() as working:
+        working.prec += 2
+        inverses = _inverse_factorials()
+        x2 = -x * x
+        i = 0; lasts = 0; s = 1; num = 1
+        while s != lasts:
+            lasts = s    
+            i += 2
+            num *= x2
+            if i >= len(inverses.values):
+                inverses.extend(i)
+            s += num * inverses.values[i]
+    return +s
+
+@lru_cache(maxsize=20, context=True)
+def _ln_base(base):
+    """Return the natural logarithm of the base of a logarithm, which is
+    remembered for each precision."""
+    from cas.constants import ln2
+    if base <= 0:
+        return D('NaN')
+    elif base == 2:
+        return ln2()
+    return base.ln()
+
 def _initialize(context, *args):
     if context is None:
         context = getcontext()
@@ -548,10 +890,11 @@ sqrt = D.sqrt
 fabs = abs
 fmod = D.__mod__
 
-__all__ = ['acos', 'asin', 'atan', 'atan2', 'ceil', 'cos', 'cosh', 'degrees',
-           'e', 'exp', 'fabs', 'floor', 'fmod', 'frexp', 'golden_ratio',
-           'hypot', 'ldexp', 'log', 'log10', 'modf', 'pi', 'pow', 'radians',
-           'sgn', 'sin', 'sinh', 'sqrt', 'tan', 'tanh', 'tetrate']
+__all__ = ['acos', 'asin', 'atan', 'atan2', 'ceil', 'cos', 'cos_many',
+           'cosh', 'degrees', 'e', 'exp', 'exp_many', 'fabs', 'floor', 'fmod',
+           'frexp', 'golden_ratio', 'hypot', 'ldexp', 'log', 'log10',
+           'log_many', 'modf', 'pi', 'pow', 'radians', 'sgn', 'sin',
+           'sin_many', 'sinh', 'sqrt', 'tan', 'tan_many', 'tanh', 'tetrate']
 
 if __name__ == '__main__':
     # TODO put some test functions down here